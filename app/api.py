@@ -0,0 +1,253 @@
+# app/api.py
+"""
+HTTP answer service: one warm pipeline process shared by every client
+(Streamlit, IVR, WhatsApp bot, ...).
+
+    uvicorn app.api:app --host 0.0.0.0 --port 8000
+
+    POST /answer     {"question": ..., "top_k": 3}          → answer_query_for_ui result
+    POST /retrieve   {"question": ..., "k": 8}              → retrieved chunks and distances
+    POST /translate  {"text": ..., "target_lang": "hi"|"en"} → translated text
+    POST /tts        {"text": ..., "lang": "hi"|"en"}       → audio bytes
+    GET  /healthz    process is up
+    GET  /readyz     200 once models, index and LLM clients are warmed up, else 503
+    GET  /metrics    Prometheus metrics (backend/metrics.py)
+
+Model calls run on a bounded thread pool (API_WORKERS), never on the event
+loop. Concurrent /answer (and /tts) requests for the same normalized text
+are coalesced: the first one runs the pipeline and the others await its
+result.
+"""
+import sys
+import os
+import re
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Hashable, Literal, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field
+
+dotenv.load_dotenv()
+
+from backend import metrics
+from backend.language_utils import ENGLISH, HINDI, detect_language
+from backend.llm_router import AllProvidersFailed
+from backend.rag_pipeline import RETRIEVER_K, answer_query_for_ui, prepare_request
+from backend.resources import startup_report, warm_up
+from backend.routing import route_score
+from backend.translate import translate, translate_to_english
+from backend.tts_response import audio_format, text_to_speech
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+# Threads running model and pipeline calls (each /answer holds one while it waits for the LLM).
+API_WORKERS = int(os.getenv("API_WORKERS", "16"))
+API_WARM_UP = os.getenv("API_WARM_UP", "1") == "1"
+
+# Punctuation, including the danda; Devanagari letters and vowel signs are kept.
+_PUNCTUATION = re.compile(r"[^\w\s\u0900-\u0963\u0966-\u097F]")
+
+
+def coalesce_key(text: str) -> str:
+    """Case, punctuation and whitespace differences do not make a question different."""
+    return " ".join(_PUNCTUATION.sub(" ", text.casefold()).split())
+
+
+class RequestCoalescer:
+    """
+    At most one job per key runs at a time; callers arriving while it runs
+    await the same result. Lives on the event loop, so it needs no lock. A
+    caller that disconnects does not cancel the job for the others.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, job: Callable[[], Awaitable]):
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(job())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            metrics.API_COALESCED.inc(endpoint=self.endpoint)
+        return await asyncio.shield(future)
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+
+_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+_answers = RequestCoalescer("answer")
+_speech = RequestCoalescer("tts")
+_readiness = {"ready": False, "error": None}
+
+
+async def _run(fn, *args, **kwargs):
+    """Run a blocking (model / pipeline) call on the bounded executor."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+async def _warm_up():
+    try:
+        await _run(warm_up)
+        _readiness["ready"] = True
+        logger.info("✅ KrishiGPT API ready")
+    except Exception as e:
+        _readiness["error"] = repr(e)
+        logger.warning(f"❌ Warm-up failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    metrics.configure_logging()
+    metrics.start_exporters()
+    # Warm up in the background so /healthz answers at once and /readyz reports progress.
+    task = asyncio.create_task(_warm_up()) if API_WARM_UP else None
+    if task is None:
+        _readiness["ready"] = True
+    yield
+    if task:
+        task.cancel()
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="KrishiGPT", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.API_REQUESTS.inc(endpoint=route.path if route else "other", status=str(response.status_code))
+    return response
+
+
+# ---------- Schemas ----------
+
+class AnswerRequest(BaseModel):
+    question: str = Field(min_length=1)
+    top_k: int = Field(3, ge=0, le=20)
+
+
+class RetrieveRequest(BaseModel):
+    question: str = Field(min_length=1)
+    k: int = Field(RETRIEVER_K, ge=1, le=50)
+
+
+class TranslateRequest(BaseModel):
+    text: str
+    target_lang: Literal["en", "hi"]
+    # "en", "hi" or "hi-Latn"; detected if not given.
+    source_lang: Optional[Literal["en", "hi", "hi-Latn"]] = None
+
+
+class TTSRequest(BaseModel):
+    text: str = Field(min_length=1)
+    lang: Literal["hi", "en"] = "hi"
+
+
+# ---------- Endpoints ----------
+
+def _pipeline_error(e: Exception) -> HTTPException:
+    if isinstance(e, AllProvidersFailed):
+        return HTTPException(status_code=503, detail=f"LLM providers unavailable: {e}")
+    return HTTPException(status_code=500, detail=repr(e))
+
+
+@app.post("/answer")
+async def answer(body: AnswerRequest) -> dict:
+    key = (coalesce_key(body.question), body.top_k)
+    try:
+        return await _answers.run(key, lambda: _run(answer_query_for_ui, body.question, top_k=body.top_k))
+    except Exception as e:
+        raise _pipeline_error(e) from e
+
+
+def _retrieve(question: str, k: int) -> dict:
+    ctx = prepare_request(question, k=k)
+    return {
+        "lang": ctx.lang,
+        "query_en": ctx.query_en,
+        "route_score": route_score(ctx.scored_docs),
+        "chunks": [
+            {"content": doc.page_content, "metadata": doc.metadata, "distance": float(distance)}
+            for doc, distance in ctx.scored_docs
+        ],
+    }
+
+
+@app.post("/retrieve")
+async def retrieve(body: RetrieveRequest) -> dict:
+    try:
+        return await _run(_retrieve, body.question, body.k)
+    except Exception as e:
+        raise _pipeline_error(e) from e
+
+
+def _translate(text: str, target_lang: str, source_lang: Optional[str]) -> dict:
+    source_lang = source_lang or detect_language(text)
+    if source_lang == target_lang:
+        out = text
+    elif target_lang == ENGLISH:
+        out = translate_to_english(text, src_lang=source_lang)  # Hinglish is passed on as is
+    else:
+        out = translate(text, src_lang=ENGLISH, tgt_lang=HINDI)
+    return {"source_lang": source_lang, "target_lang": target_lang, "text": out}
+
+
+@app.post("/translate")
+async def translate_text(body: TranslateRequest) -> dict:
+    return await _run(_translate, body.text, body.target_lang, body.source_lang)
+
+
+def _speak(text: str, lang: str) -> bytes:
+    path = text_to_speech(text, lang=lang, autoplay=False)
+    if not path:
+        raise RuntimeError("TTS generation failed")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@app.post("/tts")
+async def tts(body: TTSRequest) -> Response:
+    try:
+        audio = await _speech.run((body.lang, body.text), lambda: _run(_speak, body.text, body.lang))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e)) from e
+    return Response(content=audio, media_type=f"audio/{audio_format()}")
+
+
+@app.get("/healthz")
+async def healthz() -> dict:
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz() -> JSONResponse:
+    body = {
+        "ready": _readiness["ready"],
+        "error": _readiness["error"],
+        "components": [
+            {"component": r["component"], "loaded": r["loaded"],
+             "seconds": round(r["seconds"], 3) if r["seconds"] is not None else None}
+            for r in startup_report()
+        ],
+        "in_flight": {"answer": len(_answers), "tts": len(_speech)},
+    }
+    return JSONResponse(body, status_code=200 if _readiness["ready"] else 503)
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
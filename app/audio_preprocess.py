@@ -0,0 +1,223 @@
+"""
+Audio preprocessing before speech recognition.
+
+    clip = preprocess_audio(audio_bytes)
+    clip.wav_bytes  # 16 kHz mono 16-bit PCM, silence trimmed
+
+WAV input is decoded in-process; other containers (webm, mp3, m4a) go
+through pydub/ffmpeg once. The audio is downmixed to mono, resampled to
+16 kHz, and leading/trailing silence and long pauses are cut with a
+voice-activity detector (webrtcvad when installed, otherwise frame
+energy). Clips are capped at ASR_MAX_DURATION_S.
+"""
+import io
+import os
+import struct
+import wave
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+# === Configuration ===
+TARGET_RATE = 16000
+ASR_MAX_DURATION_S = float(os.getenv("ASR_MAX_DURATION_S", "30"))
+VAD_FRAME_MS = 30
+# Speech kept before/after each voiced region, and the longest pause kept inside.
+VAD_PADDING_MS = 200
+VAD_MAX_PAUSE_MS = 600
+# webrtcvad aggressiveness (0-3).
+VAD_MODE = int(os.getenv("VAD_MODE", "2"))
+# Energy VAD: frames this many dB over the noise floor (and above an absolute floor) are speech.
+ENERGY_MARGIN_DB = 12.0
+ENERGY_FLOOR_DBFS = -55.0
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass
+class PreprocessResult:
+    wav_bytes: bytes
+    input_bytes: int
+    output_bytes: int
+    input_s: float
+    output_s: float
+    # "wav" when decoded in-process, "ffmpeg" otherwise.
+    decoder: str
+    vad: str
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.input_bytes - self.output_bytes
+
+    @property
+    def seconds_saved(self) -> float:
+        return self.input_s - self.output_s
+
+    def report(self) -> str:
+        return (f"{self.input_s:.1f}s → {self.output_s:.1f}s, "
+                f"{self.input_bytes / 1024:.0f} KB → {self.output_bytes / 1024:.0f} KB "
+                f"({self.decoder}, {self.vad} VAD)")
+
+
+# ---------- Decoding ----------
+
+def is_wav(audio_bytes: bytes) -> bool:
+    return audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE"
+
+
+def decode_wav(audio_bytes: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Decode PCM (8/16/24/32-bit) or float WAV, including WAVE_FORMAT_EXTENSIBLE,
+    to a float32 array of shape (frames, channels) in [-1, 1].
+    """
+    pos, fmt, data = 12, None, None
+    while pos + 8 <= len(audio_bytes):
+        chunk_id, size = struct.unpack("<4sI", audio_bytes[pos:pos + 8])
+        body = audio_bytes[pos + 8:pos + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = body
+        elif chunk_id == b"data":
+            data = body
+        pos += 8 + size + (size & 1)
+    if fmt is None or data is None:
+        raise ValueError("WAV file without fmt or data chunk")
+
+    tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if tag == _WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        tag = struct.unpack("<H", fmt[24:26])[0]
+    width = bits // 8
+    data = data[:len(data) - len(data) % (width * channels)]
+
+    if tag == _WAVE_FORMAT_FLOAT and bits in (32, 64):
+        samples = np.frombuffer(data, dtype=f"<f{width}").astype(np.float32)
+    elif tag == _WAVE_FORMAT_PCM and bits == 8:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif tag == _WAVE_FORMAT_PCM and bits in (16, 32):
+        samples = np.frombuffer(data, dtype=f"<i{width}").astype(np.float32) / 2 ** (bits - 1)
+    elif tag == _WAVE_FORMAT_PCM and bits == 24:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                | (raw[:, 2].astype(np.int32) << 16))
+        samples = (np.where(ints >= 1 << 23, ints - (1 << 24), ints)).astype(np.float32) / 2 ** 23
+    else:
+        raise ValueError(f"Unsupported WAV encoding (format {tag}, {bits} bits)")
+    return samples.reshape(-1, channels), rate
+
+
+def _decode_with_ffmpeg(audio_bytes: bytes) -> Tuple[np.ndarray, int]:
+    """Decode any container ffmpeg understands (webm/mp3/m4a/...) via pydub."""
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32) / 2 ** (8 * audio.sample_width - 1)
+    return samples.reshape(-1, audio.channels), audio.frame_rate
+
+
+# ---------- Signal processing ----------
+
+def to_mono(samples: np.ndarray) -> np.ndarray:
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples: np.ndarray, rate: int, target: int = TARGET_RATE) -> np.ndarray:
+    """Polyphase resampling (scipy), or linear interpolation without scipy."""
+    if rate == target or len(samples) == 0:
+        return samples
+    try:
+        from math import gcd
+        from scipy.signal import resample_poly
+
+        g = gcd(rate, target)
+        return resample_poly(samples, target // g, rate // g).astype(np.float32)
+    except ImportError:
+        n = int(round(len(samples) * target / rate))
+        return np.interp(np.arange(n) * rate / target, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _pcm16(samples: np.ndarray) -> np.ndarray:
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+
+
+def _energy_voiced(frames: np.ndarray) -> np.ndarray:
+    rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+    db = 20 * np.log10(rms)
+    noise_floor = np.percentile(db, 10)
+    return db > max(noise_floor + ENERGY_MARGIN_DB, ENERGY_FLOOR_DBFS)
+
+
+def _webrtc_voiced(frames: np.ndarray, rate: int) -> np.ndarray:
+    import webrtcvad
+
+    vad = webrtcvad.Vad(VAD_MODE)
+    return np.array([vad.is_speech(_pcm16(f).tobytes(), rate) for f in frames])
+
+
+def trim_silence(samples: np.ndarray, rate: int = TARGET_RATE) -> Tuple[np.ndarray, str]:
+    """
+    Drop silence before the first and after the last voiced frame (keeping
+    VAD_PADDING_MS), and shorten pauses longer than VAD_MAX_PAUSE_MS.
+    Returns (samples, vad name).
+    """
+    frame = rate * VAD_FRAME_MS // 1000
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return samples, "none"
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    try:
+        voiced, vad = _webrtc_voiced(frames, rate), "webrtcvad"
+    except ImportError:
+        voiced, vad = _energy_voiced(frames), "energy"
+    if not voiced.any():
+        return samples, vad
+
+    # Grow voiced regions by the padding, then keep at most max-pause of each gap.
+    pad = VAD_PADDING_MS // VAD_FRAME_MS
+    keep = np.convolve(voiced.astype(int), np.ones(2 * pad + 1, dtype=int), mode="same") > 0
+    max_pause = VAD_MAX_PAUSE_MS // VAD_FRAME_MS
+    first, last = np.flatnonzero(keep)[[0, -1]]
+    gap = 0
+    for i in range(first, last + 1):
+        gap = 0 if keep[i] else gap + 1
+        if gap > max_pause:
+            keep[i] = False
+    keep[:first] = False
+    keep[last + 1:] = False
+    return frames[keep].reshape(-1), vad
+
+
+def encode_wav(samples: np.ndarray, rate: int = TARGET_RATE) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(_pcm16(samples).tobytes())
+    return out.getvalue()
+
+
+def preprocess_audio(audio_bytes: bytes, max_duration_s: float = ASR_MAX_DURATION_S) -> PreprocessResult:
+    """Decode, downmix, resample to 16 kHz, trim silence and cap the duration."""
+    if is_wav(audio_bytes):
+        samples, rate = decode_wav(audio_bytes)
+        decoder = "wav"
+    else:
+        samples, rate = _decode_with_ffmpeg(audio_bytes)
+        decoder = "ffmpeg"
+    input_s = len(samples) / rate
+
+    mono = resample(to_mono(samples), rate)
+    trimmed, vad = trim_silence(mono)
+    trimmed = trimmed[:int(max_duration_s * TARGET_RATE)]
+    wav_bytes = encode_wav(trimmed)
+    return PreprocessResult(
+        wav_bytes=wav_bytes,
+        input_bytes=len(audio_bytes),
+        output_bytes=len(wav_bytes),
+        input_s=input_s,
+        output_s=len(trimmed) / TARGET_RATE,
+        decoder=decoder,
+        vad=vad,
+    )
@@ -2,6 +2,8 @@
 import sys
 import os
 import io
+import time
+from importlib.util import find_spec
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -10,38 +12,36 @@ import dotenv
 
 dotenv.load_dotenv()
 
-from backend.rag_pipeline import answer_query_for_ui
-from backend.tts_response import text_to_speech
-
-# Optional voice libs (loaded lazily / guarded)
-HAS_MIC = False
-try:
-    from streamlit_mic_recorder import mic_recorder
-    HAS_MIC = True
-except Exception:
-    pass
-
-HAS_SR = False
-try:
-    import speech_recognition as sr  # noqa: F401  (used inside voice_input)
-    HAS_SR = True
-except Exception:
-    pass
-
-HAS_PYDUB = False
-try:
-    from pydub import AudioSegment  # noqa: F401
-    HAS_PYDUB = True
-except Exception:
-    pass
+from concurrent.futures import ThreadPoolExecutor
+
+_import_start = time.perf_counter()
+from backend.rag_pipeline import answer_query_for_ui, answer_cache_stats, routing_stats, stream_answer_for_ui
+from backend import metrics
+from backend.resources import registry, warm_up
+from backend.tts_response import audio_format, join_audio, text_to_speech
+registry.record("import backend", time.perf_counter() - _import_start)
+
+# Optional voice libs: only checked here, imported when voice mode is used
+HAS_MIC = find_spec("streamlit_mic_recorder") is not None
+HAS_SR = find_spec("speech_recognition") is not None
+HAS_PYDUB = find_spec("pydub") is not None
 
 # our robust converter/transcriber
-from app.voice_input import transcribe_audio_bytes
+from app.voice_input import transcribe_audio
 
 # -------------------------------------------------------
 
 st.set_page_config(page_title="KrishiGPT 🌾", page_icon="🌾", layout="wide")
 
+@st.cache_resource(show_spinner="🌾 Loading models (first start only)...")
+def load_resources():
+    """Load models, index and LLM clients once per server process, shared by all sessions."""
+    metrics.configure_logging()
+    metrics.start_exporters()
+    return warm_up()
+
+load_resources()
+
 st.markdown(
     """
     <style>
@@ -68,9 +68,29 @@ with st.sidebar:
     st.subheader("⚙️ Settings")
     input_mode = st.radio("Input mode", ["📝 Text", "🎤 Voice"], index=0)
     play_audio = st.checkbox("🔊 Speak answer", value=False)
+    stream_answer = st.checkbox("⚡ Stream answer", value=True)
     show_context = st.checkbox("📚 Show retrieved context", value=True)
     top_k = st.slider("Top context chunks to display", 1, 10, 3)
 
+    cache_stats = answer_cache_stats()
+    if cache_stats:
+        st.caption(
+            f"⚡ Answer cache: {cache_stats['hit_rate']:.0%} hit rate "
+            f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}), "
+            f"{cache_stats['saved_s']:.0f}s saved"
+        )
+
+    route_stats = routing_stats()
+    if route_stats["requests"]:
+        routes = ", ".join(f"{name} {n}" for name, n in route_stats["routes"].items())
+        st.caption(
+            f"🧭 Routing: {routes} · {route_stats['wasted_llm_calls']} wasted LLM calls "
+            f"({route_stats['wasted_per_request']:.2f}/request)"
+        )
+
+    with st.expander("⏱️ Startup time"):
+        st.code(registry.format_report(), language=None)
+
 st.write("---")
 
 # ---------------- UI: Text mode ----------------
@@ -86,6 +106,13 @@ def text_mode_ui():
         run_pipeline(user_q)
 
 # ---------------- UI: Voice mode ----------------
+def _show_transcription_stats(transcription):
+    caption = f"🎙️ Recognized as {transcription.locale or '—'} · {transcription.latency_report()}"
+    if transcription.preprocess:
+        clip = transcription.preprocess
+        caption += f" · ✂️ {clip.seconds_saved:.1f}s / {clip.bytes_saved / 1024:.0f} KB trimmed"
+    st.caption(caption)
+
 def voice_mode_ui():
     st.markdown("#### 🎤 बोलकर पूछें / Ask by speaking")
 
@@ -99,6 +126,8 @@ def voice_mode_ui():
     transcribed_text = ""
 
     if HAS_MIC:
+        from streamlit_mic_recorder import mic_recorder
+
         st.info("Click the mic, speak, and then click again to stop.")
         audio_dict = mic_recorder(
             start_prompt="🎙️ Start recording",
@@ -110,9 +139,11 @@ def voice_mode_ui():
         if audio_dict and "bytes" in audio_dict and audio_dict["bytes"]:
             with st.spinner("Transcribing..."):
                 try:
-                    transcribed_text = transcribe_audio_bytes(audio_dict["bytes"])
+                    transcription = transcribe_audio(audio_dict["bytes"])
+                    transcribed_text = transcription.text
                     if transcribed_text:
                         st.success(f"🗣️ You said: **{transcribed_text}**")
+                    _show_transcription_stats(transcription)
                 except Exception as e:
                     st.error(str(e))
     else:
@@ -124,9 +155,11 @@ def voice_mode_ui():
         if uploaded:
             with st.spinner("Transcribing..."):
                 try:
-                    transcribed_text = transcribe_audio_bytes(uploaded.read())
+                    transcription = transcribe_audio(uploaded.read())
+                    transcribed_text = transcription.text
                     if transcribed_text:
                         st.success(f"🗣️ You said: **{transcribed_text}**")
+                    _show_transcription_stats(transcription)
                 except Exception as e:
                     st.error(str(e))
 
@@ -135,11 +168,18 @@ def voice_mode_ui():
             run_pipeline(transcribed_text)
 
 # ---------------- Core runner ----------------
+def _tts_lang(lang: str) -> str:
+    return "hi" if lang == "hi" else "en"
+
 def run_pipeline(query: str):
     if not query or not query.strip():
         st.warning("Please provide a valid question (text or voice).")
         return
 
+    if stream_answer:
+        run_pipeline_streaming(query)
+        return
+
     with st.spinner("Thinking..."):
         try:
             result = answer_query_for_ui(query, top_k=top_k, speak=False)
@@ -150,23 +190,63 @@ def run_pipeline(query: str):
     # Show answer
     st.markdown("### ✅ Answer")
     st.write(result["answer"])
+    if result.get("cache_hit"):
+        st.caption("⚡ Served from answer cache")
 
     # Optional audio
     if play_audio:
         try:
             fp = text_to_speech(
                 result["answer"],
-                lang="hi" if result["lang"] == "hi" else "en",
+                lang=_tts_lang(result["answer_lang"]),
                 autoplay=False,
             )
             if fp and os.path.exists(fp):
                 with open(fp, "rb") as f:
-                    st.audio(f.read(), format="audio/mp3")
+                    st.audio(f.read(), format=f"audio/{audio_format()}")
             else:
                 st.info("Audio could not be generated.")
         except Exception as e:
             st.info(f"Audio could not be generated: {e}")
 
+    show_details(result)
+
+def run_pipeline_streaming(query: str):
+    """Render the answer sentence by sentence; TTS starts on each finished sentence."""
+    tts_pool = ThreadPoolExecutor(max_workers=2) if play_audio else None
+    tts_jobs = []
+
+    def on_sentence(sentence: str, lang: str):
+        if tts_pool:
+            tts_jobs.append(tts_pool.submit(text_to_speech, sentence, _tts_lang(lang), False))
+
+    with st.spinner("Understanding your question..."):
+        try:
+            stream, result = stream_answer_for_ui(query, top_k=top_k, on_sentence=on_sentence)
+        except Exception as e:
+            st.error(f"❌ Failed to answer: {e}")
+            return
+
+    st.markdown("### ✅ Answer")
+    try:
+        st.write_stream(stream)
+    except Exception as e:
+        st.error(f"❌ Failed to answer: {e}")
+        return
+    if result.get("cache_hit"):
+        st.caption("⚡ Served from answer cache")
+
+    if tts_pool:
+        audio = join_audio([job.result() for job in tts_jobs])
+        tts_pool.shutdown()
+        if audio:
+            st.audio(audio, format=f"audio/{audio_format()}")
+        else:
+            st.info("Audio could not be generated.")
+
+    show_details(result)
+
+def show_details(result: dict):
     # Show English version as debug (optional)
     with st.expander("🔤 English debug answer"):
         st.write(result["answer_en"])
@@ -1,68 +1,264 @@
 # backend/voice_input.py
 import io
-from typing import Optional
+import os
+import json
+import time
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
-import speech_recognition as sr
-from pydub import AudioSegment
+from app.audio_preprocess import PreprocessResult, preprocess_audio
 
+logger = logging.getLogger(__name__)
 
-def _convert_to_wav(audio_bytes: bytes) -> bytes:
+# === Configuration ===
+ASR_ENGINE = os.getenv("ASR_ENGINE", "google")
+# Seconds to wait for any locale; stragglers are abandoned after this.
+ASR_TIMEOUT_S = float(os.getenv("ASR_TIMEOUT_S", "8"))
+# A result at least this confident ends recognition without waiting for the rest.
+ASR_MIN_CONFIDENCE = float(os.getenv("ASR_MIN_CONFIDENCE", "0.8"))
+VOSK_MODEL_DIR = os.getenv("VOSK_MODEL_DIR", "data/models/vosk")
+
+DEFAULT_FALLBACK_LANGS = ["en-IN", "en-US"]
+
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="asr")
+
+
+@dataclass
+class Hypothesis:
+    text: str
+    # 0..1, or None when the engine does not report one.
+    confidence: Optional[float] = None
+
+
+@dataclass
+class TranscriptionResult:
+    text: str = ""
+    locale: Optional[str] = None
+    confidence: Optional[float] = None
+    # Milliseconds per locale; None for locales abandoned before they answered.
+    latencies_ms: Dict[str, Optional[float]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    # What preprocessing saved; None if the clip could not be decoded.
+    preprocess: Optional[PreprocessResult] = None
+
+    def latency_report(self) -> str:
+        return ", ".join(
+            f"{loc}: {'—' if ms is None else f'{ms:.0f} ms'}" for loc, ms in self.latencies_ms.items()
+        )
+
+
+class Recognizer(ABC):
     """
-    Convert arbitrary audio bytes (webm/mp3/m4a/etc.) to PCM WAV using pydub.
-    Requires ffmpeg/avconv installed and available on PATH.
+    A speech recognizer for one audio clip in one locale.
+
+    `load` turns WAV bytes into whatever the engine consumes (done once per
+    clip); `recognize` returns a Hypothesis, or None if nothing was understood,
+    and raises on service errors. It is called from several threads at once.
     """
-    audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
-    wav_io = io.BytesIO()
-    audio.export(wav_io, format="wav")  # default is PCM WAV
-    return wav_io.getvalue()
+    name = "base"
 
+    def load(self, wav_bytes: bytes):
+        return wav_bytes
 
-def transcribe_audio_bytes(
+    @abstractmethod
+    def recognize(self, audio, language: str) -> Optional[Hypothesis]:
+        ...
+
+
+class GoogleRecognizer(Recognizer):
+    """Google Web Speech API via SpeechRecognition (network)."""
+    name = "google"
+
+    def __init__(self, timeout_s: float = ASR_TIMEOUT_S):
+        self.timeout_s = timeout_s
+
+    def _recognizer(self):
+        import speech_recognition as sr
+
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = self.timeout_s
+        return recognizer
+
+    def load(self, wav_bytes: bytes):
+        import speech_recognition as sr
+
+        with sr.AudioFile(io.BytesIO(wav_bytes)) as source:
+            return self._recognizer().record(source)
+
+    def recognize(self, audio, language: str) -> Optional[Hypothesis]:
+        import speech_recognition as sr
+
+        try:
+            response = self._recognizer().recognize_google(audio, language=language, show_all=True)
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            # API/network error
+            raise RuntimeError(f"Speech API error: {e}") from e
+        alternatives = response.get("alternative", []) if isinstance(response, dict) else []
+        if not alternatives or not alternatives[0].get("transcript", "").strip():
+            return None
+        return Hypothesis(alternatives[0]["transcript"], alternatives[0].get("confidence"))
+
+
+class VoskRecognizer(Recognizer):
+    """
+    Offline recognition with Vosk. Expects one model per locale in
+    `VOSK_MODEL_DIR/<locale>` (e.g. data/models/vosk/hi-IN); locales without a
+    model are skipped.
+    """
+    name = "vosk"
+
+    def __init__(self, model_dir: str = VOSK_MODEL_DIR):
+        self.model_dir = model_dir
+        self._models = {}
+
+    def _model(self, language: str):
+        if language not in self._models:
+            from vosk import Model
+
+            path = os.path.join(self.model_dir, language)
+            self._models[language] = Model(path) if os.path.isdir(path) else None
+        return self._models[language]
+
+    def recognize(self, audio, language: str) -> Optional[Hypothesis]:
+        import wave
+        from vosk import KaldiRecognizer
+
+        model = self._model(language)
+        if model is None:
+            return None
+        with wave.open(io.BytesIO(audio), "rb") as wav:
+            recognizer = KaldiRecognizer(model, wav.getframerate())
+            recognizer.SetWords(True)
+            recognizer.AcceptWaveform(wav.readframes(wav.getnframes()))
+        result = json.loads(recognizer.FinalResult())
+        words = result.get("result", [])
+        if not result.get("text", "").strip():
+            return None
+        confidence = sum(w["conf"] for w in words) / len(words) if words else None
+        return Hypothesis(result["text"], confidence)
+
+
+RECOGNIZERS = {"google": GoogleRecognizer, "vosk": VoskRecognizer}
+
+
+def make_recognizer(name: str = ASR_ENGINE) -> Recognizer:
+    if name not in RECOGNIZERS:
+        raise ValueError(f"Unknown ASR engine: {name} (choose from {tuple(RECOGNIZERS)})")
+    return RECOGNIZERS[name]()
+
+
+def recognize_locales(
+    wav_bytes: bytes,
+    locales: List[str],
+    recognizer: Recognizer,
+    timeout_s: float = ASR_TIMEOUT_S,
+    min_confidence: float = ASR_MIN_CONFIDENCE,
+) -> TranscriptionResult:
+    """
+    Recognize `wav_bytes` in all `locales` at once.
+
+    Returns as soon as one locale is at least `min_confidence` sure; otherwise
+    waits for all (at most `timeout_s`) and keeps the most confident result,
+    preferring earlier locales on ties and when confidence is unknown.
+    Abandoned calls are cancelled if they have not started yet.
+    """
+    locales = list(dict.fromkeys(locales))
+    audio = recognizer.load(wav_bytes)
+    result = TranscriptionResult(latencies_ms={loc: None for loc in locales})
+    start = time.perf_counter()
+
+    def _run(locale: str):
+        """(hypothesis, error, latency_ms); never raises."""
+        try:
+            return recognizer.recognize(audio, locale), None, (time.perf_counter() - start) * 1000
+        except Exception as e:
+            return None, str(e), (time.perf_counter() - start) * 1000
+
+    futures = {_pool.submit(_run, loc): loc for loc in locales}
+    hypotheses: Dict[str, Hypothesis] = {}
+    pending = set(futures)
+    deadline = start + timeout_s
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            break  # timed out
+        for future in done:
+            locale = futures[future]
+            hypothesis, error, result.latencies_ms[locale] = future.result()
+            if error:
+                result.errors[locale] = error
+            elif hypothesis:
+                hypotheses[locale] = hypothesis
+        if any((h.confidence or 0.0) >= min_confidence for h in hypotheses.values()):
+            break
+    for future in pending:
+        future.cancel()
+
+    if hypotheses:
+        rank = {loc: i for i, loc in enumerate(locales)}
+        locale = max(hypotheses, key=lambda loc: (hypotheses[loc].confidence or 0.0, -rank[loc]))
+        result.text = hypotheses[locale].text
+        result.locale = locale
+        result.confidence = hypotheses[locale].confidence
+    return result
+
+
+def transcribe_audio(
     audio_bytes: bytes,
     language_hint: str = "hi-IN",
-    fallback_langs: Optional[list[str]] = None,
-) -> str:
+    fallback_langs: Optional[List[str]] = None,
+    recognizer: Optional[Recognizer] = None,
+) -> TranscriptionResult:
     """
-    Transcribe raw audio bytes to text using Google Web Speech API.
-    1) Converts to WAV
-    2) Tries Hindi first, then falls back to given languages.
+    Transcribe raw audio bytes (ASR_ENGINE, default Google Web Speech API).
+    1) Decodes, downmixes to 16 kHz mono and trims silence
+    2) Recognizes the hint and the fallback languages in parallel.
     """
     if fallback_langs is None:
-        fallback_langs = ["en-IN", "en-US", "hi-IN"]
-
-    recognizer = sr.Recognizer()
+        fallback_langs = DEFAULT_FALLBACK_LANGS
+    recognizer = recognizer or make_recognizer()
 
     try:
-        wav_bytes = _convert_to_wav(audio_bytes)
+        clip = preprocess_audio(audio_bytes)
+        wav_bytes = clip.wav_bytes
+        logger.info(f"✂️ Audio preprocessed: {clip.report()}")
     except Exception as e:
-        # If conversion fails, try to read as-is (in case it was already WAV/PCM)
-        wav_bytes = audio_bytes
+        # If decoding fails, try to read as-is (the recognizer may still cope)
+        clip, wav_bytes = None, audio_bytes
 
     try:
-        with sr.AudioFile(io.BytesIO(wav_bytes)) as source:
-            audio_data = recognizer.record(source)
-
-        # Try primary hint first, then fallbacks
-        for lang in [language_hint] + fallback_langs:
-            try:
-                text = recognizer.recognize_google(audio_data, language=lang)
-                if text.strip():
-                    return text
-            except sr.UnknownValueError:
-                continue
-            except sr.RequestError as e:
-                # API/network error
-                raise RuntimeError(f"Speech API error: {e}") from e
+        result = recognize_locales(wav_bytes, [language_hint] + fallback_langs, recognizer)
     except Exception as e:
         raise RuntimeError(f"Could not process audio: {e}") from e
+    result.preprocess = clip
+    logger.info(f"🎙️ ASR latency per locale: {result.latency_report()}")
 
-    return ""
+    if not result.text and result.errors and len(result.errors) == len(result.latencies_ms):
+        raise RuntimeError(next(iter(result.errors.values())))
+    return result
+
+
+def transcribe_audio_bytes(
+    audio_bytes: bytes,
+    language_hint: str = "hi-IN",
+    fallback_langs: Optional[List[str]] = None,
+) -> str:
+    """Transcribed text only (see `transcribe_audio`)."""
+    return transcribe_audio(audio_bytes, language_hint, fallback_langs).text
 
 
 def listen_to_voice_cli() -> str:
     """
     Simple CLI microphone capture (not used in Streamlit, but handy for quick tests).
     """
+    import speech_recognition as sr
+
     recognizer = sr.Recognizer()
     with sr.Microphone() as source:
         print("🎤 Speak now...")
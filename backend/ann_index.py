@@ -0,0 +1,82 @@
+import os
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# === Configuration ===
+INDEX_BACKENDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+DEFAULT_INDEX_BACKEND = os.getenv("FAISS_INDEX_BACKEND", "flat")
+
+# Search-time knobs can be overridden per process without rebuilding.
+_ENV_SEARCH_PARAMS = {"nprobe": "FAISS_NPROBE", "ef_search": "FAISS_EF_SEARCH"}
+
+
+def default_params(backend: str, n_vectors: int, dim: int) -> dict:
+    """Sensible build/search parameters for a corpus of `n_vectors` vectors."""
+    if backend == "flat":
+        return {}
+    if backend in ("ivf_flat", "ivf_pq"):
+        # ~4·sqrt(n) lists, but never so many that a list gets < 39 training points.
+        nlist = max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+        params = {"nlist": nlist, "nprobe": min(nlist, max(8, nlist // 16))}
+        if backend == "ivf_pq":
+            m = next(m for m in (48, 32, 24, 16, 12, 8, 4, 2, 1) if dim % m == 0)
+            # Same rule for PQ codebooks: 2**nbits centroids need ~39 points each.
+            nbits = max(1, min(8, int(math.log2(max(2, n_vectors // 39)))))
+            params.update({"m": m, "nbits": nbits})
+        return params
+    if backend == "hnsw":
+        return {"M": 32, "ef_construction": 80, "ef_search": 64}
+    raise ValueError(f"Unknown FAISS index backend: {backend} (choose from {INDEX_BACKENDS})")
+
+
+def make_index(backend: str, dim: int, params: dict) -> faiss.Index:
+    """Create an empty L2 index of the given backend."""
+    if backend == "flat":
+        return faiss.IndexFlatL2(dim)
+    if backend == "ivf_flat":
+        return faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, params["nlist"])
+    if backend == "ivf_pq":
+        return faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, params["nlist"],
+                                params["m"], params["nbits"])
+    if backend == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["M"])
+        index.hnsw.efConstruction = params["ef_construction"]
+        return index
+    raise ValueError(f"Unknown FAISS index backend: {backend} (choose from {INDEX_BACKENDS})")
+
+
+def build_index(backend: str, vectors: np.ndarray, params: Optional[dict] = None):
+    """
+    Create and train an index for `vectors` (vectors are not added).
+
+    Returns (index, params) where params are the ones actually used, to be
+    stored in the index metadata.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+    params = {**default_params(backend, n_vectors, dim), **(params or {})}
+    index = make_index(backend, dim, params)
+    if not index.is_trained:
+        index.train(vectors)
+    apply_search_params(index, params)
+    return index, params
+
+
+def apply_search_params(index: faiss.Index, params: Optional[dict]):
+    """Set nprobe / efSearch on a built or freshly loaded index."""
+    params = dict(params or {})
+    for key, env in _ENV_SEARCH_PARAMS.items():
+        if os.getenv(env):
+            params[key] = int(os.getenv(env))
+    if "nprobe" in params and hasattr(index, "nprobe"):
+        index.nprobe = params["nprobe"]
+    if "ef_search" in params and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = params["ef_search"]
+
+
+def supports_remove(backend: str) -> bool:
+    """HNSW graphs cannot delete vectors; changed chunks force a rebuild."""
+    return backend != "hnsw"
@@ -0,0 +1,183 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+# === Configuration ===
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "data/answer_cache.sqlite3")
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+# Cosine similarity of query embeddings above which a cached answer is reused.
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    index_version TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    query_norm TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    answer_en TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    contexts TEXT NOT NULL,
+    used_open_fallback INTEGER NOT NULL,
+    latency_s REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value REAL NOT NULL);
+"""
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+class AnswerCache:
+    """
+    Semantic cache of final answers, looked up by English query embedding.
+
+    Entries are kept in SQLite so they survive restarts. Each entry is tied to
+    the FAISS index version it was answered from; entries of other versions
+    are dropped on open, so rebuilding the index invalidates the cache.
+    Eviction is LRU (by last use) above `max_entries`, plus a TTL.
+    """
+
+    def __init__(
+        self,
+        index_version: str,
+        path: str = ANSWER_CACHE_PATH,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_s: float = ANSWER_CACHE_TTL_S,
+    ):
+        self.index_version = index_version
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db.execute("DELETE FROM answers WHERE index_version != ?", (index_version,))
+        self._db.commit()
+        self._load_vectors()
+
+    def _load_vectors(self):
+        rows = self._db.execute("SELECT id, lang, vector FROM answers").fetchall()
+        self._ids: List[int] = [r[0] for r in rows]
+        self._langs: List[str] = [r[1] for r in rows]
+        self._matrix = (np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+                        if rows else None)
+
+    def _bump(self, key: str, amount: float):
+        self._db.execute(
+            "INSERT INTO stats (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            (key, amount),
+        )
+
+    def lookup(self, query_en: str, vector, lang: str) -> Optional[dict]:
+        """Return the cached answer for a similar question in `lang`, or None."""
+        start = time.perf_counter()
+        with self._lock:
+            now = time.time()
+            row = self._db.execute(
+                "SELECT id FROM answers WHERE lang = ? AND query_norm = ? AND created_at > ?",
+                (lang, normalize_query(query_en), now - self.ttl_s),
+            ).fetchone()
+            entry_id = row[0] if row else self._nearest(vector, lang)
+
+            entry = None
+            if entry_id is not None:
+                entry = self._db.execute(
+                    "SELECT answer_en, answer, contexts, used_open_fallback, latency_s, created_at "
+                    "FROM answers WHERE id = ?", (entry_id,),
+                ).fetchone()
+            if entry is None or entry[5] <= now - self.ttl_s:
+                self._bump("misses", 1)
+                self._db.commit()
+                return None
+
+            self._db.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, entry_id))
+            self._bump("hits", 1)
+            self._bump("saved_s", max(0.0, entry[4] - (time.perf_counter() - start)))
+            self._db.commit()
+        return {
+            "answer_en": entry[0],
+            "answer": entry[1],
+            "contexts": json.loads(entry[2]),
+            "used_open_fallback": bool(entry[3]),
+        }
+
+    def _nearest(self, vector, lang: str) -> Optional[int]:
+        if self._matrix is None or vector is None:
+            return None
+        sims = self._matrix @ _unit(vector)
+        for i in np.argsort(-sims):
+            if sims[i] < self.threshold:
+                break
+            if self._langs[i] == lang:
+                return self._ids[i]
+        return None
+
+    def store(self, query_en: str, vector, lang: str, result: dict, latency_s: float):
+        """Cache `result` (answer_en, answer, contexts, used_open_fallback)."""
+        now = time.time()
+        with self._lock:
+            unit = _unit(vector)
+            cursor = self._db.execute(
+                "INSERT INTO answers (index_version, lang, query_norm, vector, answer_en, answer, "
+                "contexts, used_open_fallback, latency_s, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.index_version, lang, normalize_query(query_en), unit.tobytes(),
+                 result["answer_en"], result["answer"], json.dumps(result["contexts"], ensure_ascii=False),
+                 int(result["used_open_fallback"]), latency_s, now, now),
+            )
+            changes = self._db.total_changes
+            self._evict(now)
+            self._db.commit()
+            if self._db.total_changes != changes:
+                self._load_vectors()
+            else:
+                self._ids.append(cursor.lastrowid)
+                self._langs.append(lang)
+                self._matrix = (unit[None, :] if self._matrix is None
+                                else np.vstack([self._matrix, unit]))
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl_s,))
+        self._db.execute(
+            "DELETE FROM answers WHERE id NOT IN "
+            "(SELECT id FROM answers ORDER BY last_used DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> dict:
+        """Hit count, miss count, hit rate and total seconds saved."""
+        with self._lock:
+            values = dict(self._db.execute("SELECT key, value FROM stats").fetchall())
+            entries = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        hits, misses = int(values.get("hits", 0)), int(values.get("misses", 0))
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "saved_s": round(values.get("saved_s", 0.0), 2),
+        }
@@ -0,0 +1,200 @@
+"""
+Answer a JSONL file of questions in bulk.
+
+    python backend/batch_qa.py questions.jsonl answers.jsonl
+
+Input lines are {"question": ..., "id": ...} (the id is optional and
+defaults to the line number). Questions are processed in chunks of
+`--batch-size`: language ID, Hindi→English translation, query embedding
+and FAISS search run once per chunk (see `rag_pipeline.prepare_batch`), the
+LLM calls of a chunk run on `--concurrency` threads while the next chunk is
+being prepared, and each provider's concurrency (GEMINI_CONCURRENCY /
+GROQ_CONCURRENCY) and rate limits (GEMINI_RPM, ...) are enforced by the LLM
+router; requests wait up to `--max-wait-s` for quota instead of failing.
+
+Every answer is appended to the output file as one JSON line, with the
+question's id, as soon as it is ready (fsynced after each chunk); on Ctrl-C
+queued LLM calls are cancelled rather than waited for. The output file is the
+checkpoint: re-running the same command skips ids already answered, so an
+interrupted run resumes where it stopped (`--retry-errors` also re-asks
+questions that failed).
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Set
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+BATCH_SIZE = int(os.getenv("BATCH_QA_BATCH_SIZE", "32"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_QA_CONCURRENCY", "12"))
+# Chunks prepared ahead while earlier ones wait for the LLM.
+PREFETCH_CHUNKS = 2
+
+
+def read_questions(path: str) -> List[dict]:
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            questions.append({"id": row.get("id", n), "question": row["question"]})
+    return questions
+
+
+def completed_ids(path: str, retry_errors: bool = False) -> Set[str]:
+    """
+    Ids already in the output file (as strings). A partly written last line
+    from an interrupted run is cut off so new lines start cleanly.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb") as f:
+        data = f.read()
+    if data and not data.endswith(b"\n"):
+        with open(path, "r+b") as f:
+            f.truncate(data.rfind(b"\n") + 1)
+        data = data[:data.rfind(b"\n") + 1]
+    latest = {}
+    for line in data.decode("utf-8").splitlines():
+        if line.strip():
+            row = json.loads(line)
+            latest[str(row["id"])] = row
+    return {i for i, row in latest.items() if not (retry_errors and "error" in row)}
+
+
+def _chunks(items: List[dict], size: int) -> Iterator[List[dict]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    batch_size: int = BATCH_SIZE,
+    concurrency: int = BATCH_CONCURRENCY,
+    max_wait_s: float = 120.0,
+    retry_errors: bool = False,
+    top_k: int = 3,
+) -> dict:
+    """Answer every question of `input_path` not yet in `output_path`. Returns run statistics."""
+    from backend.rag_pipeline import answer_batch, llm_router_stats
+    from backend.resources import get
+
+    questions = read_questions(input_path)
+    done = completed_ids(output_path, retry_errors)
+    pending = [q for q in questions if str(q["id"]) not in done]
+    logger.info(f"📥 {len(questions)} questions, {len(questions) - len(pending)} already answered, "
+                f"{len(pending)} to go")
+    stats = {"questions": len(questions), "skipped": len(questions) - len(pending),
+             "answered": 0, "errors": 0, "routes": Counter()}
+    if not pending:
+        return stats
+
+    # A batch would rather wait for quota than fail the question.
+    get("llm_router").max_wait_s = max_wait_s
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    start = time.perf_counter()
+    llm_pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-llm")
+    chunk_pool = ThreadPoolExecutor(max_workers=PREFETCH_CHUNKS, thread_name_prefix="batch-chunk")
+    out = open(output_path, "a", encoding="utf-8")
+    write_lock = threading.Lock()
+    closed = False
+
+    def write(q: dict, result: dict, written: Set[int]):
+        with write_lock:
+            if closed or id(q) in written:
+                return
+            written.add(id(q))
+            out.write(json.dumps({"id": q["id"], "question": q["question"], **result}, ensure_ascii=False) + "\n")
+            out.flush()
+            if "error" in result:
+                stats["errors"] += 1
+            else:
+                stats["answered"] += 1
+                stats["routes"]["cache" if result["cache_hit"] else result["route"]] += 1
+
+    in_flight: List[tuple] = []
+    chunks = _chunks(pending, batch_size)
+
+    def submit_next() -> bool:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        written: Set[int] = set()
+        # Each answer is written as soon as it is ready, not when its chunk is.
+        on_result = lambda i, result: write(chunk[i], result, written)
+        future: Future = chunk_pool.submit(answer_batch, [q["question"] for q in chunk], llm_pool, top_k, on_result)
+        in_flight.append((chunk, written, future))
+        return True
+
+    try:
+        for _ in range(PREFETCH_CHUNKS):
+            submit_next()
+        while in_flight:
+            chunk, written, future = in_flight.pop(0)
+            try:
+                future.result()
+            except Exception as e:  # e.g. the embedding model failed: record and move on
+                for q in chunk:
+                    write(q, {"error": repr(e)}, written)
+            submit_next()
+            with write_lock:
+                os.fsync(out.fileno())
+            elapsed = time.perf_counter() - start
+            processed = stats["answered"] + stats["errors"]
+            logger.info(f"✅ {processed}/{len(pending)} ({stats['errors']} errors), "
+                        f"{processed / elapsed:.2f} questions/s")
+    except BaseException:
+        # Ctrl-C: drop the queued LLM calls instead of waiting for all of them;
+        # the ones already running finish in the background but are not written.
+        with write_lock:
+            closed = True
+            out.close()
+        chunk_pool.shutdown(wait=False, cancel_futures=True)
+        llm_pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    chunk_pool.shutdown()
+    llm_pool.shutdown()
+    out.close()
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    stats["questions_per_s"] = round((stats["answered"] + stats["errors"]) / max(stats["seconds"], 1e-9), 2)
+    stats["routes"] = dict(stats["routes"])
+    stats["llm"] = llm_router_stats()
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions, resumably.")
+    parser.add_argument("input", help='JSONL with {"question": ..., "id": ...} per line')
+    parser.add_argument("output", help="JSONL answers; appended to, and used to resume")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="questions per CPU batch")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="LLM requests in flight")
+    parser.add_argument("--max-wait-s", type=float, default=120.0,
+                        help="how long a request may wait for provider quota before failing")
+    parser.add_argument("--retry-errors", action="store_true", help="re-ask questions whose last answer failed")
+    parser.add_argument("--top-k", type=int, default=3, help="retrieved chunks kept per answer")
+    args = parser.parse_args()
+
+    metrics.configure_logging()
+    try:
+        stats = run_batch(args.input, args.output, args.batch_size, args.concurrency,
+                          args.max_wait_s, args.retry_errors, args.top_k)
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrupted. Answers so far are in {args.output}; re-run the same command to resume.")
+        sys.exit(130)
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
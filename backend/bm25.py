@@ -0,0 +1,268 @@
+"""
+BM25 inverted index over the same chunks as the FAISS index, and a hybrid
+retriever that fuses lexical and dense rankings.
+
+MiniLM embeddings blur exact terms such as scheme names ("PM-Kisan", "AIF"),
+scheme codes and district names; BM25 matches them literally. The index is
+stored as `bm25.json` next to `index.faiss`, with a hash of the chunk ids it
+covers, and rebuilt from the docstore whenever the FAISS index changes.
+
+Retrieval mode (`RETRIEVAL_MODE`): "dense" (FAISS only), "bm25" (lexical
+only) or "hybrid" (both, merged by reciprocal-rank fusion; the default).
+"""
+import os
+import re
+import json
+import math
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.pydantic_v1 import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+BM25_FILE = "bm25.json"
+BM25_VERSION = 2
+BM25_K1 = 1.5
+BM25_B = 0.75
+RETRIEVAL_MODES = ("dense", "bm25", "hybrid")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Reciprocal-rank fusion constant: score = Σ 1 / (RRF_K + rank).
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Candidates taken from each ranking before fusion, per requested result.
+FUSION_FETCH_FACTOR = 5
+
+_TOKEN = re.compile(r"\w+(?:-\w+)*")
+_STOPWORDS = frozenset("""
+    a an and are as at be by can do does for from has have how i in is it its of on or
+    that the their there these this to under was what when where which who will with
+    you your my me we our
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms without stopwords. Hyphenated words are indexed both
+    whole and by part ("pm-kisan" → "pm-kisan", "pm", "kisan").
+    """
+    terms = []
+    for word in _TOKEN.findall(text.lower()):
+        if "-" in word:
+            terms.append(word)
+            terms.extend(p for p in word.split("-") if p not in _STOPWORDS)
+        elif word not in _STOPWORDS:
+            terms.append(word)
+    return terms
+
+
+def ids_hash(ids: Sequence[str]) -> str:
+    """Hash of an ordered chunk id list; tells whether a saved index covers the current chunks."""
+    return hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of chunks, identified by their chunk ids.
+    Postings are term → (doc numbers, term frequencies).
+    """
+
+    def __init__(self, ids: List[str], doc_len: List[int], postings: Dict[str, Tuple[List[int], List[int]]],
+                 k1: float = BM25_K1, b: float = BM25_B, ids_digest: Optional[str] = None):
+        self.ids = ids
+        self.ids_hash = ids_digest or ids_hash(ids)
+        self.k1 = k1
+        self.b = b
+        self.doc_len = np.asarray(doc_len, dtype=np.float32)
+        self.avg_len = float(self.doc_len.mean()) if len(ids) else 0.0
+        n = len(ids)
+        self.postings = {
+            term: (np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (docs, tfs) in postings.items()
+        }
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, (docs, _) in self.postings.items()
+        }
+
+    @classmethod
+    def build(cls, ids: Sequence[str], texts: Sequence[str]) -> "BM25Index":
+        postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        doc_len = []
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term][0].append(doc)
+                postings[term][1].append(tf)
+        return cls(list(ids), doc_len, dict(postings))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top `k` (chunk id, BM25 score) for the query, best first."""
+        if not self.ids:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / max(self.avg_len, 1e-9))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tfs = self.postings[term]
+            scores[docs] += self.idf[term] * tfs * (self.k1 + 1) / (tfs + norm[docs])
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        best = candidates[np.argsort(-scores[candidates])]
+        return [(self.ids[i], float(scores[i])) for i in best]
+
+    def save(self, index_path: str):
+        data = {
+            "version": BM25_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "ids_hash": self.ids_hash,
+            "doc_len": self.doc_len.astype(int).tolist(),
+            "postings": {t: [d.tolist(), f.astype(int).tolist()] for t, (d, f) in self.postings.items()},
+        }
+        path = os.path.join(index_path, BM25_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, index_path: str) -> Optional["BM25Index"]:
+        path = os.path.join(index_path, BM25_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != BM25_VERSION:
+            return None
+        return cls(data["ids"], data["doc_len"],
+                   {t: (d, f) for t, (d, f) in data["postings"].items()},
+                   k1=data["k1"], b=data["b"], ids_digest=data["ids_hash"])
+
+
+def build_bm25(vectorstore, index_path: str) -> BM25Index:
+    """(Re)build the BM25 index from every chunk in the FAISS docstore and save it."""
+    ids = list(vectorstore.index_to_docstore_id.values())
+    index = BM25Index.build(ids, [vectorstore.docstore.search(i).page_content for i in ids])
+    index.save(index_path)
+    return index
+
+
+def load_bm25(vectorstore, index_path: str) -> BM25Index:
+    """The saved BM25 index, rebuilt if missing or out of step with the FAISS index."""
+    index = BM25Index.load(index_path)
+    # Same count is not enough: an update can remove and add as many chunks.
+    if index is None or index.ids_hash != ids_hash(list(vectorstore.index_to_docstore_id.values())):
+        logger.warning("⚠️ BM25 index missing or stale. Rebuilding from the FAISS docstore...")
+        index = build_bm25(vectorstore, index_path)
+    return index
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], rrf_k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Merge ranked id lists: score(id) = Σ 1 / (rrf_k + rank), rank from 1."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever over a FAISS vectorstore and its BM25 index.
+
+    `search()` takes an already computed query vector and returns
+    (document, L2 distance) pairs like `similarity_search_with_score_by_vector`,
+    so the pipeline keeps using dense distances downstream; documents found
+    only lexically get their exact distance from the index when it can
+    reconstruct vectors, else infinity.
+    """
+    vectorstore: object
+    bm25: object
+    k: int = 4
+    mode: str = RETRIEVAL_MODE
+    rrf_k: int = RRF_K
+    _positions: Optional[Callable[[str], Optional[int]]] = PrivateAttr(default=None)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def search(self, query: str, query_vector, k: Optional[int] = None) -> List[Tuple[Document, float]]:
+        return self.search_batch([query], [query_vector], k)[0]
+
+    def search_batch(self, queries: Sequence[str], query_vectors, k: Optional[int] = None
+                     ) -> List[List[Tuple[Document, float]]]:
+        """`search` for several queries, with a single FAISS search over all their vectors."""
+        k = k or self.k
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {self.mode} (choose from {RETRIEVAL_MODES})")
+        if not len(queries):
+            return []
+        fetch_k = k if self.mode == "dense" else k * FUSION_FETCH_FACTOR
+        dense_rows = (self._dense_ids(query_vectors, fetch_k) if self.mode != "bm25"
+                      else [{} for _ in queries])
+
+        results = []
+        for query, query_vector, dense in zip(queries, query_vectors, dense_rows):
+            if self.mode == "dense":
+                fused = list(dense)[:k]
+            else:
+                lexical = [doc_id for doc_id, _ in self.bm25.search(query, fetch_k)]
+                fused = (lexical[:k] if self.mode == "bm25" else
+                         [doc_id for doc_id, _ in reciprocal_rank_fusion([list(dense), lexical], self.rrf_k)[:k]])
+            # Only the fused top k are read from the docstore (memory-mapped, see backend.chunk_store).
+            row = []
+            for doc_id in fused:
+                doc = self.vectorstore.docstore.search(doc_id)
+                if not isinstance(doc, Document):  # "ID ... not found.": not in this docstore
+                    continue
+                row.append((doc, dense[doc_id] if doc_id in dense else self._distance(doc_id, query_vector)))
+            results.append(row)
+        return results
+
+    def _dense_ids(self, query_vectors, k: int) -> List[Dict[str, float]]:
+        """Per query vector, {chunk id: L2 distance} of the `k` nearest chunks, best first."""
+        vectors = np.asarray(query_vectors, dtype=np.float32)
+        distances, positions = self.vectorstore.index.search(vectors, k)
+        ids = self.vectorstore.index_to_docstore_id
+        return [
+            {ids[int(p)]: float(d) for d, p in zip(row_d, row_p) if p != -1}
+            for row_d, row_p in zip(distances, positions)
+        ]
+
+    def _position(self, doc_id: str) -> Optional[int]:
+        if self._positions is None:
+            # A memory-mapped docstore (backend.chunk_store) looks positions up itself.
+            lookup = getattr(self.vectorstore.docstore, "position", None)
+            self._positions = lookup or {d: i for i, d in self.vectorstore.index_to_docstore_id.items()}.get
+            try:  # IVF indexes can only reconstruct vectors with a direct map
+                import faiss
+
+                faiss.extract_index_ivf(self.vectorstore.index).make_direct_map()
+            except Exception:
+                pass
+        return self._positions(doc_id)
+
+    def _distance(self, doc_id: str, query_vector) -> float:
+        position = self._position(doc_id)
+        try:
+            vector = self.vectorstore.index.reconstruct(position)
+        except Exception:
+            return float("inf")
+        return float(np.sum((np.asarray(query_vector, dtype=np.float32) - vector) ** 2))
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        vector = self.vectorstore.embedding_function.embed_query(query)
+        return [doc for doc, _ in self.search(query, vector)]
@@ -1,28 +1,396 @@
+import sys
 import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import hashlib
+import json
+import logging
+from typing import Dict, List, Optional
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from backend.ann_index import (
+    DEFAULT_INDEX_BACKEND,
+    INDEX_BACKENDS,
+    apply_search_params,
+    build_index,
+    supports_remove,
+)
+from backend.bm25 import BM25_FILE, build_bm25
+from backend.chunk_store import ChunkDocstore, ChunkStore, PositionIds, chunk_store_exists, write_chunk_store
+from backend.embedding_stage import (
+    EMBED_BATCH_SIZE,
+    EMBED_WORKERS,
+    EMBEDDING_CACHE_DIR,
+    embed_texts,
+)
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+DOCS_FOLDER = "data/cleaned_docs"
+FAISS_INDEX_PATH = "data/faiss_index"
+INDEX_FILE = "index.faiss"
+LEGACY_DOCSTORE_FILE = "index.pkl"  # LangChain save_local pickle, replaced by backend.chunk_store
+# Open the index and chunk store memory-mapped (shared between worker processes).
+VECTORSTORE_MMAP = os.getenv("VECTORSTORE_MMAP", "1") == "1"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# MiniLM truncates at 256 word pieces, so chunks are kept well below that.
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+
+_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    separators=["\n\n", "\n", "। ", ". ", " ", ""],
+    keep_separator="end",
+)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Stable id of a chunk: the hash of its source file name and content."""
+    return _sha256(f"{source}\n{text}".encode("utf-8"))
+
+
+def chunk_document(text: str, source: str) -> List[Document]:
+    """Split one cleaned document into chunks carrying source metadata."""
+    chunks: List[Document] = []
+    seen = set()
+    for i, piece in enumerate(_splitter.split_text(text)):
+        piece = piece.strip()
+        if not piece:
+            continue
+        cid = chunk_id(source, piece)
+        if cid in seen:  # identical text in the same file adds nothing
+            continue
+        seen.add(cid)
+        chunks.append(Document(
+            page_content=piece,
+            metadata={"source": source, "chunk": i, "chunk_id": cid},
+        ))
+    return chunks
+
+
+def scan_documents(docs_folder: str = DOCS_FOLDER) -> Dict[str, str]:
+    """
+    Return {file name: sha256} for every document in the folder: chunk files
+    written by backend/ingest.py (.jsonl) and cleaned text (.txt). A .txt
+    with the same name as a .jsonl is an older extraction of the same PDF
+    and is left out.
+    """
+    files = sorted(os.listdir(docs_folder))
+    ingested = {os.path.splitext(f)[0] for f in files if f.endswith(".jsonl")}
+    hashes = {}
+    for file in files:
+        stem, ext = os.path.splitext(file)
+        if ext == ".jsonl" or (ext == ".txt" and stem not in ingested):
+            with open(os.path.join(docs_folder, file), "rb") as f:
+                hashes[file] = _sha256(f.read())
+    return hashes
+
+
+def _load_ingested_chunks(path: str, file: str) -> List[Document]:
+    """Chunks from an ingest .jsonl file, keeping their source PDF and pages."""
+    chunks: List[Document] = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            text = record["text"].strip()
+            cid = chunk_id(file, text)
+            if not text or cid in seen:
+                continue
+            seen.add(cid)
+            chunks.append(Document(
+                page_content=text,
+                metadata={
+                    "source": record["source"],
+                    "page": record["page"],
+                    "pages": record["pages"],
+                    "kind": record["kind"],
+                    "chunk": record["chunk"],
+                    "chunk_id": cid,
+                },
+            ))
+    return chunks
+
+
+def load_document_chunks(file: str, docs_folder: str = DOCS_FOLDER) -> List[Document]:
+    path = os.path.join(docs_folder, file)
+    if file.endswith(".jsonl"):
+        return _load_ingested_chunks(path, file)
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read().strip()
+    return chunk_document(content, source=file) if content else []
+
+
+# ---------- Manifest ----------
+
+def _empty_manifest(index_backend: str = DEFAULT_INDEX_BACKEND) -> dict:
+    return {
+        "version": MANIFEST_VERSION,
+        "model": EMBEDDING_MODEL_NAME,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "index": {"backend": index_backend, "params": {}},
+        "files": {},
+    }
+
+
+def load_manifest(index_path: str = FAISS_INDEX_PATH) -> Optional[dict]:
+    path = os.path.join(index_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, index_path: str = FAISS_INDEX_PATH):
+    path = os.path.join(index_path, MANIFEST_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _manifest_compatible(manifest: Optional[dict]) -> bool:
+    """A manifest can only be reused if the chunks it describes would be identical."""
+    if not manifest:
+        return False
+    expected = _empty_manifest()
+    return all(manifest.get(k) == expected[k]
+               for k in ("version", "model", "chunk_size", "chunk_overlap"))
+
+
+def index_metadata(manifest: Optional[dict]) -> dict:
+    """ANN backend and parameters recorded for an index (flat for old manifests)."""
+    return (manifest or {}).get("index", {"backend": "flat", "params": {}})
+
+
+def _read_index(path: str, mmap: bool) -> faiss.Index:
+    if mmap:
+        # IO_FLAG_MMAP_IFC maps flat vectors in place as well (faiss >= 1.10).
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError:  # index type without mmap support
+            pass
+    return faiss.read_index(path)
+
+
+def load_vectorstore(embedding_model, index_path: str = FAISS_INDEX_PATH, mmap: bool = VECTORSTORE_MMAP) -> FAISS:
+    """
+    Load a saved index and restore the search parameters of its backend.
+
+    With `mmap` the FAISS index and the chunk store (see `backend.chunk_store`)
+    are opened read-only and memory-mapped, so nothing is copied or
+    deserialized at startup; without it the chunks are read into an
+    `InMemoryDocstore` that `update_faiss_index` can add to and delete from.
+    Indexes saved in the old pickle format are still loaded, with a warning.
+    """
+    if not chunk_store_exists(index_path):
+        logger.warning("⚠️ FAISS index uses the old pickle docstore; re-run backend/build_faiss_index.py to convert it.")
+        vectorstore = FAISS.load_local(
+            index_path,
+            embeddings=embedding_model,
+            allow_dangerous_deserialization=True,
+        )
+    else:
+        store = ChunkStore(index_path)
+        index = _read_index(os.path.join(index_path, INDEX_FILE), mmap)
+        if mmap:
+            docstore, index_to_docstore_id = ChunkDocstore(store), PositionIds(store)
+        else:
+            ids = [store.id(i) for i in range(len(store))]
+            docstore = InMemoryDocstore({doc_id: store.document(i) for i, doc_id in enumerate(ids)})
+            index_to_docstore_id = dict(enumerate(ids))
+        vectorstore = FAISS(
+            embedding_function=embedding_model,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+        )
+    apply_search_params(vectorstore.index, index_metadata(load_manifest(index_path))["params"])
+    return vectorstore
+
+
+def save_vectorstore(vectorstore: FAISS, index_path: str = FAISS_INDEX_PATH):
+    """Write the FAISS index and its chunk store, replacing an old pickle docstore."""
+    os.makedirs(index_path, exist_ok=True)
+    path = os.path.join(index_path, INDEX_FILE)
+    faiss.write_index(vectorstore.index, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    ids = [vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)]
+    write_chunk_store(index_path, ids, [vectorstore.docstore.search(doc_id) for doc_id in ids])
+    legacy = os.path.join(index_path, LEGACY_DOCSTORE_FILE)
+    if os.path.exists(legacy):
+        os.remove(legacy)
+
+
+def _new_vectorstore(embedding_model, index_backend: str, vectors, manifest: dict) -> FAISS:
+    index, params = build_index(index_backend, vectors)
+    manifest["index"] = {"backend": index_backend, "params": params}
+    return FAISS(
+        embedding_function=embedding_model,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+
+
+def index_version(index_path: str = FAISS_INDEX_PATH) -> str:
+    """Identifier that changes whenever the index contents change."""
+    path = os.path.join(index_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return "unversioned"
+    with open(path, "rb") as f:
+        return _sha256(f.read())[:16]
+
+
+def index_is_chunked(index_path: str = FAISS_INDEX_PATH) -> bool:
+    """True if the index exists and was built from chunks with the current settings."""
+    return (os.path.exists(os.path.join(index_path, INDEX_FILE))
+            and _manifest_compatible(load_manifest(index_path)))
+
+
+# ---------- Build / update ----------
+
+def update_faiss_index(
+    embedding_model,
+    docs_folder: str = DOCS_FOLDER,
+    index_path: str = FAISS_INDEX_PATH,
+    rebuild: bool = False,
+    index_backend: Optional[str] = None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    workers: int = EMBED_WORKERS,
+    cache_dir: Optional[str] = EMBEDDING_CACHE_DIR,
+) -> dict:
+    """
+    Bring the FAISS index in line with `docs_folder`, embedding only what changed.
+    The BM25 index next to it (see `backend.bm25`) is rebuilt whenever it does.
+
+    Files whose hash matches the manifest are skipped. For changed files only
+    chunks with a new content hash are embedded, and chunks that disappeared are
+    deleted from the index. Without a compatible manifest (or with `rebuild`)
+    the index is built from scratch. Embedding goes through
+    `backend.embedding_stage`, so even a full rebuild reuses cached vectors
+    for chunk text that was embedded before.
+
+    `index_backend` selects the ANN index (see `backend.ann_index`); by default
+    the backend recorded in the manifest is kept. Switching backends, or
+    deleting chunks from an HNSW index, triggers a full rebuild.
+
+    Returns counts of added/removed chunks and skipped files.
+    """
+    current = scan_documents(docs_folder)
+    if not current:
+        raise FileNotFoundError(f"❌ No documents found in {docs_folder} to build FAISS index.")
+
+    if index_backend is not None and index_backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown FAISS index backend: {index_backend} (choose from {INDEX_BACKENDS})")
+
+    manifest = None if rebuild else load_manifest(index_path)
+    recorded_backend = index_metadata(manifest)["backend"] if manifest else None
+    index_file = os.path.join(index_path, INDEX_FILE)
+    vectorstore = None
+    if (_manifest_compatible(manifest) and os.path.exists(index_file)
+            and index_backend in (None, recorded_backend)):
+        vectorstore = load_vectorstore(embedding_model, index_path, mmap=False)
+        index_backend = recorded_backend
+    else:
+        index_backend = index_backend or DEFAULT_INDEX_BACKEND
+        manifest = _empty_manifest(index_backend)
+
+    stats = {"added": 0, "removed": 0, "unchanged_files": 0}
+    files = manifest["files"]
+    to_add: List[Document] = []
+    to_remove: List[str] = []
+
+    for file in sorted(set(files) - set(current)):
+        to_remove.extend(files.pop(file)["chunks"])
+
+    for file, file_hash in current.items():
+        entry = files.get(file)
+        if entry and entry["sha256"] == file_hash:
+            stats["unchanged_files"] += 1
+            continue
+        old_ids = set(entry["chunks"]) if entry else set()
+        chunks = load_document_chunks(file, docs_folder)
+        new_ids = [c.metadata["chunk_id"] for c in chunks]
+        to_remove.extend(old_ids - set(new_ids))
+        to_add.extend(c for c in chunks if c.metadata["chunk_id"] not in old_ids)
+        files[file] = {"sha256": file_hash, "chunks": new_ids}
+
+    if to_remove and vectorstore is not None:
+        if not supports_remove(index_backend):
+            return update_faiss_index(
+                embedding_model, docs_folder, index_path,
+                rebuild=True, index_backend=index_backend,
+                batch_size=batch_size, workers=workers, cache_dir=cache_dir,
+            )
+        vectorstore.delete(to_remove)
+    stats["removed"] = len(to_remove)
 
-# Step 1: Load your documents
-docs_folder = "data/cleaned_docs"
-documents = []
+    if to_add:
+        texts = [d.page_content for d in to_add]
+        vectors = embed_texts(texts, embedding_model, EMBEDDING_MODEL_NAME,
+                              batch_size=batch_size, workers=workers, cache_dir=cache_dir)
+        text_embeddings = list(zip(texts, vectors.tolist()))
+        metadatas = [d.metadata for d in to_add]
+        ids = [d.metadata["chunk_id"] for d in to_add]
+        if vectorstore is None:
+            vectorstore = _new_vectorstore(embedding_model, index_backend, vectors, manifest)
+        vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    stats["added"] = len(to_add)
 
-for file in os.listdir(docs_folder):
-    if file.endswith(".txt"):
-        with open(os.path.join(docs_folder, file), "r", encoding="utf-8") as f:
-            content = f.read()
-            documents.append(Document(page_content=content))
+    if vectorstore is None:
+        raise FileNotFoundError(f"❌ No non-empty documents in {docs_folder} to build FAISS index.")
 
-print(f"📄 Loaded {len(documents)} documents for indexing.")
+    os.makedirs(index_path, exist_ok=True)
+    changed = to_add or to_remove or not os.path.exists(index_file) or not chunk_store_exists(index_path)
+    if changed:
+        save_vectorstore(vectorstore, index_path)
+    if changed or not os.path.exists(os.path.join(index_path, BM25_FILE)):
+        build_bm25(vectorstore, index_path)
+    save_manifest(manifest, index_path)
+    return stats
 
-# Step 2: Create embeddings
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
 
-# Step 3: Build FAISS index
-vectorstore = FAISS.from_documents(documents, embedding_model)
+if __name__ == "__main__":
+    from langchain_huggingface import HuggingFaceEmbeddings
 
-# Step 4: Save FAISS index
-os.makedirs("data/faiss_index", exist_ok=True)
-vectorstore.save_local("data/faiss_index")
+    parser = argparse.ArgumentParser(description="Build or incrementally update the FAISS index.")
+    parser.add_argument("--docs", default=DOCS_FOLDER, help="folder with ingested .jsonl / cleaned .txt documents")
+    parser.add_argument("--index", default=FAISS_INDEX_PATH, help="FAISS index directory")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the manifest and rebuild from scratch")
+    parser.add_argument("--backend", choices=INDEX_BACKENDS, default=None,
+                        help="ANN index backend (default: keep the current one, or FAISS_INDEX_BACKEND)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding batch")
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS, help="embedding processes (1 = in-process)")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the embedding cache")
+    args = parser.parse_args()
 
-print("✅ FAISS index built and saved at data/faiss_index")
+    embedding_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    stats = update_faiss_index(
+        embedding_model, args.docs, args.index,
+        rebuild=args.rebuild,
+        index_backend=args.backend,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        cache_dir=None if args.no_cache else EMBEDDING_CACHE_DIR,
+    )
+    print(f"✅ FAISS index updated at {args.index}: "
+          f"+{stats['added']} / -{stats['removed']} chunks, "
+          f"{stats['unchanged_files']} unchanged files skipped.")
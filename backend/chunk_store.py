@@ -0,0 +1,207 @@
+"""
+Pickle-free, memory-mapped store for the chunks behind the FAISS index.
+
+    data/faiss_index/
+        index.faiss                  # opened with faiss IO_FLAG_MMAP
+        chunks/columns.json          # row count and metadata column types
+        chunks/id.npy                # chunk id per FAISS position (fixed-width bytes)
+        chunks/id.sorted.npy         # the same ids sorted, and
+        chunks/id.order.npy          #   their positions, for id → position lookups
+        chunks/text.bin              # UTF-8 page_content of every chunk, back to back
+        chunks/text.offsets.npy      # int64 start offsets (n + 1) into text.bin
+        chunks/meta.<key>.npy        # int metadata columns
+        chunks/meta.<key>.bin        # str metadata columns (and JSON-encoded ones,
+        chunks/meta.<key>.offsets.npy  for lists or values missing on some chunks)
+
+Every array is opened with `mmap_mode="r"`, so loading reads a few hundred
+bytes of headers and nothing is deserialized: a chunk's text and metadata
+are sliced out of the mapped files when a search returns it. Worker
+processes serving the same index share the pages through the OS page cache
+instead of each holding a private copy of the docstore.
+"""
+import os
+import json
+import mmap
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+from langchain.schema import Document
+from langchain_community.docstore.base import Docstore
+
+# === Configuration ===
+CHUNK_STORE_DIR = "chunks"
+CHUNK_STORE_VERSION = 1
+COLUMNS_FILE = "columns.json"
+
+
+def _write_array(path: str, array: np.ndarray):
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(path + ".tmp", path)
+
+
+def _write_strings(path: str, values: Sequence[str]):
+    """`path`.bin with the UTF-8 strings back to back, `path`.offsets.npy with their bounds."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    with open(path + ".bin.tmp", "wb") as f:
+        for b in encoded:
+            f.write(b)
+    os.replace(path + ".bin.tmp", path + ".bin")
+    _write_array(path + ".offsets.npy", offsets)
+
+
+def _load_array(path: str) -> np.ndarray:
+    try:
+        # A plain ndarray view of the mapping: np.memmap indexing is several times slower.
+        return np.asarray(np.load(path, mmap_mode="r"))
+    except ValueError:  # numpy cannot map an empty array
+        return np.load(path)
+
+
+def _column_type(values: List[object]) -> str:
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return "int"
+    if all(isinstance(v, str) for v in values):
+        return "str"
+    return "json"
+
+
+def chunk_store_exists(index_path: str) -> bool:
+    return os.path.exists(os.path.join(index_path, CHUNK_STORE_DIR, COLUMNS_FILE))
+
+
+def write_chunk_store(index_path: str, ids: Sequence[str], docs: Sequence[Document]):
+    """
+    Write `docs` (one per FAISS position, with their docstore `ids`) under
+    `index_path`/chunks. Each file is replaced atomically and columns.json
+    last, so processes that still map the previous files are unaffected.
+    """
+    folder = os.path.join(index_path, CHUNK_STORE_DIR)
+    os.makedirs(folder, exist_ok=True)
+
+    id_bytes = np.array([i.encode("utf-8") for i in ids], dtype=bytes)
+    order = np.argsort(id_bytes, kind="stable").astype(np.int64)
+    _write_array(os.path.join(folder, "id.npy"), id_bytes)
+    _write_array(os.path.join(folder, "id.sorted.npy"), id_bytes[order])
+    _write_array(os.path.join(folder, "id.order.npy"), order)
+    _write_strings(os.path.join(folder, "text"), [d.page_content for d in docs])
+
+    keys: List[str] = []
+    for doc in docs:
+        keys.extend(k for k in doc.metadata if k not in keys)
+    columns: Dict[str, str] = {}
+    for key in keys:
+        values = [d.metadata.get(key) for d in docs]
+        kind = _column_type(values) if all(key in d.metadata for d in docs) else "json"
+        path = os.path.join(folder, f"meta.{key}")
+        if kind == "int":
+            _write_array(path + ".npy", np.asarray(values, dtype=np.int64))
+        elif kind == "str":
+            _write_strings(path, values)
+        else:  # missing keys are stored as null and left out again on read
+            _write_strings(path, [json.dumps(v, ensure_ascii=False) for v in values])
+        columns[key] = kind
+
+    path = os.path.join(folder, COLUMNS_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": CHUNK_STORE_VERSION, "count": len(ids), "columns": columns}, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+class _Strings:
+    """Read-only view of a string column written by `_write_strings`."""
+
+    def __init__(self, path: str):
+        self.offsets = _load_array(path + ".offsets.npy")
+        self.blob = b""
+        if os.path.getsize(path + ".bin"):
+            with open(path + ".bin", "rb") as f:
+                self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].decode("utf-8")
+
+
+class ChunkStore:
+    """Chunks of one index, read through mmap; rows are FAISS positions."""
+
+    def __init__(self, index_path: str):
+        folder = os.path.join(index_path, CHUNK_STORE_DIR)
+        with open(os.path.join(folder, COLUMNS_FILE), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != CHUNK_STORE_VERSION:
+            raise ValueError(f"Unsupported chunk store version in {folder}: {header.get('version')}")
+        self.count: int = header["count"]
+        self.ids = _load_array(os.path.join(folder, "id.npy"))
+        self._sorted_ids = _load_array(os.path.join(folder, "id.sorted.npy"))
+        self._order = _load_array(os.path.join(folder, "id.order.npy"))
+        self._text = _Strings(os.path.join(folder, "text"))
+        self._columns = []
+        for key, kind in header["columns"].items():
+            path = os.path.join(folder, f"meta.{key}")
+            self._columns.append((key, kind, _load_array(path + ".npy") if kind == "int" else _Strings(path)))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def id(self, position: int) -> str:
+        return self.ids[position].decode("utf-8")
+
+    def position(self, doc_id: str) -> Optional[int]:
+        """FAISS position of a chunk id (binary search over the sorted ids), or None."""
+        key = doc_id.encode("utf-8")
+        j = int(np.searchsorted(self._sorted_ids, key))
+        if j < self.count and self._sorted_ids[j] == key:
+            return int(self._order[j])
+        return None
+
+    def document(self, position: int) -> Document:
+        metadata = {}
+        for key, kind, column in self._columns:
+            if kind == "int":
+                metadata[key] = int(column[position])
+            elif kind == "str":
+                metadata[key] = column[position]
+            else:
+                value = json.loads(column[position])
+                if value is not None:
+                    metadata[key] = value
+        # The store was written from validated Documents; skip pydantic validation.
+        return Document.construct(page_content=self._text[position], metadata=metadata)
+
+
+class ChunkDocstore(Docstore):
+    """LangChain docstore over a `ChunkStore` (read-only)."""
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+
+    def search(self, search: str) -> Union[str, Document]:
+        position = self.store.position(search)
+        if position is None:
+            return f"ID {search} not found."
+        return self.store.document(position)
+
+    def position(self, doc_id: str) -> Optional[int]:
+        return self.store.position(doc_id)
+
+
+class PositionIds(Mapping):
+    """FAISS position → chunk id, the `index_to_docstore_id` of a mapped store."""
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+
+    def __getitem__(self, position: int) -> str:
+        if not 0 <= position < len(self.store):
+            raise KeyError(position)
+        return self.store.id(position)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self.store)))
+
+    def __len__(self) -> int:
+        return len(self.store)
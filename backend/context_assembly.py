@@ -0,0 +1,255 @@
+"""
+Context assembly between retrieval and the RAG prompt.
+
+Retrieved chunks overlap (ingest repeats sentences across chunk borders,
+hybrid retrieval can return near-identical passages) and most of their
+sentences do not bear on the question. `assemble_context()` drops repeated
+sentences and near-duplicate chunks, orders the rest by maximal marginal
+relevance (MMR) so the context covers different sources, and ranks every
+sentence by similarity to the query. `AssembledContext.render(budget)` then
+fills a token budget with the best sentences and prints them per chunk in
+document order, so each LLM provider can get a context sized to its quota
+(`Provider.context_tokens`) from a single assembly.
+
+The same chunks come back for many questions, so sentence vectors are kept
+in a `SentenceVectorCache` keyed by the hash of the sentence text and only
+sentences not seen before are embedded.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+from langchain.schema import Document
+
+from backend import metrics
+from backend.embedding_stage import text_hash
+from backend.llm_router import estimate_tokens
+from backend.text_utils import split_sentences
+
+# === Configuration ===
+# Prompt-context budget when the provider sets none.
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+# Chunks whose (mean sentence) embeddings are at least this similar are duplicates.
+CONTEXT_DEDUP_SIMILARITY = float(os.getenv("CONTEXT_DEDUP_SIMILARITY", "0.95"))
+# MMR trade-off: 1.0 = relevance only, 0.0 = diversity only.
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# Sentences scoring below this fraction of the best sentence are dropped,
+# except each chunk's best one.
+CONTEXT_MIN_RELATIVE_SCORE = float(os.getenv("CONTEXT_MIN_RELATIVE_SCORE", "0.5"))
+# Sentence vectors kept in memory across requests (0 = no cache).
+CONTEXT_VECTOR_CACHE_SIZE = int(os.getenv("CONTEXT_VECTOR_CACHE_SIZE", "50000"))
+
+_WS = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _WS.sub(" ", text).strip().lower()
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class SentenceVectorCache:
+    """
+    Process-local LRU of sentence vectors keyed by the hash of the sentence
+    text, in front of an `embed_documents` function. Vectors depend on the
+    model, so use one cache per query encoder.
+    """
+
+    def __init__(self, max_size: int = CONTEXT_VECTOR_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def embed(self, texts: List[str], embed_documents: Callable[[List[str]], List[List[float]]]) -> np.ndarray:
+        """Vectors of `texts` (float32, one row each); only uncached texts go to `embed_documents`."""
+        keys = [text_hash(t) for t in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._vectors:
+                    self._vectors.move_to_end(key)
+                    found[key] = self._vectors[key]
+        missing = {k: t for k, t in zip(keys, texts) if k not in found}
+        metrics.CONTEXT_VECTOR_CACHE.inc(len(keys) - len(missing), result="hit")
+        metrics.CONTEXT_VECTOR_CACHE.inc(len(missing), result="miss")
+        if missing:
+            vectors = np.asarray(embed_documents(list(missing.values())), dtype=np.float32)
+            found.update(zip(missing, vectors))
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    self._vectors[key] = vector
+                    self._vectors.move_to_end(key)
+                while len(self._vectors) > self.max_size:
+                    self._vectors.popitem(last=False)
+        return np.stack([found[k] for k in keys])
+
+
+@dataclass
+class _Sentence:
+    text: str
+    position: int  # order within its chunk
+    score: float = 0.0
+    tokens: int = 0
+    pinned: bool = False  # table header rows travel with any row of their table
+
+
+@dataclass
+class _Chunk:
+    doc: Document
+    sentences: List[_Sentence] = field(default_factory=list)
+
+
+@dataclass
+class AssembledContext:
+    """Deduplicated, MMR-ordered chunks with per-sentence relevance scores."""
+    chunks: List[_Chunk]
+    original_tokens: int
+
+    def __bool__(self) -> bool:
+        return bool(self.chunks)
+
+    def render(self, max_tokens: Optional[int] = None) -> str:
+        """
+        The best sentences that fit in `max_tokens` (default
+        CONTEXT_MAX_TOKENS), grouped by chunk in MMR order, each chunk's
+        sentences in their original order.
+        """
+        budget = max_tokens or CONTEXT_MAX_TOKENS
+        best = max((s.score for c in self.chunks for s in c.sentences), default=0.0)
+        floor = best * CONTEXT_MIN_RELATIVE_SCORE if best > 0 else float("-inf")
+
+        # Each chunk's best sentence first (in MMR order), then the rest by score.
+        candidates = []
+        for rank, chunk in enumerate(self.chunks):
+            ranked = sorted(chunk.sentences, key=lambda s: -s.score)
+            for i, sentence in enumerate(ranked):
+                if sentence.pinned or (i > 0 and sentence.score < floor):
+                    continue
+                candidates.append((0 if i == 0 else 1, rank if i == 0 else -sentence.score, rank, sentence))
+        candidates.sort(key=lambda c: c[:2])
+
+        chosen = {}
+        used = 0
+        for _, _, rank, sentence in candidates:
+            header = self._header(rank, chosen)
+            cost = sentence.tokens + (header.tokens if header else 0)
+            if used + cost > budget:
+                continue
+            chosen.setdefault(rank, []).append(sentence)
+            if header:
+                chosen[rank].append(header)
+            used += cost
+
+        blocks = []
+        for rank in sorted(chosen):
+            sentences = sorted(chosen[rank], key=lambda s: s.position)
+            blocks.append("\n".join(s.text for s in sentences))
+        return "\n\n".join(blocks)
+
+    def _header(self, rank: int, chosen: dict) -> Optional[_Sentence]:
+        """The chunk's pinned header row if it is not in the selection yet."""
+        pinned = [s for s in self.chunks[rank].sentences if s.pinned]
+        if pinned and rank not in chosen:
+            return pinned[0]
+        return None
+
+    def stats(self, max_tokens: Optional[int] = None) -> dict:
+        rendered = self.render(max_tokens)
+        return {
+            "chunks": len(self.chunks),
+            "original_tokens": self.original_tokens,
+            "context_tokens": estimate_tokens(rendered) if rendered else 0,
+        }
+
+
+def _split_chunk(doc: Document) -> List[_Sentence]:
+    text = doc.page_content
+    if doc.metadata.get("kind") == "table":
+        lines = [line for line in text.splitlines() if line.strip()]
+        sentences = [_Sentence(line.strip(), i) for i, line in enumerate(lines)]
+        if len(sentences) > 1:
+            sentences[0].pinned = True
+        return sentences
+    return [_Sentence(s.strip(), i) for i, s in enumerate(split_sentences(text)) if s.strip()]
+
+
+def _mmr_order(query: np.ndarray, vectors: np.ndarray, lam: float) -> List[int]:
+    relevance = vectors @ query
+    order: List[int] = []
+    remaining = list(range(len(vectors)))
+    while remaining:
+        if order:
+            redundancy = (vectors[remaining] @ vectors[order].T).max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = lam * relevance[remaining] - (1 - lam) * redundancy
+        order.append(remaining.pop(int(np.argmax(scores))))
+    return order
+
+
+def assemble_context(
+    query_vector: Sequence[float],
+    docs: Sequence[Document],
+    embed_documents: Callable[[List[str]], List[List[float]]],
+    mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+    dedup_similarity: float = CONTEXT_DEDUP_SIMILARITY,
+    cache: Optional[SentenceVectorCache] = None,
+) -> AssembledContext:
+    """
+    Split `docs` (best first) into sentences, drop sentences already seen in
+    an earlier chunk and chunks that are near-duplicates of an earlier one,
+    score sentences by cosine similarity to the query and order chunks by MMR.
+
+    `embed_documents` embeds a batch of texts with the same model as
+    `query_vector`; all sentences are embedded in one call, or only those
+    missing from `cache` if one is given.
+    """
+    original_tokens = sum(estimate_tokens(d.page_content) for d in docs if d.page_content.strip())
+
+    seen = set()
+    chunks: List[_Chunk] = []
+    for doc in docs:
+        sentences = []
+        for sentence in _split_chunk(doc):
+            key = _normalize(sentence.text)
+            if key in seen and not sentence.pinned:
+                continue
+            seen.add(key)
+            sentence.tokens = estimate_tokens(sentence.text)
+            sentences.append(sentence)
+        if any(not s.pinned for s in sentences):
+            chunks.append(_Chunk(doc, sentences))
+    if not chunks:
+        return AssembledContext([], original_tokens)
+
+    flat = [s for c in chunks for s in c.sentences]
+    texts = [s.text for s in flat]
+    if cache is not None and cache.max_size > 0:
+        vectors = _unit(cache.embed(texts, embed_documents))
+    else:
+        vectors = _unit(np.asarray(embed_documents(texts), dtype=np.float32))
+    query = _unit(np.asarray(query_vector, dtype=np.float32))
+    for sentence, score in zip(flat, vectors @ query):
+        sentence.score = float(score)
+
+    # Chunk vector = normalized mean of its sentence vectors.
+    bounds = np.cumsum([0] + [len(c.sentences) for c in chunks])
+    chunk_vectors = _unit(np.stack([vectors[a:b].mean(axis=0) for a, b in zip(bounds[:-1], bounds[1:])]))
+
+    keep: List[int] = []
+    for i in range(len(chunks)):
+        if keep and float((chunk_vectors[keep] @ chunk_vectors[i]).max()) >= dedup_similarity:
+            continue
+        keep.append(i)
+    order = _mmr_order(query, chunk_vectors[keep], mmr_lambda)
+    return AssembledContext([chunks[keep[i]] for i in order], original_tokens)
@@ -0,0 +1,166 @@
+"""
+Interchangeable runtimes for the query encoder (all-MiniLM-L6-v2).
+
+    torch      sentence-transformers on PyTorch (default)
+    onnx       ONNX Runtime export of the same model
+    onnx-int8  ONNX Runtime export with dynamically quantized int8 weights
+
+The ONNX backends tokenize with the Rust `tokenizers` fast tokenizer and
+apply the model's own mean pooling and normalization in NumPy, so their
+vectors live in the same space as the torch vectors the FAISS index was
+built with, and encoding a query never imports torch. The process still
+loads torch for the Marian translators (every TRANSLATION_BACKEND goes
+through transformers / optimum), so this saves the encoder's share of
+startup and memory, not torch itself. Only questions (and
+the context sentences compared against them) are encoded with the selected
+backend; index builds always use torch. Check that a backend retrieves the
+same chunks before switching with notebooks/embedding_benchmark.py.
+
+Exports are written once to `ONNX_MODEL_DIR` and loaded from there
+afterwards; run this module to export ahead of deploys:
+
+    python backend/embedding_backends.py --backend onnx-int8
+"""
+import os
+import json
+import logging
+import argparse
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "data/models/onnx")
+# ONNX Runtime intra-op threads (0 = one per core).
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+ENCODER_CONFIG_FILE = "encoder.json"
+
+
+def _export_dir(model_name: str, quantized: bool) -> str:
+    name = model_name.replace("/", "__") + ("-int8" if quantized else "")
+    return os.path.join(ONNX_MODEL_DIR, name)
+
+
+def _write_encoder_config(model_name: str, path: str):
+    """Record the pooling, normalization and sequence length of the sentence-transformers model."""
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(model_name, device="cpu")
+    pooling = next(m for m in model if isinstance(m, Pooling))
+    if pooling.get_pooling_mode_str() != "mean":
+        raise ValueError(f"{model_name}: only mean pooling is supported, not {pooling.get_pooling_mode_str()}")
+    config = {
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "normalize": any(isinstance(m, Normalize) for m in model),
+    }
+    with open(os.path.join(path, ENCODER_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+
+def export_onnx(model_name: str, quantized: bool = False) -> str:
+    """Export (and optionally quantize) a sentence-transformers model to ONNX. Returns its directory."""
+    fp32_dir = _export_dir(model_name, quantized=False)
+    int8_dir = _export_dir(model_name, quantized=True)
+    path = int8_dir if quantized else fp32_dir
+    if os.path.exists(os.path.join(path, ENCODER_CONFIG_FILE)):
+        return path  # exported before: no optimum / torch import
+    import shutil
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    if not os.path.exists(os.path.join(fp32_dir, ENCODER_CONFIG_FILE)):
+        logger.info(f"📦 Exporting {model_name} to ONNX...")
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(fp32_dir)
+        AutoTokenizer.from_pretrained(model_name, use_fast=True).save_pretrained(fp32_dir)
+        _write_encoder_config(model_name, fp32_dir)
+    if not quantized:
+        return fp32_dir
+
+    logger.info(f"📦 Quantizing {model_name} ONNX export to int8...")
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    quantizer = ORTQuantizer.from_pretrained(fp32_dir, file_name="model.onnx")
+    quantizer.quantize(save_dir=int8_dir, quantization_config=qconfig)
+    # The encoder config goes last: it marks the export as complete.
+    for file in ("tokenizer.json", ENCODER_CONFIG_FILE):
+        shutil.copy(os.path.join(fp32_dir, file), os.path.join(int8_dir, file))
+    return int8_dir
+
+
+class OnnxEmbeddings(Embeddings):
+    """Mean-pooled (and normalized) sentence embeddings from an ONNX export, without torch."""
+
+    def __init__(self, path: str, file_name: str = "model.onnx", threads: int = EMBEDDING_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(path, ENCODER_CONFIG_FILE), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.normalize = config["normalize"]
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(os.path.join(path, file_name), options,
+                                            providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(["last_hidden_state"], feeds)[0]
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def load_query_encoder(model_name: str, backend: str = EMBEDDING_BACKEND) -> Embeddings:
+    """The embedding model for questions on the chosen runtime."""
+    if backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=model_name)
+    if backend in ("onnx", "onnx-int8"):
+        quantized = backend == "onnx-int8"
+        return OnnxEmbeddings(export_onnx(model_name, quantized=quantized),
+                              file_name="model_quantized.onnx" if quantized else "model.onnx")
+    raise ValueError(f"Unknown embedding backend: {backend} (choose from {EMBEDDING_BACKENDS})")
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from backend import metrics
+    from backend.build_faiss_index import EMBEDDING_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Export the query encoder for an ONNX backend.")
+    parser.add_argument("--backend", choices=("onnx", "onnx-int8"), default="onnx-int8")
+    args = parser.parse_args()
+    metrics.configure_logging()
+    print(f"✅ {EMBEDDING_MODEL_NAME} → {export_onnx(EMBEDDING_MODEL_NAME, quantized=args.backend == 'onnx-int8')}")
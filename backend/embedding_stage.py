@@ -0,0 +1,182 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# === Configuration ===
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+
+
+def text_hash(text: str) -> str:
+    """Cache key of a chunk: the hash of its text alone, so moved chunks still hit."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of chunk vectors for one embedding model.
+
+    Vectors are stored as a flat float16 file that is memory-mapped for reads,
+    with the chunk hash of every row kept in `keys.txt`. New vectors are only
+    ever appended; rows are written before their keys so an interrupted write
+    never exposes a key without its vector.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str):
+        self.path = os.path.join(cache_dir, model_name.replace("/", "__"))
+        self._vectors_file = os.path.join(self.path, "vectors.f16")
+        self._keys_file = os.path.join(self.path, "keys.txt")
+        self._meta_file = os.path.join(self.path, "meta.json")
+        self.dim: Optional[int] = None
+        self._rows: Dict[str, int] = {}
+        self._mmap: Optional[np.memmap] = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._meta_file):
+            return
+        with open(self._meta_file, "r", encoding="utf-8") as f:
+            self.dim = json.load(f)["dim"]
+        row_bytes = self.dim * 2
+        size = os.path.getsize(self._vectors_file) if os.path.exists(self._vectors_file) else 0
+        data = b""
+        if os.path.exists(self._keys_file):
+            with open(self._keys_file, "rb") as f:
+                data = f.read()
+        lines = data.split(b"\n")[:-1]  # the last piece is empty or a partly written key
+        keys = [line.decode("utf-8") for line in lines[:size // row_bytes]]
+        # Cut off what an interrupted write left behind (rows without keys, a
+        # partial key line) so the next append numbers rows and keys alike.
+        keys_bytes = sum(len(line) + 1 for line in lines[:len(keys)])
+        if size != len(keys) * row_bytes:
+            with open(self._vectors_file, "r+b") as f:
+                f.truncate(len(keys) * row_bytes)
+        if len(data) != keys_bytes:
+            with open(self._keys_file, "r+b") as f:
+                f.truncate(keys_bytes)
+        self._rows = {k: i for i, k in enumerate(keys)}
+        self._mmap = None
+
+    def _vectors(self) -> np.memmap:
+        if self._mmap is None:
+            n_rows = len(self._rows)
+            self._mmap = np.memmap(self._vectors_file, dtype=np.float16, mode="r",
+                                   shape=(n_rows, self.dim))
+        return self._mmap
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return float32 vectors for the keys that are cached."""
+        hits = [(k, self._rows[k]) for k in keys if k in self._rows]
+        if not hits:
+            return {}
+        vectors = self._vectors()
+        return {k: np.asarray(vectors[row], dtype=np.float32) for k, row in hits}
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray):
+        new = [(k, v) for k, v in zip(keys, vectors) if k not in self._rows]
+        if not new:
+            return
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._meta_file, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim}, f)
+        block = np.stack([v for _, v in new]).astype(np.float16)
+        with open(self._vectors_file, "ab") as f:
+            f.write(block.tobytes())
+        with open(self._keys_file, "a", encoding="utf-8") as f:
+            f.write("".join(k + "\n" for k, _ in new))
+        start = len(self._rows)
+        for i, (k, _) in enumerate(new):
+            self._rows[k] = start + i
+        self._mmap = None
+
+
+# ---------- Worker processes ----------
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    return _worker_model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
+
+# ---------- Stage ----------
+
+def _length_sorted_batches(texts: Sequence[str], batch_size: int) -> List[List[int]]:
+    """Group text positions into batches of similar length to minimise padding."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def embed_texts(
+    texts: Sequence[str],
+    embedding_model,
+    model_name: str,
+    batch_size: int = EMBED_BATCH_SIZE,
+    workers: int = EMBED_WORKERS,
+    cache_dir: Optional[str] = EMBEDDING_CACHE_DIR,
+) -> np.ndarray:
+    """
+    Embed `texts` for indexing, reusing cached vectors for unchanged text.
+
+    Missing texts are sorted by length and encoded in batches, either in-process
+    with `embedding_model.embed_documents` or, with `workers > 1`, across a pool
+    of CPU processes that each load `model_name`. Results are written to the
+    cache before returning.
+
+    Returns a float32 array with one row per input text, in input order.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    keys = [text_hash(t) for t in texts]
+    cache = EmbeddingCache(cache_dir, model_name) if cache_dir else None
+    found = cache.get_many(keys) if cache is not None else {}
+
+    missing_keys: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in found:
+            missing_keys.setdefault(key, text)
+    missing_texts = list(missing_keys.values())
+
+    if missing_texts:
+        batches = [[missing_texts[i] for i in batch]
+                   for batch in _length_sorted_batches(missing_texts, batch_size)]
+        if workers > 1:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_name, threads)) as pool:
+                encoded = list(pool.map(_encode_in_worker, batches))
+        else:
+            encoded = [np.asarray(embedding_model.embed_documents(b), dtype=np.float32)
+                       for b in batches]
+
+        batch_keys = [text_hash(t) for batch in batches for t in batch]
+        # Round through float16 so fresh and cached vectors are identical.
+        vectors = np.concatenate(encoded).astype(np.float16).astype(np.float32)
+        found.update(zip(batch_keys, vectors))
+        if cache is not None:
+            cache.put_many(batch_keys, vectors)
+
+    return np.stack([found[k] for k in keys]).astype(np.float32)
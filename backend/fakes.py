@@ -0,0 +1,146 @@
+"""
+Deterministic local stand-ins for the network services the pipeline calls.
+
+They need no API keys or network access and can inject latency and errors,
+so routing, fallback and performance behaviour can be exercised offline.
+"""
+import time
+import random
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterator, Sequence, Union
+
+
+@dataclass
+class FakeMessage:
+    content: str
+
+
+class FakeLLM:
+    """
+    Chat-model stand-in with the `invoke` / `ainvoke` / `stream` interface of
+    LangChain chat models.
+
+    Args:
+        responses: Answers returned in turn, or a function of the prompt.
+        latency_s: Base latency of every call.
+        jitter_s: Extra uniformly random latency in [0, jitter_s].
+        error_rate: Probability that a call raises `error`.
+        error: Exception raised on injected failures.
+        seed: Seed for latency jitter and error injection.
+    """
+
+    def __init__(
+        self,
+        responses: Union[Sequence[str], Callable[[str], str]] = ("This is a test answer.",),
+        latency_s: float = 0.0,
+        jitter_s: float = 0.0,
+        error_rate: float = 0.0,
+        error: Exception = RuntimeError("503 Service Unavailable"),
+        seed: int = 0,
+    ):
+        self.responses = responses
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.error = error
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next(self, prompt: str):
+        """Pick (latency, fail?, answer) for one call."""
+        with self._lock:
+            self.calls += 1
+            latency = self.latency_s + self._rng.uniform(0, self.jitter_s)
+            fail = self._rng.random() < self.error_rate
+            if callable(self.responses):
+                answer = self.responses(prompt)
+            else:
+                answer = self.responses[(self.calls - 1) % len(self.responses)]
+        return latency, fail, answer
+
+    def invoke(self, prompt: str) -> FakeMessage:
+        latency, fail, answer = self._next(prompt)
+        time.sleep(latency)
+        if fail:
+            raise self.error
+        return FakeMessage(answer)
+
+    async def ainvoke(self, prompt: str) -> FakeMessage:
+        latency, fail, answer = self._next(prompt)
+        await asyncio.sleep(latency)
+        if fail:
+            raise self.error
+        return FakeMessage(answer)
+
+    def stream(self, prompt: str) -> Iterator[FakeMessage]:
+        """Yield the answer word by word, spreading the latency over the words."""
+        latency, fail, answer = self._next(prompt)
+        words = answer.split(" ")
+        if fail:
+            time.sleep(latency)
+            raise self.error
+        for i, word in enumerate(words):
+            time.sleep(latency / len(words))
+            yield FakeMessage(word if i == len(words) - 1 else word + " ")
+
+
+class FakeTTSEngine:
+    """
+    TTS engine stand-in (see `backend.tts_response.TTSEngine`): returns bytes
+    derived from the text after `latency_s`, and counts calls.
+    """
+    name = "fake"
+    format = "mp3"
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s)
+        return f"[{lang}:{text}]".encode("utf-8")
+
+    def concat(self, clips) -> bytes:
+        return b"".join(clips)
+
+
+class FakeRecognizer:
+    """
+    Speech-recognizer stand-in (see `app.voice_input.Recognizer`).
+
+    Args:
+        results: {locale: (text, confidence)}; other locales understand nothing.
+        latency_s: Latency of every call, or {locale: latency}.
+        errors: {locale: exception} raised for those locales.
+    """
+    name = "fake"
+
+    def __init__(self, results=None, latency_s=0.0, errors=None):
+        self.results = results or {}
+        self.latency_s = latency_s
+        self.errors = errors or {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def load(self, wav_bytes: bytes):
+        return wav_bytes
+
+    def recognize(self, audio, language: str):
+        from app.voice_input import Hypothesis
+
+        with self._lock:
+            self.calls.append(language)
+        latency = self.latency_s.get(language, 0.0) if isinstance(self.latency_s, dict) else self.latency_s
+        time.sleep(latency)
+        if language in self.errors:
+            raise self.errors[language]
+        if language not in self.results:
+            return None
+        text, confidence = self.results[language]
+        return Hypothesis(text, confidence)
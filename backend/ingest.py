@@ -0,0 +1,357 @@
+"""
+PDF ingestion: data/pdfs/*.pdf → data/cleaned_docs/<name>.jsonl
+
+    python backend/ingest.py --workers 8
+
+Pages are extracted by a process pool (a few pages per task, with a bounded
+number of tasks in flight across PDFs) and consumed in page order. Each PDF's chunks are written
+out as its pages arrive, so nothing holds a whole document in memory.
+Tables found by pdfplumber are kept as rows. Their chunks repeat the
+header row and never mix with running text. Text is packed sentence by
+sentence into chunks of at most CHUNK_TOKENS embedding-model tokens, with
+about OVERLAP_TOKENS of overlap. Every chunk records its source PDF and
+page range.
+
+One JSON object per line:
+
+    {"text": ..., "source": "PM-Kisan Scheme.pdf", "page": 3, "pages": [3, 4],
+     "chunk": 12, "kind": "text"}
+    {"text": "Crop | Dose\\nRice | 120 kg", "kind": "table",
+     "rows": [["Crop", "Dose"], ["Rice", "120 kg"]], ...}
+
+PDFs whose hash is unchanged since the last run are skipped (see
+`ingest_manifest.json` in the output folder). `build_faiss_index.py` picks
+up the .jsonl files and prefers them over a .txt with the same name.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import hashlib
+import json
+import re
+import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Deque, Iterable, Iterator, List, Tuple
+
+from backend import metrics
+from backend.text_utils import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+PDF_FOLDER = "data/pdfs"
+OUTPUT_FOLDER = "data/cleaned_docs"
+INGEST_MANIFEST_FILE = "ingest_manifest.json"
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+PAGES_PER_TASK = 4
+TOKENIZER_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# MiniLM truncates at 256 word pieces; leave room for special tokens.
+CHUNK_TOKENS = int(os.getenv("INGEST_CHUNK_TOKENS", "200"))
+OVERLAP_TOKENS = int(os.getenv("INGEST_OVERLAP_TOKENS", "40"))
+
+# A page is a list of blocks: ("text", str) or ("table", [[cell, ...], ...]).
+Block = Tuple[str, object]
+
+
+# ---------- Extraction (runs in worker processes) ----------
+
+def _clean_cell(cell) -> str:
+    return re.sub(r"\s+", " ", str(cell)).strip() if cell is not None else ""
+
+
+def extract_pages(pdf_path: str, first: int, last: int) -> List[List[Block]]:
+    """Blocks of pages [first, last) (0-based): text outside tables, then each table."""
+    import pdfplumber
+
+    pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[first:last]:
+            blocks: List[Block] = []
+            tables = page.find_tables()
+            text_area = page
+            for table in tables:
+                text_area = text_area.outside_bbox(table.bbox)
+            text = text_area.extract_text() or ""
+            if text.strip():
+                blocks.append(("text", text))
+            for table in tables:
+                rows = [[_clean_cell(c) for c in row] for row in table.extract()]
+                rows = [row for row in rows if any(row)]
+                if rows:
+                    blocks.append(("table", rows))
+            pages.append(blocks)
+            page.flush_cache()
+    return pages
+
+
+def page_count(pdf_path: str) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+# ---------- Token-aware chunking ----------
+
+@lru_cache(maxsize=1)
+def _tokenizer():
+    try:
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+    except Exception as e:
+        logger.warning(f"⚠️ Tokenizer unavailable ({e}); estimating tokens from words.")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Word-piece tokens of `text` for the embedding model (estimated without it)."""
+    tokenizer = _tokenizer()
+    if tokenizer is None:
+        return int(len(text.split()) * 1.3) + 1
+    return len(tokenizer.tokenize(text))
+
+
+def _split_oversized(sentence: str, limit: int) -> List[str]:
+    """Break a sentence longer than `limit` tokens at word boundaries."""
+    pieces, current = [], []
+    for word in sentence.split():
+        if current and count_tokens(" ".join(current + [word])) > limit:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+class TextChunker:
+    """
+    Packs (sentence, page) pairs into chunks of at most `max_tokens`, starting
+    each chunk with the last sentences of the previous one (up to
+    `overlap_tokens`). Chunks come out as soon as they are full.
+    """
+
+    def __init__(self, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = OVERLAP_TOKENS):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self._sentences: List[Tuple[str, int, int]] = []  # (text, page, tokens)
+        self._tokens = 0
+        self._fresh = False  # True once something beyond the overlap was added
+
+    def add(self, sentence: str, page: int) -> Iterator[dict]:
+        sentence = sentence.strip()
+        if not sentence:
+            return
+        tokens = count_tokens(sentence)
+        if tokens > self.max_tokens:
+            for piece in _split_oversized(sentence, self.max_tokens):
+                yield from self.add(piece, page)
+            return
+        if self._tokens + tokens > self.max_tokens and self._fresh:
+            yield self._emit()
+            self._keep_overlap()
+            while self._tokens + tokens > self.max_tokens:
+                self._tokens -= self._sentences.pop(0)[2]
+        self._sentences.append((sentence, page, tokens))
+        self._tokens += tokens
+        self._fresh = True
+
+    def flush(self) -> Iterator[dict]:
+        if self._fresh:
+            yield self._emit()
+        self._sentences, self._tokens, self._fresh = [], 0, False
+
+    def _emit(self) -> dict:
+        pages = [p for _, p, _ in self._sentences]
+        return {
+            "text": " ".join(s for s, _, _ in self._sentences),
+            "page": pages[0],
+            "pages": [pages[0], pages[-1]],
+            "kind": "text",
+        }
+
+    def _keep_overlap(self):
+        kept, tokens = [], 0
+        for item in reversed(self._sentences):
+            if tokens + item[2] > self.overlap_tokens:
+                break
+            kept.insert(0, item)
+            tokens += item[2]
+        self._sentences, self._tokens, self._fresh = kept, tokens, False
+
+
+def _table_line(row: List[str]) -> str:
+    return " | ".join(row)
+
+
+def chunk_table(rows: List[List[str]], page: int, max_tokens: int = CHUNK_TOKENS) -> Iterator[dict]:
+    """Split a table into chunks of whole rows, each starting with the header row."""
+    header, body = rows[0], rows[1:] or []
+    header_tokens = count_tokens(_table_line(header))
+    current: List[List[str]] = []
+    tokens = header_tokens
+    for row in body:
+        row_tokens = count_tokens(_table_line(row))
+        if current and tokens + row_tokens > max_tokens:
+            yield _table_chunk([header] + current, page)
+            current, tokens = [], header_tokens
+        current.append(row)
+        tokens += row_tokens
+    if current or not body:
+        yield _table_chunk([header] + current, page)
+
+
+def _table_chunk(rows: List[List[str]], page: int) -> dict:
+    return {
+        "text": "\n".join(_table_line(r) for r in rows),
+        "page": page,
+        "pages": [page, page],
+        "kind": "table",
+        "rows": rows,
+    }
+
+
+def chunk_pages(pages: Iterable[Tuple[int, List[Block]]], source: str) -> Iterator[dict]:
+    """Chunks of a document given its (1-based page number, blocks) in order."""
+    chunker = TextChunker()
+    n = 0
+    for page_no, blocks in pages:
+        for kind, content in blocks:
+            if kind == "table":
+                # Text before the table is closed off so chunks never straddle it.
+                chunks = list(chunker.flush()) + list(chunk_table(content, page_no))
+            else:
+                # PDF line breaks are layout, not structure: rejoin before splitting.
+                text = re.sub(r"\s*\n\s*", " ", content)
+                chunks = [c for s in split_sentences(text) for c in chunker.add(s, page_no)]
+            for chunk in chunks:
+                yield {**chunk, "source": source, "chunk": n}
+                n += 1
+    for chunk in chunker.flush():
+        yield {**chunk, "source": source, "chunk": n}
+        n += 1
+
+
+# ---------- Driver ----------
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def output_name(pdf_file: str) -> str:
+    return os.path.splitext(pdf_file)[0] + ".jsonl"
+
+
+def _load_manifest(output_folder: str) -> dict:
+    path = os.path.join(output_folder, INGEST_MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"chunk_tokens": CHUNK_TOKENS, "overlap_tokens": OVERLAP_TOKENS, "files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: dict, output_folder: str):
+    path = os.path.join(output_folder, INGEST_MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def ingest(
+    pdf_folder: str = PDF_FOLDER,
+    output_folder: str = OUTPUT_FOLDER,
+    workers: int = INGEST_WORKERS,
+    force: bool = False,
+) -> dict:
+    """
+    Extract and chunk every PDF in `pdf_folder` whose content changed since
+    the last run. Returns counts of ingested/skipped files, pages and chunks.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = _load_manifest(output_folder)
+    if (manifest.get("chunk_tokens"), manifest.get("overlap_tokens")) != (CHUNK_TOKENS, OVERLAP_TOKENS):
+        force = True  # chunking settings changed: every output is stale
+        manifest = {"chunk_tokens": CHUNK_TOKENS, "overlap_tokens": OVERLAP_TOKENS, "files": {}}
+    files = manifest["files"]
+
+    todo = []
+    stats = {"ingested": 0, "skipped": 0, "pages": 0, "chunks": 0}
+    for pdf_file in sorted(f for f in os.listdir(pdf_folder) if f.lower().endswith(".pdf")):
+        path = os.path.join(pdf_folder, pdf_file)
+        file_hash = _sha256_file(path)
+        entry = files.get(pdf_file)
+        if (not force and entry and entry["sha256"] == file_hash
+                and os.path.exists(os.path.join(output_folder, output_name(pdf_file)))):
+            stats["skipped"] += 1
+            continue
+        todo.append((pdf_file, path, file_hash, page_count(path)))
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    max_in_flight = 2 * workers
+    try:
+        # Page batches of all PDFs in file and page order. A bounded window of
+        # them is in flight so all cores stay busy across file boundaries,
+        # while only the pages not yet chunked are held in memory.
+        tasks = iter([(path, a, min(a + PAGES_PER_TASK, n_pages))
+                      for _, path, _, n_pages in todo for a in range(0, n_pages, PAGES_PER_TASK)])
+        window: Deque[Future] = deque()
+
+        def _next_batch() -> List[List[Block]]:
+            if not pool:
+                return extract_pages(*next(tasks))
+            while len(window) < max_in_flight:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                window.append(pool.submit(extract_pages, *task))
+            return window.popleft().result()
+
+        for pdf_file, _, file_hash, n_pages in todo:
+            def _pages(n_pages=n_pages):
+                page_no = 1
+                for _ in range(0, n_pages, PAGES_PER_TASK):
+                    for blocks in _next_batch():
+                        yield page_no, blocks
+                        page_no += 1
+
+            out_path = os.path.join(output_folder, output_name(pdf_file))
+            n_chunks = 0
+            with open(out_path + ".tmp", "w", encoding="utf-8") as out:
+                for chunk in chunk_pages(_pages(), source=pdf_file):
+                    out.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                    n_chunks += 1
+            os.replace(out_path + ".tmp", out_path)
+
+            files[pdf_file] = {"sha256": file_hash, "pages": n_pages, "chunks": n_chunks}
+            _save_manifest(manifest, output_folder)
+            stats["ingested"] += 1
+            stats["pages"] += n_pages
+            stats["chunks"] += n_chunks
+            logger.info(f"📄 {pdf_file}: {n_pages} pages → {n_chunks} chunks")
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract and chunk PDFs for the FAISS index.")
+    parser.add_argument("--pdfs", default=PDF_FOLDER, help="folder with source PDFs")
+    parser.add_argument("--out", default=OUTPUT_FOLDER, help="folder for the .jsonl chunk files")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="extraction processes (1 = in-process)")
+    parser.add_argument("--force", action="store_true", help="re-ingest PDFs even if unchanged")
+    args = parser.parse_args()
+
+    metrics.configure_logging()
+    stats = ingest(args.pdfs, args.out, workers=args.workers, force=args.force)
+    print(f"✅ Ingested {stats['ingested']} PDFs ({stats['pages']} pages, {stats['chunks']} chunks), "
+          f"{stats['skipped']} unchanged skipped. Run backend/build_faiss_index.py to update the index.")
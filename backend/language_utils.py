@@ -1,21 +1,92 @@
+import re
+from functools import lru_cache
+
 from langdetect import detect, DetectorFactory
 
 # Ensures consistent results from langdetect
 DetectorFactory.seed = 0
 
+ENGLISH = "en"
+HINDI = "hi"
+HINGLISH = "hi-Latn"  # Hindi written in Latin script
+
 SUPPORTED_LANGUAGES = {
-    "en": "english",
-    "hi": "hindi"
+    ENGLISH: "English",
+    HINDI: "Hindi",
+    HINGLISH: "Hinglish",
 }
 
+# Share of letters that must be Devanagari for text to count as Hindi.
+DEVANAGARI_MIN_RATIO = 0.3
+# Share of words that must be romanized-Hindi words for text to count as Hinglish.
+HINGLISH_MIN_RATIO = 0.25
+
+_WORD = re.compile(r"[a-z]+")
+
+# Frequent romanized Hindi words that are not also English words. Scheme
+# names (PM-Kisan, Fasal Bima Yojana, Jan Dhan) are left out on purpose: they
+# turn up in English questions just as often.
+_HINGLISH_WORDS = frozenset("""
+    kya kyaa kaise kaisa kaisi kaun kab kahan kahaan kyun kyon kitna kitni kitne
+    hai hain hoga hogi honge tha thi hota hoti hote hua hui hue raha rahi rahe
+    ka ki ke ko se mein mai mujhe mujhko hamara hamari hamare humko aap apna apni apne
+    mera meri mere uska uski uske iska iski iske yeh woh voh
+    aur lekin pe tak bhi sirf bahut thoda jyada zyada sab kuch koi
+    nahi nahin haan bhai bhaiya sahab
+    karna karne karo karein kare kariye karte karta karti kiya kiye
+    chahiye chahie milega milegi milta milti milna lena dete deta liye diya
+    batao bataiye bataye batayein samjhao
+    kheti fasalon beej khad khaad paani pani mitti zameen jameen
+    dhaan gehu gehun makka sarson ganna kapas sabzi sabji keeda keede dawa
+    sarkari paisa rupaye kist kisht
+""".split())
+
+
+def _script_counts(text: str):
+    devanagari = latin = 0
+    for ch in text:
+        if "ऀ" <= ch <= "ॿ":
+            devanagari += 1
+        elif ch.isascii() and ch.isalpha():
+            latin += 1
+    return devanagari, latin
+
+
+def _hinglish_ratio(text: str) -> tuple:
+    words = _WORD.findall(text.lower())
+    hits = sum(1 for w in words if w in _HINGLISH_WORDS)
+    return hits, (hits / len(words) if words else 0.0)
+
+
+@lru_cache(maxsize=4096)
 def detect_language(text: str) -> str:
     """
-    Detects the language of the input text.
-    Returns 'english' or 'hindi' for known languages, 
-    otherwise returns the ISO language code.
+    Identify the language of a question: "en", "hi" or "hi-Latn" (Hinglish).
+
+    Decided in order by (1) the share of Devanagari letters, (2) a lexicon of
+    romanized Hindi words, and only for ambiguous Latin text (3) langdetect.
+    Anything that is not Hindi or Hinglish is treated as English.
     """
+    devanagari, latin = _script_counts(text)
+    if devanagari + latin == 0:
+        return ENGLISH
+    if devanagari / (devanagari + latin) >= DEVANAGARI_MIN_RATIO:
+        return HINDI
+
+    hits, ratio = _hinglish_ratio(text)
+    if hits >= 2 and ratio >= HINGLISH_MIN_RATIO:
+        return HINGLISH
+    if hits == 0:
+        return ENGLISH
+
+    # A single romanized Hindi word, or a low ratio: let langdetect break the tie.
+    # It has no Hinglish class, but rarely calls romanized Hindi English.
     try:
-        lang_code = detect(text)
-        return SUPPORTED_LANGUAGES.get(lang_code, lang_code)
+        return ENGLISH if detect(text) == "en" else HINGLISH
     except Exception:
-        return "unknown"
+        return ENGLISH
+
+
+def answer_language(lang: str) -> str:
+    """Language the answer is given (and spoken) in: Hinglish questions get Hindi answers."""
+    return HINDI if lang in (HINDI, HINGLISH) else ENGLISH
@@ -0,0 +1,493 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from backend import metrics
+
+# === Configuration ===
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "30"))
+# Start the next provider if the current one has not answered after this long (unset = off).
+LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "0")) or None
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+# How long a request may wait for quota when every provider is rate limited.
+RATE_LIMIT_MAX_WAIT_S = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT_S", "10"))
+# Every Nth request uses the configured order, so demoted providers get re-measured.
+PROBE_EVERY = int(os.getenv("LLM_PROBE_EVERY", "10"))
+# How often a request waiting for a provider with all its call slots busy checks again.
+BUSY_RETRY_S = 0.05
+
+
+class AllProvidersFailed(RuntimeError):
+    """No provider produced an answer (errors, open circuits or exhausted quota)."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt-token count (~4 characters per token) for quota accounting."""
+    return max(1, len(text) // 4)
+
+
+# A prompt, or a function that builds one for a given provider (e.g. a RAG
+# prompt whose context is cut to that provider's `context_tokens`).
+PromptSpec = Union[str, Callable[["Provider"], str]]
+
+
+class _Prompts:
+    """Renders a PromptSpec at most once per provider."""
+
+    def __init__(self, spec: PromptSpec):
+        self.spec = spec
+        self._rendered: Dict[str, str] = {}
+
+    def text(self, provider: "Provider") -> str:
+        if isinstance(self.spec, str):
+            return self.spec
+        if provider.name not in self._rendered:
+            self._rendered[provider.name] = self.spec(provider)
+        return self._rendered[provider.name]
+
+    def cost(self, provider: "Provider") -> int:
+        return estimate_tokens(self.text(provider))
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`. Thread-safe, non-blocking."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "TokenBucket":
+        return cls(rate=limit / 60.0, capacity=limit)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self, cost: float = 1) -> bool:
+        with self._lock:
+            self._refill()
+            return self._tokens >= min(cost, self.capacity)
+
+    def take(self, cost: float = 1):
+        with self._lock:
+            self._refill()
+            self._tokens -= min(cost, self.capacity)
+
+    def wait_time(self, cost: float = 1) -> float:
+        """Seconds until `cost` tokens are available."""
+        with self._lock:
+            self._refill()
+            missing = min(cost, self.capacity) - self._tokens
+            return max(0.0, missing / self.rate) if self.rate else float("inf")
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; after `reset_s` lets
+    a single trial call through (half-open) and closes again if it succeeds.
+    A trial that is abandoned (lost a hedge race, stream dropped by its
+    consumer) says nothing about the provider, so the next call may try again.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_s: float = BREAKER_RESET_S):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_s:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def record_abandoned(self):
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at = time.monotonic() - self.reset_s
+
+
+class Provider:
+    """
+    One LLM backend behind the router, with its own quota, circuit breaker
+    and latency/error statistics.
+
+    `llm` is any LangChain-style chat model (`invoke`, `ainvoke`, `stream`).
+    `rpm` / `tpm` are the provider's requests- and tokens-per-minute quota.
+    `context_tokens` is the retrieved-context budget for prompts built per
+    provider (None = the default budget, see backend.context_assembly).
+    `max_concurrency` caps the calls in flight (None = no cap); further
+    requests go to the next provider or wait for a free slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        llm,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        timeout_s: float = LLM_TIMEOUT_S,
+        breaker: Optional[CircuitBreaker] = None,
+        context_tokens: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.name = name
+        self.context_tokens = context_tokens
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.llm = llm
+        self.timeout_s = timeout_s
+        self.breaker = breaker or CircuitBreaker()
+        self._requests = TokenBucket.per_minute(rpm) if rpm else None
+        self._tokens = TokenBucket.per_minute(tpm) if tpm else None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.tokens = 0
+        self.latency_ewma_s: Optional[float] = None
+        self.error_rate_ewma = 0.0
+
+    # --- admission ---
+    def _buckets(self, cost: int):
+        return [(b, c) for b, c in ((self._requests, 1), (self._tokens, cost)) if b]
+
+    def _busy(self) -> bool:
+        return self.max_concurrency is not None and self.in_flight >= self.max_concurrency
+
+    def admit(self, cost: int) -> Optional[str]:
+        """
+        Reserve quota and a call slot. Returns None if admitted (the caller
+        must `release()` the slot when the call ends), else the reason it was not.
+        """
+        with self._lock:
+            if any(not b.available(c) for b, c in self._buckets(cost)):
+                return "rate limited"
+            if self._busy():
+                return "busy"
+            if not self.breaker.allow():
+                return "circuit open"
+            for b, c in self._buckets(cost):
+                b.take(c)
+            self.tokens += cost
+            self.in_flight += 1
+            metrics.LLM_TOKENS.inc(cost, provider=self.name)
+            return None
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def quota_wait_time(self, cost: int) -> float:
+        """Seconds until quota for `cost` tokens is available (polling while all slots are busy)."""
+        wait = max([b.wait_time(c) for b, c in self._buckets(cost)], default=0.0)
+        with self._lock:
+            return max(wait, BUSY_RETRY_S) if self._busy() else wait
+
+    # --- bookkeeping ---
+    def _observe_latency(self, latency_s: float):
+        self.latency_ewma_s = (latency_s if self.latency_ewma_s is None
+                               else 0.8 * self.latency_ewma_s + 0.2 * latency_s)
+
+    def record(self, latency_s: float, ok: bool):
+        with self._lock:
+            self.calls += 1
+            self.errors += 0 if ok else 1
+            self.error_rate_ewma = 0.8 * self.error_rate_ewma + 0.2 * (0.0 if ok else 1.0)
+            if ok:
+                self._observe_latency(latency_s)
+        metrics.LLM_CALLS.inc(provider=self.name, outcome="ok" if ok else "error")
+        metrics.LLM_LATENCY.observe(latency_s, provider=self.name)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    async def call(self, prompt: str) -> str:
+        start = time.perf_counter()
+        try:
+            resp = await asyncio.wait_for(self.llm.ainvoke(prompt), timeout=self.timeout_s)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not an error, but it was at least this slow.
+            with self._lock:
+                self._observe_latency(time.perf_counter() - start)
+            self.breaker.record_abandoned()
+            raise
+        except Exception:
+            self.record(time.perf_counter() - start, ok=False)
+            raise
+        self.record(time.perf_counter() - start, ok=True)
+        return resp.content.strip() if hasattr(resp, "content") else str(resp).strip()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate_ewma, 3),
+            "latency_s": round(self.latency_ewma_s, 3) if self.latency_ewma_s is not None else None,
+            "tokens": self.tokens,
+            "in_flight": self.in_flight,
+        }
+
+
+_END = object()
+
+
+def _chunk_text(chunk) -> str:
+    return chunk.content if hasattr(chunk, "content") else str(chunk)
+
+
+def _next_within(chunks: Iterator, timeout_s: float):
+    """
+    `next(chunks, _END)`, raising TimeoutError if it takes longer than
+    `timeout_s`. A read that times out is left running on its thread.
+    """
+    result: "queue.Queue[tuple]" = queue.Queue(maxsize=1)
+
+    def read():
+        try:
+            result.put((True, next(chunks, _END)))
+        except BaseException as e:
+            result.put((False, e))
+
+    threading.Thread(target=read, name="llm-stream-read", daemon=True).start()
+    try:
+        ok, value = result.get(timeout=max(0.0, timeout_s))
+    except queue.Empty:
+        raise TimeoutError(f"no output within {timeout_s:.1f}s") from None
+    if not ok:
+        raise value
+    return value
+
+
+@dataclass
+class RouterResult:
+    text: str
+    provider: str
+
+
+class _LoopThread:
+    """A private event loop on a daemon thread, so sync callers (Streamlit) can use the router."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="llm-router", daemon=True).start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+
+class ProviderRouter:
+    """
+    Routes each prompt to the first healthy provider with quota left.
+
+    Providers are tried in order. A provider is skipped while its circuit is
+    open or its token bucket is empty, and a failed call moves on to the next
+    provider straight away. With `hedge_after_s`, a call that has not finished
+    by then is raced against the next provider and the first answer wins.
+    Providers that are currently erroring or slower than the hedge threshold
+    are tried after healthy ones, except on periodic probe requests.
+    """
+
+    def __init__(self, providers: List[Provider], hedge_after_s: Optional[float] = LLM_HEDGE_AFTER_S,
+                 max_wait_s: float = RATE_LIMIT_MAX_WAIT_S):
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers = providers
+        self.hedge_after_s = hedge_after_s
+        self.max_wait_s = max_wait_s
+        self.hedges = 0
+        self.failovers = 0
+        self._requests = 0
+        self._loop_thread: Optional[_LoopThread] = None
+        self._loop_lock = threading.Lock()
+
+    def _ordered(self) -> List[Provider]:
+        self._requests += 1
+        if PROBE_EVERY and self._requests % PROBE_EVERY == 0:
+            return list(self.providers)
+
+        def degraded(p: Provider) -> bool:
+            slow = (self.hedge_after_s is not None and p.latency_ewma_s is not None
+                    and p.latency_ewma_s > self.hedge_after_s)
+            return slow or p.error_rate_ewma >= 0.5
+
+        return sorted(self.providers, key=degraded)  # stable: keeps configured order otherwise
+
+    def _admit_any(self, candidates: List[Provider], prompts: _Prompts, errors: List[str]) -> Optional[Provider]:
+        """Pop the first admissible provider off `candidates`."""
+        while candidates:
+            provider = candidates.pop(0)
+            reason = provider.admit(prompts.cost(provider))
+            if reason is None:
+                return provider
+            errors.append(f"{provider.name}: {reason}")
+        return None
+
+    async def _wait_for_quota(self, prompts: _Prompts) -> Optional[Provider]:
+        """Every provider is rate limited or busy: wait for the one whose quota frees up first."""
+        deadline = time.monotonic() + self.max_wait_s
+        while time.monotonic() < deadline:
+            waits = [(p.quota_wait_time(prompts.cost(p)), p) for p in self.providers if p.breaker.state != "open"]
+            if not waits:
+                return None
+            wait, provider = min(waits, key=lambda w: w[0])
+            if wait > deadline - time.monotonic():
+                return None
+            await asyncio.sleep(wait)
+            if provider.admit(prompts.cost(provider)) is None:
+                return provider
+        return None
+
+    async def ainvoke(self, prompt: PromptSpec) -> RouterResult:
+        prompts = _Prompts(prompt)
+        candidates = self._ordered()
+        errors: List[str] = []
+        pending = {}
+
+        def launch(provider: Provider):
+            task = asyncio.ensure_future(provider.call(prompts.text(provider)))
+            task.add_done_callback(lambda _: provider.release())  # also if cancelled before it ran
+            pending[task] = provider
+
+        first = self._admit_any(candidates, prompts, errors)
+        if first is None and any(e.endswith(("rate limited", "busy")) for e in errors):
+            first = await self._wait_for_quota(prompts)
+        if first is None:
+            raise AllProvidersFailed("; ".join(errors) or "no provider available")
+        launch(first)
+        hedged = False
+
+        while pending:
+            hedge_timeout = self.hedge_after_s if (self.hedge_after_s and not hedged and candidates) else None
+            done, _ = await asyncio.wait(pending, timeout=hedge_timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                nxt = self._admit_any(candidates, prompts, errors)
+                if nxt is not None:
+                    self.hedges += 1
+                    metrics.LLM_FAILOVERS.inc(kind="hedge")
+                    launch(nxt)
+                continue
+            for task in done:
+                provider = pending.pop(task)
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return RouterResult(task.result(), provider.name)
+                errors.append(f"{provider.name}: {task.exception()!r}")
+            if not pending:
+                nxt = self._admit_any(candidates, prompts, errors)
+                if nxt is not None:
+                    self.failovers += 1
+                    metrics.LLM_FAILOVERS.inc(kind="failover")
+                    launch(nxt)
+        raise AllProvidersFailed("; ".join(errors))
+
+    def _loop(self) -> _LoopThread:
+        with self._loop_lock:
+            if self._loop_thread is None:
+                self._loop_thread = _LoopThread()
+        return self._loop_thread
+
+    def invoke(self, prompt: PromptSpec) -> RouterResult:
+        """Blocking wrapper around `ainvoke` for synchronous callers."""
+        return self._loop().run(self.ainvoke(prompt))
+
+    async def _gather(self, prompts: List[PromptSpec]) -> list:
+        return await asyncio.gather(*(self.ainvoke(p) for p in prompts), return_exceptions=True)
+
+    def invoke_all(self, prompts: List[PromptSpec]) -> List[Union[RouterResult, Exception]]:
+        """Send several prompts concurrently; each result is a RouterResult or the exception it raised."""
+        return self._loop().run(self._gather(prompts))
+
+    def stream(self, prompt: PromptSpec) -> Iterator[str]:
+        """
+        Stream text chunks from the first admissible provider, waiting up to
+        `max_wait_s` for quota like `invoke`. A provider that streams nothing
+        within its `timeout_s` counts as failed. Fails over to the next
+        provider only if nothing has been streamed yet.
+        """
+        prompts = _Prompts(prompt)
+        candidates = self._ordered()
+        errors: List[str] = []
+        provider = self._admit_any(candidates, prompts, errors)
+        if provider is None and any(e.endswith(("rate limited", "busy")) for e in errors):
+            provider = self._loop().run(self._wait_for_quota(prompts))
+        while provider is not None:
+            start = time.perf_counter()
+            started = False
+            try:
+                chunks = iter(provider.llm.stream(prompts.text(provider)))
+                deadline = time.monotonic() + provider.timeout_s
+                while not started:
+                    chunk = _next_within(chunks, deadline - time.monotonic())
+                    if chunk is _END:
+                        break
+                    piece = _chunk_text(chunk)
+                    if piece:
+                        started = True
+                        yield piece
+                for chunk in chunks:
+                    piece = _chunk_text(chunk)
+                    if piece:
+                        yield piece
+            except GeneratorExit:
+                # The consumer stopped reading (e.g. switched to another answer).
+                provider.breaker.record_abandoned()
+                provider.release()
+                raise
+            except Exception as e:
+                provider.record(time.perf_counter() - start, ok=False)
+                if started:
+                    provider.release()
+                    raise
+                errors.append(f"{provider.name}: {e!r}")
+                provider.release()
+                provider = self._admit_any(candidates, prompts, errors)
+                if provider is not None:
+                    self.failovers += 1
+                    metrics.LLM_FAILOVERS.inc(kind="failover")
+                continue
+            except BaseException:
+                provider.release()
+                raise
+            provider.release()
+            provider.record(time.perf_counter() - start, ok=True)
+            return
+        raise AllProvidersFailed("; ".join(errors) or "no provider available")
+
+    def stats(self) -> dict:
+        return {
+            "providers": {p.name: p.stats() for p in self.providers},
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+        }
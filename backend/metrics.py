@@ -0,0 +1,331 @@
+"""
+In-process metrics, tracing spans and exporters.
+
+    from backend import metrics
+
+    with metrics.span("translate_in"):          # stage latency histogram
+        ...
+    metrics.OPEN_FALLBACKS.inc()                 # counters
+    metrics.event("request", route="rag", ...)   # structured event
+
+Metrics are plain counters, gauges and fixed-bucket histograms guarded by one lock
+each, so recording costs a dict lookup and an addition and can stay on under
+load. Exporters are pluggable (`add_exporter`):
+
+- `PrometheusExporter` serves the Prometheus text format on
+  `http://0.0.0.0:METRICS_PORT/metrics` (`render_prometheus()` returns the
+  same text for other servers to expose).
+- `JSONLogSink` writes every `event()` as one JSON line to METRICS_JSON_LOG
+  (a path, or "-" for stderr).
+
+`start_exporters()` starts whichever of them is configured; it is idempotent.
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# === Configuration ===
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = no HTTP endpoint
+METRICS_JSON_LOG = os.getenv("METRICS_JSON_LOG", "")  # path, "-" (stderr) or empty (off)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(level: str = LOG_LEVEL):
+    """Plain message logging for the CLI / Streamlit process (no-op if already configured)."""
+    logging.basicConfig(level=getattr(logging, level.upper(), logging.INFO), format="%(message)s")
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, str]) -> Tuple[str, ...]:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {tuple(labelnames)}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: Sequence[str], key: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name + "_total" + _format_labels(self.labelnames, key), v) for key, v in items]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {",".join(key) or "": v for key, v in self._values.items()}
+
+
+class Gauge(Counter):
+    """A value that goes up and down (e.g. a queue depth)."""
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name + _format_labels(self.labelnames, key), v) for key, v in items]
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS_S):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key → [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        out = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                out.append((self.name + "_bucket" + _format_labels(self.labelnames, key, f'le="{le}"'), cumulative))
+            out.append((self.name + "_sum" + _format_labels(self.labelnames, key), total))
+            out.append((self.name + "_count" + _format_labels(self.labelnames, key), cumulative))
+        return out
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {",".join(key) or "": {"count": sum(counts), "sum": round(total, 6)}
+                    for key, (counts, total) in self._values.items()}
+
+
+class Exporter:
+    """Receives structured events; `start()` is called once by `start_exporters()`."""
+
+    def start(self):
+        pass
+
+    def on_event(self, event: dict):
+        pass
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._exporters: List[Exporter] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS_S) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def add_exporter(self, exporter: Exporter):
+        with self._lock:
+            self._exporters.append(exporter)
+        exporter.start()
+
+    def event(self, name: str, **fields):
+        if not self._exporters:
+            return
+        record = {"ts": round(time.time(), 3), "event": name, **fields}
+        for exporter in list(self._exporters):
+            try:
+                exporter.on_event(record)
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics exporter {type(exporter).__name__} failed: {e}")
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            family = metric.name + "_total" if metric.type == "counter" else metric.name
+            lines.append(f"# HELP {family} {metric.documentation}")
+            lines.append(f"# TYPE {family} {metric.type}")
+            lines.extend(f"{sample} {value:g}" for sample, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+
+
+class PrometheusExporter(Exporter):
+    """Serves `render_prometheus()` at /metrics from a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "0.0.0.0"):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"📈 Prometheus metrics on http://{self.host}:{self.server.server_port}/metrics")
+
+
+class JSONLogSink(Exporter):
+    """Appends each event as one JSON line to a file (or stderr for "-")."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def start(self):
+        if self.path == "-":
+            self._file = sys.stderr
+        else:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def on_event(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+
+registry = MetricsRegistry()
+
+# --- Pipeline metrics ---
+STAGE_LATENCY = registry.histogram("krishigpt_stage_latency_seconds", "Time spent per pipeline stage.", ["stage"])
+REQUEST_LATENCY = registry.histogram("krishigpt_request_latency_seconds", "End-to-end answer latency.",
+                                     ["route", "cache_hit"])
+REQUESTS = registry.counter("krishigpt_requests", "Answered questions.", ["lang", "route", "cache_hit"])
+OPEN_FALLBACKS = registry.counter("krishigpt_open_fallbacks", "Answers produced by the open (non-RAG) prompt.")
+WASTED_LLM_CALLS = registry.counter("krishigpt_wasted_llm_calls", "LLM calls whose answer was discarded.")
+ANSWER_CACHE = registry.counter("krishigpt_answer_cache_lookups", "Answer cache lookups.", ["result"])
+CONTEXT_VECTOR_CACHE = registry.counter("krishigpt_context_vector_cache_lookups",
+                                        "Context sentence vector cache lookups.", ["result"])
+TRANSLATION_SEGMENTS = registry.counter("krishigpt_translation_segments",
+                                        "Translated sentence segments by source.", ["direction", "source"])
+# --- LLM providers ---
+LLM_CALLS = registry.counter("krishigpt_llm_calls", "LLM provider calls.", ["provider", "outcome"])
+LLM_LATENCY = registry.histogram("krishigpt_llm_latency_seconds", "LLM provider call latency.", ["provider"])
+LLM_TOKENS = registry.counter("krishigpt_llm_prompt_tokens", "Estimated prompt tokens sent.", ["provider"])
+LLM_FAILOVERS = registry.counter("krishigpt_llm_failovers", "Requests moved to the next provider.", ["kind"])
+# --- Micro-batching (backend/micro_batching.py) ---
+MICROBATCH_QUEUE_DEPTH = registry.gauge("krishigpt_microbatch_queue_depth",
+                                        "Requests waiting for a model batch.", ["batcher"])
+MICROBATCH_SIZE = registry.histogram("krishigpt_microbatch_size", "Requests per model batch.", ["batcher"],
+                                     buckets=(1, 2, 4, 8, 16, 32, 64))
+MICROBATCH_WAIT = registry.histogram("krishigpt_microbatch_wait_seconds",
+                                     "Time from submission to the start of the request's batch.", ["batcher"])
+# --- HTTP API (app/api.py) ---
+API_REQUESTS = registry.counter("krishigpt_api_requests", "HTTP API requests.", ["endpoint", "status"])
+API_COALESCED = registry.counter("krishigpt_api_coalesced", "Requests served by an identical one in flight.",
+                                 ["endpoint"])
+
+render_prometheus = registry.render_prometheus
+snapshot = registry.snapshot
+event = registry.event
+add_exporter = registry.add_exporter
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the `with` block into the stage latency histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_exporters(port: int = METRICS_PORT, json_log: str = METRICS_JSON_LOG):
+    """Start the configured exporters once per process."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+    if port:
+        try:
+            add_exporter(PrometheusExporter(registry, port))
+        except OSError as e:  # e.g. another worker already serves the port
+            logger.warning(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+    if json_log:
+        add_exporter(JSONLogSink(json_log))
@@ -0,0 +1,154 @@
+"""
+Dynamic micro-batching for the models on the request path.
+
+Under concurrent load every question used to run its own batch-of-one
+forward pass through the MiniLM embedder and the Marian translator. A
+`MicroBatcher` sits in front of such a model: callers submit one item and
+block, a worker thread collects the items that arrive within
+MICROBATCH_WAIT_MS of the first one (or MICROBATCH_MAX_SIZE of them), runs
+them through the model as one padded batch and hands every caller its own
+result.
+
+    batcher = MicroBatcher("embed_query", model.embed_documents)
+    vector = batcher("What is PM-Kisan?")
+
+While a batch runs, new requests queue up and form the next batch without
+further waiting, so the default window of 0 ms batches under load and adds
+no latency when the process is idle. A few milliseconds of window only help
+when requests trickle in faster than one model call but do not yet overlap
+(see notebooks/microbatch_benchmark.py). Queue depth, batch sizes and queueing time are exported through
+backend/metrics.py, labelled with the batcher's name.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "1") == "1"
+# How long the first request of a batch waits for others (0 = only those already queued).
+MICROBATCH_WAIT_MS = float(os.getenv("MICROBATCH_WAIT_MS", "0"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+
+
+class MicroBatcher:
+    """
+    Runs `batch_fn(items) -> results` (one result per item, in order) on a
+    single worker thread over batches of submitted items. An exception from
+    `batch_fn` is raised in every caller of that batch.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = MICROBATCH_MAX_SIZE,
+        max_wait_ms: float = MICROBATCH_WAIT_MS,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        if threading.current_thread() is self._worker:
+            # batch_fn calling back into its own batcher would wait on itself.
+            future.set_result(self.batch_fn([item])[0])
+            return future
+        self._ensure_worker()
+        metrics.MICROBATCH_QUEUE_DEPTH.inc(batcher=self.name)
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        return self.submit(item).result()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f"microbatch-{self.name}", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        # The window starts when the first request arrived, so a request that
+        # queued behind a running batch does not wait again.
+        deadline = batch[0][2] + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.perf_counter())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # The only worker of this batcher: nothing a caller or batch_fn does may end the loop.
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            metrics.MICROBATCH_QUEUE_DEPTH.dec(len(batch), batcher=self.name)
+            # Callers may have cancelled their futures while they queued.
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            metrics.MICROBATCH_SIZE.observe(len(batch), batcher=self.name)
+            for _, _, submitted in batch:
+                metrics.MICROBATCH_WAIT.observe(started - submitted, batcher=self.name)
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: {len(results)} results for a batch of {len(batch)}")
+            except BaseException as e:
+                logger.warning(f"⚠️ Micro-batch {self.name} of {len(batch)} failed: {e!r}")
+                for _, future, _ in batch:
+                    _settle(future.set_exception, e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                _settle(future.set_result, result)
+
+
+def _settle(setter: Callable[[Any], None], value: Any):
+    try:
+        setter(value)
+    except InvalidStateError:  # already settled; must not take the worker down
+        pass
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so concurrent `embed_query` calls share one
+    `embed_documents` batch. `embed_documents` (index builds, batch
+    questions) is already batched and goes straight to the model.
+    """
+
+    def __init__(self, model: Embeddings, max_batch_size: int = MICROBATCH_MAX_SIZE,
+                 max_wait_ms: float = MICROBATCH_WAIT_MS):
+        self.model = model
+        self._batcher = MicroBatcher("embed_query", model.embed_documents, max_batch_size, max_wait_ms)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._batcher(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def __getattr__(self, name: str):
+        # model_name, client, ... of the wrapped model
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
@@ -2,91 +2,156 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import time
+import logging
 import dotenv
-from typing import List, Tuple, Optional
+from concurrent.futures import Executor
+from typing import Callable, Iterator, List, Tuple, Optional
 
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings  # Updated import
 from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
 from langchain.schema import Document
 
-from backend.translate import translate_to_english, translate_from_english, detect_language
+from backend import metrics
+from backend.answer_cache import ANSWER_CACHE_ENABLED, AnswerCache
+from backend.bm25 import RETRIEVAL_MODE, HybridRetriever, load_bm25
+from backend.chunk_store import chunk_store_exists
+from backend.context_assembly import AssembledContext, SentenceVectorCache, assemble_context
+from backend.embedding_backends import EMBEDDING_BACKEND, load_query_encoder
+from backend.build_faiss_index import (
+    DOCS_FOLDER,
+    EMBEDDING_MODEL_NAME,
+    FAISS_INDEX_PATH,
+    index_is_chunked,
+    index_version,
+    load_vectorstore,
+    update_faiss_index,
+)
+from backend.llm_router import Provider, ProviderRouter
+from backend.micro_batching import MICROBATCH_ENABLED, MicroBatchingEmbeddings
+from backend.request_context import RequestContext, timed_batch
+from backend.resources import get, register
+from backend.routing import BOTH, OPEN, RouteThresholds, RoutingStats, route_score
+from backend.text_utils import SentenceBuffer, split_sentences
+from backend.language_utils import ENGLISH, HINDI, detect_language
+from backend.translate import translate, translate_batch, translate_to_english, translate_from_english
 from backend.tts_response import speak_response
 
-# (optional) for nicer error handling of Google GenAI
-try:
-    from google.api_core.exceptions import ServiceUnavailable
-except Exception:  # pragma: no cover
-    ServiceUnavailable = Exception
-
 dotenv.load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # === Configuration ===
 GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+# Provider quotas (requests / tokens per minute) enforced by the LLM router.
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+GROQ_RPM = float(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = float(os.getenv("GROQ_TPM", "6000"))
+# Retrieved-context budget per provider (prompt tokens); Groq's small TPM quota gets less.
+GEMINI_CONTEXT_TOKENS = int(os.getenv("GEMINI_CONTEXT_TOKENS", "1500"))
+GROQ_CONTEXT_TOKENS = int(os.getenv("GROQ_CONTEXT_TOKENS", "800"))
+# LLM calls in flight per provider; more go to the other provider or wait.
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "4"))
+
 if not GOOGLE_API_KEY:
     raise ValueError("❌ GEMINI_API_KEY not set in .env file")
 if not GROQ_API_KEY:
-    print("⚠️ GROQ_API_KEY not set. Groq fallback will be disabled.")
+    logger.warning("⚠️ GROQ_API_KEY not set. Groq fallback will be disabled.")
 
-# === Embeddings ===
-embedding_model = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
+# Candidates retrieved per question; context assembly dedups, diversifies
+# and compresses them to the provider's budget.
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "8"))
 
-# === FAISS Index Path ===
-FAISS_INDEX_PATH = "data/faiss_index"
+# === Resources ===
+# Models, index and clients are created on first use (or by warm_up()), not
+# at import time; see backend/resources.py. Module attributes of the same
+# name (rag_pipeline.vectorstore, ...) resolve through `__getattr__` below.
 
-def build_faiss_index():
-    """Build FAISS index if not found."""
-    print("⚠️ FAISS index not found. Building a new one...")
-    docs_folder = "data/cleaned_docs"
-    documents = []
-
-    for file in os.listdir(docs_folder):
-        if file.endswith(".txt"):
-            with open(os.path.join(docs_folder, file), "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                if content:
-                    documents.append(Document(page_content=content))
-
-    if not documents:
-        raise FileNotFoundError("❌ No documents found in data/cleaned_docs to build FAISS index.")
-
-    vectorstore = FAISS.from_documents(documents, embedding_model)
-    os.makedirs(FAISS_INDEX_PATH, exist_ok=True)
-    vectorstore.save_local(FAISS_INDEX_PATH)
-    print("✅ FAISS index built successfully.")
-
-# === Load or Build Vector Store ===
-if not os.path.exists(os.path.join(FAISS_INDEX_PATH, "index.faiss")):
-    build_faiss_index()
-
-vectorstore = FAISS.load_local(
-    FAISS_INDEX_PATH,
-    embeddings=embedding_model,
-    allow_dangerous_deserialization=True
-)
-retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-
-# === LLMs ===
-gemini_llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    google_api_key=GOOGLE_API_KEY,
-    convert_system_message_to_human=True,
-    temperature=0.3,
-)
+def _load_embedding_model():
+    # Encodes questions; EMBEDDING_BACKEND selects torch or ONNX (backend/embedding_backends.py).
+    model = load_query_encoder(EMBEDDING_MODEL_NAME)
+    # Concurrent questions share one padded forward pass (backend/micro_batching.py).
+    return MicroBatchingEmbeddings(model) if MICROBATCH_ENABLED else model
 
-groq_llm = None
-if GROQ_API_KEY:
-    groq_llm = ChatGroq(
-        model="llama3-70b-8192",
-        groq_api_key=GROQ_API_KEY,
+def build_faiss_index():
+    """Build the FAISS index, or bring it up to date with data/cleaned_docs."""
+    logger.warning("⚠️ Updating FAISS index from data/cleaned_docs...")
+    # Chunk vectors always come from the torch model, whatever encodes the questions.
+    if EMBEDDING_BACKEND == "torch":
+        index_model = get("embedding_model")
+    else:
+        index_model = load_query_encoder(EMBEDDING_MODEL_NAME, backend="torch")
+    stats = update_faiss_index(index_model, DOCS_FOLDER, FAISS_INDEX_PATH)
+    logger.info(f"✅ FAISS index ready: +{stats['added']} / -{stats['removed']} chunks.")
+
+def _load_vectorstore():
+    # Indexes without a manifest hold whole files as documents; re-chunk them.
+    # Indexes with a pickled docstore are converted to the mapped chunk store.
+    if not index_is_chunked(FAISS_INDEX_PATH) or not chunk_store_exists(FAISS_INDEX_PATH):
+        build_faiss_index()
+    return load_vectorstore(get("embedding_model"), FAISS_INDEX_PATH)
+
+def _load_retriever():
+    # Dense-only retrieval does not need the lexical index in memory.
+    bm25 = load_bm25(get("vectorstore"), FAISS_INDEX_PATH) if RETRIEVAL_MODE != "dense" else None
+    return HybridRetriever(vectorstore=get("vectorstore"), bm25=bm25, k=RETRIEVER_K, mode=RETRIEVAL_MODE)
+
+def _load_answer_cache():
+    # Keyed by the index version, so it is invalidated whenever the index is rebuilt.
+    get("vectorstore")
+    return AnswerCache(index_version(FAISS_INDEX_PATH)) if ANSWER_CACHE_ENABLED else None
+
+def _load_llm_router():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    gemini_llm = ChatGoogleGenerativeAI(
+        model="gemini-1.5-flash",
+        google_api_key=GOOGLE_API_KEY,
+        convert_system_message_to_human=True,
         temperature=0.3,
     )
+    # Gemini first, Groq as secondary; failures, open circuits and exhausted
+    # quota move requests to the next provider without waiting for a timeout.
+    providers = [Provider("gemini", gemini_llm, rpm=GEMINI_RPM, tpm=GEMINI_TPM,
+                          context_tokens=GEMINI_CONTEXT_TOKENS, max_concurrency=GEMINI_CONCURRENCY)]
+    if GROQ_API_KEY:
+        from langchain_groq import ChatGroq
+
+        groq_llm = ChatGroq(
+            model="llama3-70b-8192",
+            groq_api_key=GROQ_API_KEY,
+            temperature=0.3,
+        )
+        providers.append(Provider("groq", groq_llm, rpm=GROQ_RPM, tpm=GROQ_TPM,
+                                   context_tokens=GROQ_CONTEXT_TOKENS, max_concurrency=GROQ_CONCURRENCY))
+    return ProviderRouter(providers)
+
+register("embedding_model", _load_embedding_model)
+register("vectorstore", _load_vectorstore)
+register("retriever", _load_retriever)
+register("answer_cache", _load_answer_cache)
+register("llm_router", _load_llm_router)
+register("route_thresholds", lambda: RouteThresholds.load(index_version=index_version(FAISS_INDEX_PATH)))
+
+_routing_stats = RoutingStats()
+# Vectors of the context sentences, shared by all requests of this process.
+_sentence_vectors = SentenceVectorCache()
+
+_LAZY_ATTRIBUTES = {
+    "embedding_model": lambda: get("embedding_model"),
+    "vectorstore": lambda: get("vectorstore"),
+    "retriever": lambda: get("retriever"),
+    "answer_cache": lambda: get("answer_cache"),
+    "llm_router": lambda: get("llm_router"),
+}
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # === Prompts ===
 RAG_PROMPT = PromptTemplate(
@@ -126,104 +191,466 @@ def _is_unhelpful_answer(text: str) -> bool:
         or "i don't know" in text_lower
     )
 
-def _call_llm_with_rag(llm, question_en: str) -> Tuple[str, List[Document]]:
-    """Retrieve context and answer with RAG. Returns (answer_en, docs)."""
-    docs = retriever.invoke(question_en)
-    context = "\n".join(d.page_content for d in docs if d.page_content.strip())
-    if not context.strip():
-        return "", docs  # signal empty context
-    prompt = RAG_PROMPT.format(context=context, question=question_en)
-    resp = llm.invoke(prompt)
-    text = resp.content.strip() if hasattr(resp, "content") else str(resp).strip()
-    return text, docs
-
-def _call_llm_open(llm, question_en: str) -> str:
+def _assemble_context(question_en: str, docs: List[Document], query_vector=None,
+                      ctx: Optional[RequestContext] = None) -> AssembledContext:
+    """
+    Dedup, MMR-order and score the retrieved docs (see backend.context_assembly).
+    Embedding the sentences is timed as its own stage, "embed_context".
+    """
+    embedding_model = get("embedding_model")
+    if query_vector is None:
+        query_vector = embedding_model.embed_query(question_en)
+
+    def embed_documents(texts: List[str]) -> List[List[float]]:
+        with ctx.timed("embed_context") if ctx else metrics.span("embed_context"):
+            return embedding_model.embed_documents(texts)
+
+    assembled = assemble_context(query_vector, docs, embed_documents, cache=_sentence_vectors)
+    if assembled and logger.isEnabledFor(logging.INFO):
+        stats = assembled.stats()
+        logger.info(f"✂️ Context: {stats['original_tokens']} → {stats['context_tokens']} tokens "
+                    f"from {stats['chunks']}/{len(docs)} chunks")
+    return assembled
+
+def _rag_prompt(question_en: str, assembled: AssembledContext) -> Callable[[Provider], str]:
+    """RAG prompt whose context is cut to each provider's `context_tokens` budget."""
+    return lambda provider: RAG_PROMPT.format(
+        context=assembled.render(provider.context_tokens), question=question_en
+    )
+
+def _call_llm_with_rag(question_en: str, docs: List[Document], query_vector=None) -> str:
+    """Answer with RAG over already retrieved docs. Returns answer_en."""
+    assembled = _assemble_context(question_en, docs, query_vector)
+    if not assembled:
+        return ""  # signal empty context
+    return get("llm_router").invoke(_rag_prompt(question_en, assembled)).text
+
+def _call_llm_open(question_en: str) -> str:
     """Direct LLM call without RAG (fallback)."""
     prompt = OPEN_WEB_PROMPT.format(question=question_en)
-    resp = llm.invoke(prompt)
-    return resp.content.strip() if hasattr(resp, "content") else str(resp).strip()
-
-def _answer_with_fallback(question_en: str) -> Tuple[str, List[Document], bool]:
+    return get("llm_router").invoke(prompt).text
+
+def _route(ctx: RequestContext) -> str:
+    """Pick "rag", "open" or "both" from the best retrieval score (see backend.routing)."""
+    ctx.route_score = route_score(ctx.scored_docs)
+    ctx.route = get("route_thresholds").route(ctx.route_score)
+    logger.info(f"🧭 Retrieval score {ctx.route_score:.2f} → {ctx.route}")
+    return ctx.route
+
+def _answer_both(ctx: RequestContext, assembled: AssembledContext) -> Tuple[str, bool]:
+    """Send the RAG and open prompts concurrently; keep RAG unless it is unhelpful."""
+    with ctx.timed("llm"):
+        rag, open_ = get("llm_router").invoke_all([
+            _rag_prompt(ctx.query_en, assembled),
+            OPEN_WEB_PROMPT.format(question=ctx.query_en),
+        ])
+    ctx.llm_calls += 2
+    ctx.wasted_llm_calls += 1
+    if not isinstance(rag, Exception) and not _is_unhelpful_answer(rag.text):
+        return rag.text, False
+    if isinstance(open_, Exception):
+        raise open_
+    return open_.text, True
+
+def _answer_with_fallback(ctx: RequestContext) -> Tuple[str, bool]:
+    """
+    Answer from the documents already retrieved into `ctx`, routed by their
+    score: RAG (→ open answer if the context is empty or the answer
+    unhelpful), open answer only, or both at once. Each call goes through
+    `llm_router`, which picks Gemini or Groq by health and quota.
     """
-    Try: RAG with Gemini → (if empty context/unhelpful) direct Gemini →
-    (if fails / quota) Groq (RAG first, then open).
+    route = _route(ctx)
+    with ctx.timed("context"):
+        assembled = _assemble_context(ctx.query_en, ctx.docs, ctx.query_vector, ctx) if route != OPEN else None
+    if assembled and route == BOTH:
+        answer_en, used_open_fallback = _answer_both(ctx, assembled)
+    else:
+        answer_en, used_open_fallback = "", True
+        if assembled:
+            with ctx.timed("llm"):
+                answer_en = get("llm_router").invoke(_rag_prompt(ctx.query_en, assembled)).text
+            ctx.llm_calls += 1
+            used_open_fallback = _is_unhelpful_answer(answer_en)
+            if used_open_fallback:
+                logger.warning("⚠️ No relevant info in documents. Falling back to open answer.")
+                ctx.wasted_llm_calls += 1
+        if used_open_fallback:
+            with ctx.timed("llm"):
+                answer_en = _call_llm_open(ctx.query_en)
+            ctx.llm_calls += 1
+    _routing_stats.record(ctx.route, ctx.llm_calls, ctx.wasted_llm_calls)
+    return answer_en, used_open_fallback
+
+def routing_stats() -> dict:
+    """Requests per route, LLM calls made and wasted (answers discarded)."""
+    return _routing_stats.stats()
+
+def llm_router_stats() -> dict:
+    """Per-provider latency, error rate and circuit state, plus hedge/failover counts."""
+    return get("llm_router").stats()
+
+def prepare_request(query: str, k: int = RETRIEVER_K, retrieve: bool = True) -> RequestContext:
+    """Detect, translate, embed and (optionally) retrieve once for this question."""
+    ctx = RequestContext(query=query)
+    with ctx.timed("language_id"):
+        ctx.lang = detect_language(query)
+    with ctx.timed("translate_in"):
+        ctx.query_en = translate_to_english(query, src_lang=ctx.lang) if ctx.lang != ENGLISH else query
+    with ctx.timed("embed"):
+        ctx.query_vector = get("embedding_model").embed_query(ctx.query_en)
+    if retrieve:
+        retrieve_documents(ctx, k)
+    return ctx
+
+def retrieve_documents(ctx: RequestContext, k: int = RETRIEVER_K) -> RequestContext:
+    """Search with the query vector already in `ctx` (and its text, for BM25; see RETRIEVAL_MODE)."""
+    with ctx.timed("search"):
+        ctx.scored_docs = get("retriever").search(ctx.query_en, ctx.query_vector, k=k)
+    return ctx
+
+def _answer_request(query: str) -> Tuple[RequestContext, dict]:
     """
-    used_open_fallback = False
-    docs: List[Document] = []
+    Answer one question, serving it from the answer cache when a similar
+    English question was answered before from the same index.
 
-    try:
-        answer_en, docs = _call_llm_with_rag(gemini_llm, question_en)
-        if _is_unhelpful_answer(answer_en):
-            print("⚠️ No relevant info in documents. Falling back to Gemini (open).")
-            used_open_fallback = True
-            answer_en = _call_llm_open(gemini_llm, question_en)
-        return answer_en, docs, used_open_fallback
-
-    except (ServiceUnavailable, Exception) as e:
-        err = str(e).lower()
-        if groq_llm and ("429" in err or "quota" in err or "serviceunavailable" in err or "503" in err):
-            print("⚠️ Gemini unavailable/quota exceeded. Falling back to Groq (Llama3-70B).")
-            try:
-                answer_en, docs = _call_llm_with_rag(groq_llm, question_en)
-                if _is_unhelpful_answer(answer_en):
-                    print("⚠️ No context with Groq. Using Groq (open).")
-                    used_open_fallback = True
-                    answer_en = _call_llm_open(groq_llm, question_en)
-                return answer_en, docs, used_open_fallback
-            except Exception as e2:
-                raise RuntimeError(f"Groq fallback also failed: {e2}") from e2
-        raise
+    Returns the request context and a dict with answer_en, answer, contexts
+    (all retrieved chunks), used_open_fallback and cache_hit.
+    """
+    started = time.perf_counter()
+    ctx = prepare_request(query, retrieve=False)
+    answer_cache = get("answer_cache")
+    if answer_cache:
+        with ctx.timed("cache"):
+            cached = _lookup_cached(answer_cache, ctx)
+        if cached:
+            result = {**cached, "cache_hit": True}
+            _record_request(ctx, result, started)
+            return ctx, result
+
+    start = time.perf_counter()
+    retrieve_documents(ctx)
+    answer_en, used_open = _answer_with_fallback(ctx)
+    with ctx.timed("translate_out"):
+        final = translate_from_english(answer_en, src_lang=ctx.lang) if ctx.answer_lang != ENGLISH else answer_en
+    result = {
+        "answer_en": answer_en,
+        "answer": final,
+        "contexts": [d.page_content for d in ctx.docs],
+        "used_open_fallback": used_open,
+    }
+    if answer_cache and answer_en:
+        answer_cache.store(ctx.query_en, ctx.query_vector, ctx.answer_lang, result,
+                           latency_s=time.perf_counter() - start)
+    result = {**result, "cache_hit": False}
+    _record_request(ctx, result, started)
+    return ctx, result
+
+def _lookup_cached(answer_cache: AnswerCache, ctx: RequestContext) -> Optional[dict]:
+    cached = answer_cache.lookup(ctx.query_en, ctx.query_vector, ctx.answer_lang)
+    metrics.ANSWER_CACHE.inc(result="hit" if cached else "miss")
+    return cached
+
+def _record_request(ctx: RequestContext, result: dict, started: float):
+    """Count the answered request and emit it as a structured "request" event."""
+    latency_s = time.perf_counter() - started
+    cache_hit = "true" if result["cache_hit"] else "false"
+    route = "cache" if result["cache_hit"] else ctx.route
+    metrics.REQUESTS.inc(lang=ctx.lang, route=route, cache_hit=cache_hit)
+    metrics.REQUEST_LATENCY.observe(latency_s, route=route, cache_hit=cache_hit)
+    if result["used_open_fallback"] and not result["cache_hit"]:
+        metrics.OPEN_FALLBACKS.inc()
+    if ctx.wasted_llm_calls:
+        metrics.WASTED_LLM_CALLS.inc(ctx.wasted_llm_calls)
+    metrics.event(
+        "request",
+        lang=ctx.lang,
+        answer_lang=ctx.answer_lang,
+        route=route,
+        route_score=round(ctx.route_score, 4) if ctx.route_score is not None else None,
+        cache_hit=result["cache_hit"],
+        used_open_fallback=result["used_open_fallback"],
+        llm_calls=ctx.llm_calls,
+        wasted_llm_calls=ctx.wasted_llm_calls,
+        latency_ms=round(latency_s * 1000, 1),
+        timings_ms={stage: round(ms, 1) for stage, ms in ctx.timings.items()},
+    )
+
+def answer_cache_stats() -> Optional[dict]:
+    """Hit rate and latency saved by the answer cache (None if disabled)."""
+    answer_cache = get("answer_cache")
+    return answer_cache.stats() if answer_cache else None
 
 # ---------- Public API ----------
 def ask_question(query: str):
-    print(f"🔍 Input Query: {query}")
-
-    detected_lang = detect_language(query)
-    print(f"🌐 Detected Language: {detected_lang}")
-
-    translated_query = translate_to_english(query) if detected_lang != 'en' else query
-    print(f"🌐 Translated Query (EN): {translated_query}")
+    logger.info(f"🔍 Input Query: {query}")
 
-    # Get answer with fallback
-    answer_en, _, _ = _answer_with_fallback(translated_query)
-    print(f"✅ Answer (EN): {answer_en}")
+    ctx, result = _answer_request(query)
+    logger.info(f"🌐 Detected Language: {ctx.lang}")
+    logger.info(f"🌐 Translated Query (EN): {ctx.query_en}")
+    if result["cache_hit"]:
+        logger.info(f"⚡ Served from answer cache: {answer_cache_stats()}")
+    logger.info(f"✅ Answer (EN): {result['answer_en']}")
 
-    final_answer = translate_from_english(answer_en, query) if detected_lang != 'en' else answer_en
-    print(f"🌐 Final Answer: {final_answer}")
+    final_answer = result["answer"]
+    logger.info(f"🌐 Final Answer: {final_answer}")
 
     try:
-        speak_response(final_answer, lang=detected_lang)
+        speak_response(final_answer, lang=ctx.answer_lang)
     except Exception as e:
-        print(f"❌ TTS generation failed: {e}")
+        logger.warning(f"❌ TTS generation failed: {e}")
 
     return final_answer
 
 def answer_query_for_ui(query: str, top_k: int = 3, speak: bool = False):
-    lang = detect_language(query)
-    q_en = translate_to_english(query) if lang != "en" else query
-
-    docs = retriever.invoke(q_en)[:top_k]
-    answer_en, _, used_open = _answer_with_fallback(q_en)
-    final = translate_from_english(answer_en, query) if lang != "en" else answer_en
+    ctx, result = _answer_request(query)
+    final = result["answer"]
 
     audio_path: Optional[str] = None
     if speak:
         try:
-            audio_path = speak_response(final, lang=lang)
+            with ctx.timed("tts"):
+                audio_path = speak_response(final, lang=ctx.answer_lang)
         except Exception as e:
-            print(f"🔇 TTS failed (continuing without voice): {e}")
+            logger.warning(f"🔇 TTS failed (continuing without voice): {e}")
+
+    return {**_ui_result(ctx, result, top_k), "audio_path": audio_path}
 
+def _ui_result(ctx: RequestContext, result: dict, top_k: int) -> dict:
     return {
-        "lang": lang,
-        "answer_en": answer_en,
-        "answer": final,
-        "contexts": [d.page_content for d in docs],
-        "used_open_fallback": used_open,
-        "audio_path": audio_path,
+        "lang": ctx.lang,
+        "answer_lang": ctx.answer_lang,
+        "answer_en": result["answer_en"],
+        "answer": result["answer"],
+        "contexts": result["contexts"][:top_k],
+        "used_open_fallback": result["used_open_fallback"],
+        "cache_hit": result["cache_hit"],
+        "route": ctx.route,
+        "wasted_llm_calls": ctx.wasted_llm_calls,
+        "timings": dict(ctx.timings),
+    }
+
+# ---------- Streaming ----------
+
+def _llm_sentences(prompt) -> Iterator[str]:
+    """Stream an LLM answer and yield it one complete sentence at a time."""
+    buffer = SentenceBuffer()
+    for piece in get("llm_router").stream(prompt):
+        yield from buffer.feed(piece)
+    tail = buffer.flush()
+    if tail:
+        yield tail
+
+def _stream_english_answer(ctx: RequestContext, result: dict) -> Iterator[str]:
+    """
+    Streaming counterpart of `_answer_with_fallback`. Only the first sentence
+    is held back, to decide whether the RAG answer is unhelpful. The "both"
+    route streams like "rag": the open answer is only requested if needed.
+    """
+    route = _route(ctx)
+    with ctx.timed("context"):
+        assembled = _assemble_context(ctx.query_en, ctx.docs, ctx.query_vector, ctx) if route != OPEN else None
+    sentences: Iterator[str] = iter(())
+    first = ""
+    if assembled:
+        sentences = _llm_sentences(_rag_prompt(ctx.query_en, assembled))
+        ctx.llm_calls += 1
+        first = next(sentences, "")
+    if _is_unhelpful_answer(first):
+        if assembled:
+            logger.warning("⚠️ No relevant info in documents. Streaming open answer.")
+            ctx.wasted_llm_calls += 1
+        result["used_open_fallback"] = True
+        sentences = _llm_sentences(OPEN_WEB_PROMPT.format(question=ctx.query_en))
+        ctx.llm_calls += 1
+        first = next(sentences, "")
+    _routing_stats.record(ctx.route, ctx.llm_calls, ctx.wasted_llm_calls)
+    result.update(route=ctx.route, wasted_llm_calls=ctx.wasted_llm_calls)
+    if first:
+        yield first
+    yield from sentences
+
+def _translate_sentence(sentence: str, lang: str) -> str:
+    """Translate one sentence, keeping its trailing whitespace/line break."""
+    core = sentence.rstrip()
+    if lang == ENGLISH or not core:
+        return sentence
+    return translate_from_english(core, src_lang=lang) + sentence[len(core):]
+
+def stream_answer_for_ui(
+    query: str,
+    top_k: int = 3,
+    on_sentence: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[Iterator[str], dict]:
+    """
+    Streaming variant of `answer_query_for_ui`.
+
+    Returns (stream, result): `stream` yields the final answer sentence by
+    sentence, each translated as soon as the LLM completes it, and calls
+    `on_sentence(sentence, answer_lang)` for it (e.g. to start TTS). `result` has the
+    same keys as `answer_query_for_ui` and is complete once the stream is
+    exhausted.
+    """
+    started = time.perf_counter()
+    ctx = prepare_request(query, retrieve=False)
+    result = {
+        "lang": ctx.lang,
+        "answer_lang": ctx.answer_lang,
+        "answer_en": "",
+        "answer": "",
+        "contexts": [],
+        "used_open_fallback": False,
+        "cache_hit": False,
+        "route": "",
+        "wasted_llm_calls": 0,
+        "timings": ctx.timings,  # filled in as the stream advances
+        "audio_path": None,
     }
 
+    answer_cache = get("answer_cache")
+
+    def _generate() -> Iterator[str]:
+        cached = _lookup_cached(answer_cache, ctx) if answer_cache else None
+        if cached:
+            result.update(cached, cache_hit=True, contexts=cached["contexts"][:top_k])
+            _record_request(ctx, result, started)
+            for sentence in split_sentences(cached["answer"]):
+                if on_sentence:
+                    on_sentence(sentence, ctx.answer_lang)
+                yield sentence
+            return
+
+        start = time.perf_counter()
+        retrieve_documents(ctx)
+        result["contexts"] = [d.page_content for d in ctx.docs[:top_k]]
+        parts_en, parts = [], []
+        for sentence_en in _stream_english_answer(ctx, result):
+            sentence = _translate_sentence(sentence_en, ctx.answer_lang)
+            parts_en.append(sentence_en)
+            parts.append(sentence)
+            if on_sentence:
+                on_sentence(sentence, ctx.answer_lang)
+            yield sentence
+
+        result["answer_en"] = "".join(parts_en).strip()
+        result["answer"] = "".join(parts).strip()
+        if answer_cache and result["answer_en"]:
+            answer_cache.store(
+                ctx.query_en, ctx.query_vector, ctx.answer_lang,
+                {**result, "contexts": [d.page_content for d in ctx.docs]},
+                latency_s=time.perf_counter() - start,
+            )
+        _record_request(ctx, result, started)
+
+    return _generate(), result
+
+# ---------- Batch ----------
+
+def prepare_batch(queries: List[str], k: int = RETRIEVER_K) -> List[Tuple[RequestContext, Optional[dict]]]:
+    """
+    `prepare_request` and answer-cache lookup for many questions at once:
+    Hindi questions are translated in one Marian batch, all English queries
+    are embedded in one call and the cache misses are searched with one
+    FAISS call. Returns (context, cached result or None) per question.
+    """
+    ctxs = [RequestContext(query=q) for q in queries]
+    if not ctxs:
+        return []
+    with timed_batch(ctxs, "language_id"):
+        for ctx in ctxs:
+            ctx.lang = detect_language(ctx.query)
+    hindi = [ctx for ctx in ctxs if ctx.lang == HINDI]
+    with timed_batch(hindi, "translate_in"):
+        translated = translate_batch([ctx.query for ctx in hindi], HINDI, ENGLISH) if hindi else []
+    for ctx in ctxs:
+        ctx.query_en = ctx.query
+    for ctx, text in zip(hindi, translated):
+        ctx.query_en = text
+    with timed_batch(ctxs, "embed"):
+        vectors = get("embedding_model").embed_documents([ctx.query_en for ctx in ctxs])
+    for ctx, vector in zip(ctxs, vectors):
+        ctx.query_vector = vector
+
+    answer_cache = get("answer_cache")
+    cached: List[Optional[dict]] = [None] * len(ctxs)
+    if answer_cache:
+        for i, ctx in enumerate(ctxs):
+            with ctx.timed("cache"):
+                hit = _lookup_cached(answer_cache, ctx)
+            cached[i] = {**hit, "cache_hit": True} if hit else None
+    misses = [ctx for ctx, hit in zip(ctxs, cached) if hit is None]
+    if misses:
+        with timed_batch(misses, "search"):
+            rows = get("retriever").search_batch([ctx.query_en for ctx in misses],
+                                                 [ctx.query_vector for ctx in misses], k=k)
+        for ctx, scored_docs in zip(misses, rows):
+            ctx.scored_docs = scored_docs
+    return list(zip(ctxs, cached))
+
+def answer_batch(
+    queries: List[str],
+    pool: Executor,
+    top_k: int = 3,
+    on_result: Optional[Callable[[int, dict], None]] = None,
+) -> List[dict]:
+    """
+    Answer many questions: CPU stages batched (see `prepare_batch`), LLM
+    calls run concurrently on `pool` (the router enforces each provider's
+    concurrency and rate limits), and each question is finished (Hindi
+    translation, cache, metrics) on the pool as soon as its answer arrives;
+    concurrent translations share model batches (backend/micro_batching.py).
+
+    Returns one dict per question with the keys of `answer_query_for_ui`
+    (without audio_path), or {"error": ...} if the question failed.
+    `on_result(i, result)` is called for question `i` as soon as it is done,
+    from the pool's threads. Latencies are per question: its share of the
+    batched stages plus its own work, not the time since the batch started.
+    """
+    prepared = prepare_batch(queries)
+    answer_cache = get("answer_cache")
+
+    def question_start(ctx: RequestContext) -> float:
+        # So far `ctx.timings` holds only its share of the batched stages (see timed_batch).
+        return time.perf_counter() - sum(ctx.timings.values()) / 1000
+
+    def finish(i: int, ctx: RequestContext, result: dict, started: float) -> dict:
+        if "error" not in result:
+            _record_request(ctx, result, started)
+            result = _ui_result(ctx, result, top_k)
+        if on_result:
+            on_result(i, result)
+        return result
+
+    def answer_one(i: int, ctx: RequestContext) -> dict:
+        started = question_start(ctx)
+        try:
+            answer_en, used_open = _answer_with_fallback(ctx)
+            answer = answer_en
+            if ctx.answer_lang != ENGLISH:
+                with ctx.timed("translate_out"):
+                    answer = translate(answer_en, ENGLISH, HINDI)
+        except Exception as e:
+            return finish(i, ctx, {"lang": ctx.lang, "error": repr(e)}, started)
+        result = {
+            "answer_en": answer_en,
+            "answer": answer,
+            "contexts": [d.page_content for d in ctx.docs],
+            "used_open_fallback": used_open,
+        }
+        if answer_cache and answer_en:
+            answer_cache.store(ctx.query_en, ctx.query_vector, ctx.answer_lang, result,
+                               latency_s=time.perf_counter() - started)
+        return finish(i, ctx, {**result, "cache_hit": False}, started)
+
+    futures = {i: pool.submit(answer_one, i, ctx) for i, (ctx, hit) in enumerate(prepared) if hit is None}
+    results = [finish(i, ctx, hit, question_start(ctx)) if hit is not None else None
+               for i, (ctx, hit) in enumerate(prepared)]
+    for i, future in futures.items():
+        results[i] = future.result()
+    return results
+
 # ---------- CLI loop ----------
 if __name__ == "__main__":
+    metrics.configure_logging()
     while True:
         q = input("\n❓ Ask your farming question: ")
         if q.lower() in {"exit", "quit"}:
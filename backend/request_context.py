@@ -0,0 +1,74 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+
+from backend import metrics
+from backend.language_utils import answer_language
+
+
+@dataclass
+class RequestContext:
+    """
+    State of one question as it moves through the pipeline.
+
+    Each stage fills in its field once (language → English query → query
+    vector → scored documents) and later stages read it from here instead of
+    detecting, translating, embedding or searching again.
+    """
+    query: str
+    # "en", "hi" or "hi-Latn" (Hinglish), see backend.language_utils.
+    lang: str = "en"
+    query_en: str = ""
+    query_vector: Optional[List[float]] = None
+    # (document, L2 distance) pairs, best first, in the retriever's order
+    # (dense, BM25 or fused; see backend.bm25).
+    scored_docs: List[Tuple[Document, float]] = field(default_factory=list)
+    # "rag", "open" or "both", chosen from the retrieval score (see backend.routing).
+    route: str = ""
+    route_score: Optional[float] = None
+    # LLM calls made for this request, and how many of their answers were discarded.
+    llm_calls: int = 0
+    wasted_llm_calls: int = 0
+    # Milliseconds spent per stage ("language_id", "translate_in", "embed",
+    # "search", "context", "llm", "translate_out", ...), see `timed()`.
+    # "embed_context" (sentence vectors not yet cached) is part of "context".
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def docs(self) -> List[Document]:
+        return [doc for doc, _ in self.scored_docs]
+
+    @property
+    def answer_lang(self) -> str:
+        """Language of the final answer and its speech ("en" or "hi")."""
+        return answer_language(self.lang)
+
+    @contextmanager
+    def timed(self, stage: str):
+        """
+        Add the time spent in the `with` block to `timings[stage]` and to the
+        stage latency histogram (see backend.metrics).
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed * 1000
+            metrics.STAGE_LATENCY.observe(elapsed, stage=stage)
+
+
+@contextmanager
+def timed_batch(ctxs: Sequence[RequestContext], stage: str):
+    """`RequestContext.timed` for a stage run once for several requests; each is charged an equal share."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        share = (time.perf_counter() - start) / max(len(ctxs), 1)
+        for ctx in ctxs:
+            ctx.timings[stage] = ctx.timings.get(stage, 0.0) + share * 1000
+            metrics.STAGE_LATENCY.observe(share, stage=stage)
@@ -0,0 +1,125 @@
+"""
+Lazily created, process-wide resources (models, indexes, clients).
+
+Modules register a factory instead of building heavy objects at import time:
+
+    register("embedding_model", lambda: HuggingFaceEmbeddings(...))
+    model = get("embedding_model")   # built on first use, then shared
+
+Creation is thread-safe (one lock per resource, so independent resources can
+load concurrently) and timed. Factories may `get()` other resources; the
+time reported for a resource excludes its dependencies. `warm_up()` loads
+everything up front (the Streamlit app does so once per server process via
+`st.cache_resource`) and `startup_report()` breaks the cost down.
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Resource:
+    name: str
+    factory: Callable[[], Any]
+    value: Any = None
+    loaded: bool = False
+    # Seconds spent in the factory itself, excluding nested get() calls.
+    load_s: Optional[float] = None
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+
+class ResourceRegistry:
+    def __init__(self):
+        self._resources: Dict[str, _Resource] = {}
+        self._extra: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register (or replace, before first use) the factory for `name`."""
+        with self._lock:
+            current = self._resources.get(name)
+            if current and current.loaded:
+                raise RuntimeError(f"Resource {name!r} is already loaded")
+            self._resources[name] = _Resource(name, factory)
+
+    def _resource(self, name: str) -> _Resource:
+        try:
+            return self._resources[name]
+        except KeyError:
+            raise KeyError(f"Unknown resource {name!r} (registered: {', '.join(self._resources)})") from None
+
+    def get(self, name: str) -> Any:
+        res = self._resource(name)
+        if res.loaded:
+            return res.value
+        with res.lock:
+            if res.loaded:
+                return res.value
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)  # time spent loading dependencies
+            start = time.perf_counter()
+            try:
+                res.value = res.factory()
+            finally:
+                total = time.perf_counter() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += total
+            res.load_s = total - nested
+            res.loaded = True
+            logger.info(f"📦 Loaded {name} in {res.load_s:.2f}s")
+            return res.value
+
+    def is_loaded(self, name: str) -> bool:
+        return self._resource(name).loaded
+
+    def record(self, name: str, seconds: float):
+        """
+        Add an externally timed startup step (e.g. a module import) to the
+        report. The first measurement is kept, so Streamlit reruns do not
+        overwrite it.
+        """
+        self._extra.setdefault(name, seconds)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, parallel: bool = False) -> List[dict]:
+        """Load `names` (default: everything registered) and return the startup report."""
+        names = list(names) if names is not None else list(self._resources)
+        if parallel:
+            with ThreadPoolExecutor(max_workers=len(names) or 1, thread_name_prefix="warmup") as pool:
+                list(pool.map(self.get, names))
+        else:
+            for name in names:
+                self.get(name)
+        return self.startup_report()
+
+    def startup_report(self) -> List[dict]:
+        """[{"component", "seconds", "loaded"}], in registration order."""
+        rows = [{"component": name, "seconds": s, "loaded": True} for name, s in self._extra.items()]
+        rows += [
+            {"component": r.name, "seconds": r.load_s, "loaded": r.loaded}
+            for r in self._resources.values()
+        ]
+        return rows
+
+    def format_report(self) -> str:
+        rows = self.startup_report()
+        total = sum(r["seconds"] or 0.0 for r in rows)
+        lines = [
+            f"{r['component']:<28} {r['seconds']:>7.2f}s" if r["loaded"] else f"{r['component']:<28} {'(lazy)':>8}"
+            for r in rows
+        ]
+        return "\n".join(lines + [f"{'total':<28} {total:>7.2f}s"])
+
+
+registry = ResourceRegistry()
+register = registry.register
+get = registry.get
+is_loaded = registry.is_loaded
+warm_up = registry.warm_up
+startup_report = registry.startup_report
@@ -0,0 +1,213 @@
+"""
+Route a question before the LLM call, from its retrieval score.
+
+The score is the cosine similarity of the best retrieved chunk (the
+embeddings are unit length, so cosine = 1 - L2² / 2). Questions scoring at
+least `rag_min` are answered with RAG (falling back to an open answer only if
+RAG turns out unhelpful), questions below `open_max` go straight to the open
+prompt, and the band in between sends both prompts at once and keeps the RAG
+answer unless it is unhelpful.
+
+Thresholds are fitted on a labeled question set with
+
+    python backend/routing.py --labels data/routing_questions.jsonl
+
+and saved to `data/routing_thresholds.json`; until then the defaults below
+(or ROUTING_RAG_MIN / ROUTING_OPEN_MAX) apply.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+ROUTING_ENABLED = os.getenv("ROUTING_ENABLED", "1") == "1"
+ROUTING_THRESHOLDS_FILE = os.getenv("ROUTING_THRESHOLDS_FILE", "data/routing_thresholds.json")
+ROUTING_RAG_MIN = float(os.getenv("ROUTING_RAG_MIN", "0.5"))
+ROUTING_OPEN_MAX = float(os.getenv("ROUTING_OPEN_MAX", "0.25"))
+
+RAG, OPEN, BOTH = "rag", "open", "both"
+ROUTES = (RAG, OPEN, BOTH)
+
+
+def route_score(scored_docs: Sequence[Tuple[object, float]]) -> float:
+    """Cosine similarity of the best (document, L2² distance) pair; -1 if there is none."""
+    distances = [d for _, d in scored_docs if d != float("inf")]
+    return 1.0 - min(distances) / 2.0 if distances else -1.0
+
+
+@dataclass
+class RouteThresholds:
+    rag_min: float = ROUTING_RAG_MIN
+    open_max: float = ROUTING_OPEN_MAX
+    # Index the thresholds were fitted on (None = defaults, never fitted).
+    index_version: Optional[str] = None
+
+    def route(self, score: float) -> str:
+        if not ROUTING_ENABLED or score >= self.rag_min:
+            return RAG
+        if score < self.open_max:
+            return OPEN
+        return BOTH
+
+    def save(self, path: str = ROUTING_THRESHOLDS_FILE, **extra):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**asdict(self), **extra}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str = ROUTING_THRESHOLDS_FILE, index_version: Optional[str] = None) -> "RouteThresholds":
+        """Fitted thresholds from `path`, else the configured defaults."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        thresholds = cls(data["rag_min"], data["open_max"], data.get("index_version"))
+        if index_version and thresholds.index_version and thresholds.index_version != index_version:
+            logger.warning("⚠️ Routing thresholds were fitted on another FAISS index; re-run backend/routing.py.")
+        return thresholds
+
+
+class RoutingStats:
+    """Requests per route, LLM calls made, and calls whose answer was thrown away."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: Counter = Counter()
+        self.llm_calls = 0
+        self.wasted_llm_calls = 0
+
+    def record(self, route: str, llm_calls: int, wasted_llm_calls: int):
+        with self._lock:
+            self.routes[route] += 1
+            self.llm_calls += llm_calls
+            self.wasted_llm_calls += wasted_llm_calls
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = sum(self.routes.values())
+            return {
+                "requests": requests,
+                "routes": dict(self.routes),
+                "llm_calls": self.llm_calls,
+                "wasted_llm_calls": self.wasted_llm_calls,
+                "wasted_per_request": self.wasted_llm_calls / requests if requests else 0.0,
+            }
+
+
+# ---------- Calibration ----------
+
+def fit_thresholds(
+    scores: Sequence[float],
+    in_corpus: Sequence[bool],
+    rag_precision: float = 0.9,
+    open_precision: float = 0.95,
+) -> RouteThresholds:
+    """
+    `rag_min`: the lowest score above which at least `rag_precision` of the
+    questions are answerable from the corpus (the rest waste a RAG call).
+    `open_max`: the highest score below which at least `open_precision` of
+    the questions are not (the rest miss a corpus answer). Scores in between
+    form the "both" band.
+    """
+    pairs = sorted(zip(scores, in_corpus), key=lambda p: -p[0])
+    rag_min = pairs[0][0] + 1e-6 if pairs else ROUTING_RAG_MIN
+    hits = 0
+    for n, (score, label) in enumerate(pairs, start=1):
+        hits += label
+        if hits / n >= rag_precision and (n == len(pairs) or pairs[n][0] < score):
+            rag_min = score
+
+    pairs.reverse()
+    open_max = pairs[0][0] if pairs else ROUTING_OPEN_MAX
+    misses = 0
+    for n, (score, label) in enumerate(pairs, start=1):
+        misses += not label
+        if misses / n >= open_precision and (n == len(pairs) or pairs[n][0] > score):
+            open_max = pairs[n][0] if n < len(pairs) else score + 1e-6
+    return RouteThresholds(rag_min=rag_min, open_max=min(open_max, rag_min))
+
+
+def simulate(thresholds: RouteThresholds, scores: Sequence[float], in_corpus: Sequence[bool]) -> dict:
+    """
+    LLM calls per question on the labeled set, assuming a RAG answer is
+    unhelpful exactly when the question is not in the corpus. "baseline" is
+    the old policy: always RAG, then an open call if unhelpful.
+    """
+    routes: Counter = Counter()
+    calls = wasted = missed = 0
+    for score, label in zip(scores, in_corpus):
+        route = thresholds.route(score)
+        routes[route] += 1
+        if route == RAG:
+            calls += 1 if label else 2
+            wasted += 0 if label else 1
+        elif route == OPEN:
+            calls += 1
+            missed += label
+        else:
+            calls += 2
+            wasted += 1
+    n = len(scores) or 1
+    baseline_wasted = sum(not label for label in in_corpus)
+    return {
+        "routes": dict(routes),
+        "llm_calls_per_request": round(calls / n, 3),
+        "wasted_per_request": round(wasted / n, 3),
+        "baseline_llm_calls_per_request": round((len(scores) + baseline_wasted) / n, 3),
+        "baseline_wasted_per_request": round(baseline_wasted / n, 3),
+        "corpus_questions_sent_to_open": missed,
+    }
+
+
+def load_labels(path: str) -> List[dict]:
+    """JSONL of {"question": ..., "in_corpus": true|false}."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _score_questions(questions: Iterable[str]) -> List[float]:
+    from backend.rag_pipeline import prepare_request
+
+    return [route_score(prepare_request(q).scored_docs) for q in questions]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.build_faiss_index import FAISS_INDEX_PATH, index_version
+
+    parser = argparse.ArgumentParser(description="Fit RAG/open routing thresholds on labeled questions.")
+    parser.add_argument("--labels", default="data/routing_questions.jsonl")
+    parser.add_argument("--out", default=ROUTING_THRESHOLDS_FILE)
+    parser.add_argument("--rag-precision", type=float, default=0.9,
+                        help="share of RAG-routed questions that must be answerable from the corpus")
+    parser.add_argument("--open-precision", type=float, default=0.95,
+                        help="share of open-routed questions that must be off-corpus")
+    args = parser.parse_args()
+
+    labels = load_labels(args.labels)
+    start = time.perf_counter()
+    scores = _score_questions(row["question"] for row in labels)
+    in_corpus = [bool(row["in_corpus"]) for row in labels]
+    print(f"📏 Scored {len(labels)} questions in {time.perf_counter() - start:.1f}s")
+
+    for score, row in sorted(zip(scores, labels), key=lambda p: -p[0]):
+        print(f"  {score:6.3f}  {'✓' if row['in_corpus'] else '✗'}  {row['question']}")
+
+    thresholds = fit_thresholds(scores, in_corpus, args.rag_precision, args.open_precision)
+    thresholds.index_version = index_version(FAISS_INDEX_PATH)
+    report = simulate(thresholds, scores, in_corpus)
+    thresholds.save(args.out, fitted_on=len(labels), report=report)
+    print(f"\n✅ rag_min={thresholds.rag_min:.3f}  open_max={thresholds.open_max:.3f}")
+    print(json.dumps(report, indent=2))
+    print(f"💾 Saved to {args.out}")
@@ -0,0 +1,62 @@
+import re
+from typing import List
+
+# Sentence ends: Latin punctuation, Hindi danda (।) and double danda (॥),
+# followed by whitespace; line breaks always end a segment.
+_BOUNDARY = re.compile(r"(?<=[.!?।॥])[ \t]+|\n+")
+
+# Tokens that end with a period without ending the sentence ("Rs. 6000").
+_ABBREVIATIONS = {"rs", "no", "dr", "mr", "mrs", "ms", "st", "vs", "e.g", "i.e", "approx", "govt", "dept"}
+
+
+def _is_abbreviation(text: str) -> bool:
+    if not text.endswith("."):
+        return False
+    last = text[:-1].rsplit(None, 1)[-1].lower() if text[:-1].strip() else ""
+    # Single letters are initials; one- or two-digit numbers are list markers
+    # ("1. Apply online") rather than sentence ends. Longer ones ("in 2019.") end sentences.
+    return (last in _ABBREVIATIONS or (len(last) == 1 and last.isalpha())
+            or (last.isdigit() and len(last) <= 2))
+
+
+def _segments(text: str) -> List[str]:
+    """Split at sentence boundaries, keeping each boundary's whitespace on the left piece."""
+    pieces, start = [], 0
+    for match in _BOUNDARY.finditer(text):
+        if match.group().strip(" \t") == "" and _is_abbreviation(text[start:match.start()]):
+            continue
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    pieces.append(text[start:])
+    return pieces
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences, including Hindi danda-terminated ones.
+
+    Each sentence keeps its trailing whitespace, so `"".join(...)` gives back
+    the original text (formatting such as line breaks survives translation
+    sentence by sentence).
+    """
+    return [s for s in _segments(text) if s.strip()]
+
+
+class SentenceBuffer:
+    """Accumulates streamed text and releases it one complete sentence at a time."""
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        """Add a chunk; return the sentences it completed."""
+        self._pending += chunk
+        pieces = _segments(self._pending)
+        # The last piece may still grow; it is only complete once followed by a boundary.
+        self._pending = pieces.pop()
+        return [p for p in pieces if p.strip()]
+
+    def flush(self) -> str:
+        """Return whatever is left once the stream has ended."""
+        rest, self._pending = self._pending, ""
+        return rest if rest.strip() else ""
@@ -1,68 +1,200 @@
-from transformers import MarianMTModel, MarianTokenizer
-from langdetect import detect
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import re
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from backend import metrics
+from backend.language_utils import ENGLISH, HINDI, SUPPORTED_LANGUAGES, answer_language, detect_language
+from backend.micro_batching import MICROBATCH_ENABLED, MicroBatcher
+from backend.resources import get, register
+from backend.text_utils import split_sentences
+from backend.translation_backends import TRANSLATION_BACKEND, load_translation_model
+from backend.translation_memory import TRANSLATION_MEMORY_ENABLED, TranslationMemory
+
+logger = logging.getLogger(__name__)
 
 # Supported languages
-LANGUAGES = {
-    "en": "English",
-    "hi": "Hindi"
-}
+LANGUAGES = SUPPORTED_LANGUAGES
 
 # Model names
 MODEL_NAME_EN_HI = "Helsinki-NLP/opus-mt-en-hi"
 MODEL_NAME_HI_EN = "Helsinki-NLP/opus-mt-hi-en"
 
+# Decoding: "beam" (num_beams beams) or "greedy" (faster, slightly lower quality)
+TRANSLATION_DECODING = os.getenv("TRANSLATION_DECODING", "beam")
+TRANSLATION_NUM_BEAMS = int(os.getenv("TRANSLATION_NUM_BEAMS", "4"))
+TRANSLATION_BATCH_SIZE = int(os.getenv("TRANSLATION_BATCH_SIZE", "16"))
+# Sentences longer than this are split further at clause boundaries, so the
+# 512-token model limit never cuts text off.
+MAX_SEGMENT_CHARS = 400
+
 # Cache models
 tokenizer_cache = {}
 model_cache = {}
+_load_lock = threading.Lock()
+
+def load_model(model_name: str, backend: Optional[str] = None):
+    """Tokenizer and model on `backend` (default TRANSLATION_BACKEND), loaded once."""
+    key = (model_name, backend or TRANSLATION_BACKEND)
+    with _load_lock:
+        if key not in tokenizer_cache:
+            tokenizer_cache[key], model_cache[key] = load_translation_model(*key)
+    return tokenizer_cache[key], model_cache[key]
+
+# Registered so warm_up() can load both directions ahead of the first request.
+register("translator_hi_en", lambda: load_model(MODEL_NAME_HI_EN))
+register("translator_en_hi", lambda: load_model(MODEL_NAME_EN_HI))
+# Opened on the first translation, not at import (it creates its SQLite file).
+register("translation_memory", lambda: TranslationMemory() if TRANSLATION_MEMORY_ENABLED else None)
+
+def _model_name(src_lang: str, tgt_lang: str) -> str:
+    if src_lang == "en" and tgt_lang == "hi":
+        return MODEL_NAME_EN_HI
+    if src_lang == "hi" and tgt_lang == "en":
+        return MODEL_NAME_HI_EN
+    raise ValueError(f"Unsupported translation direction: {src_lang} → {tgt_lang}")
+
+def _split_long(segment: str, limit: int = MAX_SEGMENT_CHARS) -> List[str]:
+    """Break an over-long sentence at , ; : and then at spaces."""
+    if len(segment) <= limit:
+        return [segment]
+    pieces, current = [], ""
+    for part in re.split(r"(?<=[,;:])\s+", segment):
+        while len(part) > limit:
+            cut = part.rfind(" ", 0, limit)
+            cut = cut if cut > 0 else limit
+            pieces.append(part[:cut])
+            part = part[cut:].lstrip()
+        if current and len(current) + 1 + len(part) > limit:
+            pieces.append(current)
+            current = part
+        else:
+            current = f"{current} {part}" if current else part
+    if current:
+        pieces.append(current)
+    return pieces
+
+def _segment(text: str) -> List[List[str]]:
+    """Sentences of `text`, each as its list of model-sized pieces."""
+    return [_split_long(s.strip()) for s in split_sentences(text)]
 
-def load_model(model_name: str):
-    if model_name not in tokenizer_cache:
-        tokenizer_cache[model_name] = MarianTokenizer.from_pretrained(model_name)
-        model_cache[model_name] = MarianMTModel.from_pretrained(model_name)
-    return tokenizer_cache[model_name], model_cache[model_name]
+def _generate(model_name: str, segments: List[str], backend: Optional[str] = None) -> List[str]:
+    """Translate segments in padded, length-sorted batches."""
+    tokenizer, model = load_model(model_name, backend)
+    num_beams = 1 if TRANSLATION_DECODING == "greedy" else TRANSLATION_NUM_BEAMS
+    order = sorted(range(len(segments)), key=lambda i: len(segments[i]), reverse=True)
+    out: List[Optional[str]] = [None] * len(segments)
+    for start in range(0, len(order), TRANSLATION_BATCH_SIZE):
+        batch = order[start:start + TRANSLATION_BATCH_SIZE]
+        inputs = tokenizer([segments[i] for i in batch], return_tensors="pt",
+                           padding=True, truncation=True, max_length=512)
+        translated = model.generate(**inputs, num_beams=num_beams, max_length=512)
+        for i, decoded in zip(batch, tokenizer.batch_decode(translated, skip_special_tokens=True)):
+            out[i] = decoded
+    return out
+
+def translate_batch(
+    texts: List[str],
+    src_lang: str,
+    tgt_lang: str,
+    backend: Optional[str] = None,
+    use_memory: bool = True,
+) -> List[str]:
+    """
+    Translate several texts at once.
+
+    Every text is split into sentences (Latin punctuation and the Hindi danda),
+    sentences already in the translation memory are reused, and the rest are
+    translated together in padded batches. Line breaks between sentences are
+    kept. `backend` overrides TRANSLATION_BACKEND; `use_memory=False` bypasses
+    the translation memory (for benchmarks).
+    """
+    if src_lang == tgt_lang:
+        return list(texts)
+    model_name = _model_name(src_lang, tgt_lang)
+    direction = f"{src_lang}-{tgt_lang}"
+    memory = get("translation_memory") if use_memory else None
+
+    segmented = [_segment(text) for text in texts]
+    unique = list(dict.fromkeys(p for sentences in segmented for s in sentences for p in s))
+    known: Dict[str, str] = memory.get_many(direction, unique) if memory else {}
+    missing = [p for p in unique if p not in known]
+    if missing:
+        new = dict(zip(missing, _generate(model_name, missing, backend)))
+        known.update(new)
+        if memory:
+            memory.put_many(direction, new)
+    if memory:
+        memory.record(hits=len(unique) - len(missing), misses=len(missing))
+    metrics.TRANSLATION_SEGMENTS.inc(len(unique) - len(missing), direction=direction, source="memory")
+    metrics.TRANSLATION_SEGMENTS.inc(len(missing), direction=direction, source="model")
+
+    results = []
+    for text, sentences in zip(texts, segmented):
+        separators = [s[len(s.rstrip()):] for s in split_sentences(text)]
+        results.append("".join(
+            " ".join(known[p] for p in pieces) + sep
+            for pieces, sep in zip(sentences, separators)
+        ).strip())
+    return results
+
+_batchers: Dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+def _batcher(src_lang: str, tgt_lang: str) -> MicroBatcher:
+    """One micro-batcher per direction: concurrent translate() calls share a generate()."""
+    direction = f"{src_lang}-{tgt_lang}"
+    with _batchers_lock:
+        if direction not in _batchers:
+            _batchers[direction] = MicroBatcher(
+                f"translate_{src_lang}_{tgt_lang}",
+                lambda texts: translate_batch(texts, src_lang, tgt_lang),
+            )
+        return _batchers[direction]
 
 def translate(text: str, src_lang: str, tgt_lang: str) -> str:
     if src_lang == tgt_lang:
         return text
-
-    if src_lang == "en" and tgt_lang == "hi":
-        model_name = MODEL_NAME_EN_HI
-    elif src_lang == "hi" and tgt_lang == "en":
-        model_name = MODEL_NAME_HI_EN
-    else:
-        raise ValueError(f"Unsupported translation direction: {src_lang} → {tgt_lang}")
-
-    tokenizer, model = load_model(model_name)
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True)
-    translated = model.generate(**inputs, max_length=512)
-    return tokenizer.decode(translated[0], skip_special_tokens=True)
-
-# Language detection
-def detect_language(text: str) -> str:
-    try:
-        lang = detect(text)
-        return lang if lang in LANGUAGES else "en"
-    except:
-        return "en"
+    if not MICROBATCH_ENABLED:
+        return translate_batch([text], src_lang, tgt_lang)[0]
+    _model_name(src_lang, tgt_lang)  # unsupported directions fail in the caller
+    return _batcher(src_lang, tgt_lang)(text)
 
 # Convert to English
-def translate_to_english(text: str) -> str:
-    src_lang = detect_language(text)
-    print(f"🌐 Detected language: {LANGUAGES.get(src_lang, 'Unknown')}")
-    return translate(text, src_lang=src_lang, tgt_lang="en")
+def translate_to_english(text: str, src_lang: Optional[str] = None) -> str:
+    """
+    Translate to English; pass `src_lang` if the language is already known.
+
+    Only Devanagari Hindi goes through the model: Hinglish is passed on as is,
+    since the hi→en model cannot read romanized Hindi and the embedding model
+    and LLM already cope with the English words mixed into it.
+    """
+    src_lang = src_lang or detect_language(text)
+    logger.info(f"🌐 Detected language: {LANGUAGES.get(src_lang, 'Unknown')}")
+    return translate(text, src_lang=HINDI, tgt_lang=ENGLISH) if src_lang == HINDI else text
 
 # Convert back
-def translate_from_english(answer: str, original_input: str) -> str:
-    src_lang = detect_language(original_input)
-    return translate(answer, src_lang="en", tgt_lang="hi") if src_lang == "hi" else answer
+def translate_from_english(answer: str, original_input: str = "", src_lang: Optional[str] = None) -> str:
+    """Translate an English answer into the language of the question (Hindi for Hinglish)."""
+    src_lang = src_lang or detect_language(original_input)
+    if answer_language(src_lang) == HINDI:
+        return translate(answer, src_lang=ENGLISH, tgt_lang=HINDI)
+    return answer
 
 # Example usage
 if __name__ == "__main__":
+    metrics.configure_logging()
     hindi_input = "टमाटर की फसल को कौन सा उर्वरक देना चाहिए?"
     english_input = "What fertilizer is best for tomato crops?"
+    hinglish_input = "Tamatar ki fasal ke liye kaun sa khad chahiye?"
 
     print("\n🔁 Hindi → English:", translate_to_english(hindi_input))
     print("🔁 English → English:", translate_to_english(english_input))
+    print("🔁 Hinglish → (as is):", translate_to_english(hinglish_input))
 
     english_answer = "Tomato crops need balanced NPK fertilizer and organic compost."
     print("\n🈯 English Answer → Hindi:", translate_from_english(english_answer, hindi_input))
@@ -0,0 +1,103 @@
+"""
+Interchangeable runtimes for the Marian en↔hi translation models.
+
+    torch      full-precision PyTorch (default)
+    int8       PyTorch with dynamic int8 quantization of Linear layers
+    onnx       ONNX Runtime export of the same model
+    onnx-int8  ONNX Runtime export with dynamically quantized int8 weights
+
+All backends return a (tokenizer, model) pair whose model has the usual
+`generate()` method. ONNX exports are written once to `ONNX_MODEL_DIR` and
+loaded from there afterwards; run this module to export ahead of deploys:
+
+    python backend/translation_backends.py --backend onnx-int8
+"""
+import os
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+TRANSLATION_BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "data/models/onnx")
+
+_ONNX_PARTS = ("encoder_model", "decoder_model", "decoder_with_past_model")
+
+
+def _export_dir(model_name: str, quantized: bool) -> str:
+    name = model_name.replace("/", "__") + ("-int8" if quantized else "")
+    return os.path.join(ONNX_MODEL_DIR, name)
+
+
+def export_onnx(model_name: str, quantized: bool = False) -> str:
+    """Export (and optionally quantize) a Marian model to ONNX. Returns its directory."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import MarianTokenizer
+
+    fp32_dir = _export_dir(model_name, quantized=False)
+    if not os.path.exists(os.path.join(fp32_dir, "encoder_model.onnx")):
+        logger.info(f"📦 Exporting {model_name} to ONNX...")
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+        model.save_pretrained(fp32_dir)
+        MarianTokenizer.from_pretrained(model_name).save_pretrained(fp32_dir)
+    if not quantized:
+        return fp32_dir
+
+    int8_dir = _export_dir(model_name, quantized=True)
+    if not os.path.exists(os.path.join(int8_dir, "encoder_model_quantized.onnx")):
+        logger.info(f"📦 Quantizing {model_name} ONNX export to int8...")
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        for part in _ONNX_PARTS:
+            if os.path.exists(os.path.join(fp32_dir, f"{part}.onnx")):
+                quantizer = ORTQuantizer.from_pretrained(fp32_dir, file_name=f"{part}.onnx")
+                quantizer.quantize(save_dir=int8_dir, quantization_config=qconfig)
+        MarianTokenizer.from_pretrained(fp32_dir).save_pretrained(int8_dir)
+    return int8_dir
+
+
+def _load_onnx(model_name: str, quantized: bool):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import MarianTokenizer
+
+    path = export_onnx(model_name, quantized=quantized)
+    suffix = "_quantized" if quantized else ""
+    file_names = {
+        f"{part.replace('_model', '')}_file_name": f"{part}{suffix}.onnx"
+        for part in _ONNX_PARTS
+        if os.path.exists(os.path.join(path, f"{part}{suffix}.onnx"))
+    }
+    return MarianTokenizer.from_pretrained(path), ORTModelForSeq2SeqLM.from_pretrained(path, **file_names)
+
+
+def load_translation_model(model_name: str, backend: str = TRANSLATION_BACKEND):
+    """Load (tokenizer, model) for `model_name` on the chosen runtime."""
+    from transformers import MarianMTModel, MarianTokenizer
+
+    if backend == "torch":
+        return MarianTokenizer.from_pretrained(model_name), MarianMTModel.from_pretrained(model_name)
+    if backend == "int8":
+        import torch
+
+        model = MarianMTModel.from_pretrained(model_name).eval()
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return MarianTokenizer.from_pretrained(model_name), model
+    if backend in ("onnx", "onnx-int8"):
+        return _load_onnx(model_name, quantized=backend == "onnx-int8")
+    raise ValueError(f"Unknown translation backend: {backend} (choose from {TRANSLATION_BACKENDS})")
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from backend import metrics
+    from backend.translate import MODEL_NAME_EN_HI, MODEL_NAME_HI_EN
+
+    parser = argparse.ArgumentParser(description="Export the translation models for an ONNX backend.")
+    parser.add_argument("--backend", choices=("onnx", "onnx-int8"), default="onnx-int8")
+    args = parser.parse_args()
+    metrics.configure_logging()
+    for name in (MODEL_NAME_EN_HI, MODEL_NAME_HI_EN):
+        print(f"✅ {name} → {export_onnx(name, quantized=args.backend == 'onnx-int8')}")
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple
+
+# === Configuration ===
+TRANSLATION_MEMORY_PATH = os.getenv("TRANSLATION_MEMORY_PATH", "data/translation_memory.sqlite3")
+TRANSLATION_MEMORY_ENABLED = os.getenv("TRANSLATION_MEMORY_ENABLED", "1") == "1"
+MEMO_MAX_SEGMENTS = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    direction TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (direction, source)
+);
+"""
+
+
+class TranslationMemory:
+    """
+    Persistent cache of translated segments keyed by (direction, segment).
+
+    Recurring sentences — scheme names, eligibility boilerplate, greetings —
+    are translated once and then served from SQLite. Recently used segments
+    are also kept in a process-local dict.
+    """
+
+    def __init__(self, path: str = TRANSLATION_MEMORY_PATH):
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._memo: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, direction: str, segments: Iterable[str]) -> Dict[str, str]:
+        """Return {segment: translation} for the segments already translated."""
+        found: Dict[str, str] = {}
+        with self._lock:
+            for segment in segments:
+                key = (direction, segment)
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    found[segment] = self._memo[key]
+                    continue
+                row = self._db.execute(
+                    "SELECT target FROM segments WHERE direction = ? AND source = ?", key
+                ).fetchone()
+                if row:
+                    found[segment] = row[0]
+                    self._remember(key, row[0])
+        return found
+
+    def put_many(self, direction: str, translations: Dict[str, str]):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO segments (direction, source, target) VALUES (?, ?, ?)",
+                [(direction, s, t) for s, t in translations.items()],
+            )
+            self._db.commit()
+            for segment, target in translations.items():
+                self._remember((direction, segment), target)
+
+    def _remember(self, key: Tuple[str, str], target: str):
+        self._memo[key] = target
+        self._memo.move_to_end(key)
+        if len(self._memo) > MEMO_MAX_SEGMENTS:
+            self._memo.popitem(last=False)
+
+    def record(self, hits: int, misses: int):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            size = self._db.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {
+            "segments": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -1,20 +1,347 @@
-from gtts import gTTS
+"""
+Text-to-speech for answers.
+
+    text = "नमस्ते किसान भाई। ..."
+    path = text_to_speech(text, lang="hi", autoplay=False)
+
+Answers are split into sentences that are synthesized in parallel and joined
+into one file. Every sentence and every full answer is stored in a
+content-addressed cache keyed by (engine, lang, text), so a repeated answer
+is served from disk without any synthesis. The cache is bounded by size and
+evicts the least recently used files. Playback runs in the background.
+
+Engines are pluggable (`TTS_ENGINE`): "gtts" (Google, needs network) or
+"espeak" (espeak-ng, fully offline). Tests can pass `fakes.FakeTTSEngine`.
+"""
+import io
 import os
+import sys
+import wave
+import shutil
+import atexit
+import hashlib
+import logging
 import tempfile
 import platform
-from typing import Literal
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Literal, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.text_utils import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+TTS_ENGINE = os.getenv("TTS_ENGINE", "gtts")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "data/tts_cache")
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") == "1"
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "200"))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+# Sentences shorter than this are merged with the next one, so a list of
+# short items does not turn into many tiny requests.
+MIN_SEGMENT_CHARS = 40
+
+
+# ---------- Engines ----------
+
+class TTSEngine(ABC):
+    """
+    A speech synthesizer. `synthesize` returns the encoded audio of one text;
+    `concat` joins several such clips into one.
+    """
+    name = "base"
+    format = "mp3"
+
+    @abstractmethod
+    def synthesize(self, text: str, lang: str) -> bytes:
+        ...
+
+    def concat(self, clips: List[bytes]) -> bytes:
+        # MP3 frames can simply be concatenated.
+        return b"".join(clips)
+
+
+class GTTSEngine(TTSEngine):
+    """Google Translate TTS (network)."""
+    name = "gtts"
+    format = "mp3"
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        from gtts import gTTS
+
+        buf = io.BytesIO()
+        gTTS(text=text, lang=lang).write_to_fp(buf)
+        return buf.getvalue()
+
+
+class EspeakEngine(TTSEngine):
+    """espeak-ng (offline, robotic but always available on air-gapped nodes)."""
+    name = "espeak"
+    format = "wav"
+
+    def __init__(self, executable: Optional[str] = None):
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        if not self.executable:
+            raise RuntimeError("espeak-ng is not installed")
+        proc = subprocess.run(
+            [self.executable, "-v", lang, "--stdout", text],
+            capture_output=True, check=True, timeout=60,
+        )
+        return proc.stdout
+
+    def concat(self, clips: List[bytes]) -> bytes:
+        out = io.BytesIO()
+        writer = None
+        for clip in clips:
+            with wave.open(io.BytesIO(clip), "rb") as reader:
+                if writer is None:
+                    writer = wave.open(out, "wb")
+                    writer.setparams(reader.getparams())
+                writer.writeframes(reader.readframes(reader.getnframes()))
+        if writer is not None:
+            writer.close()
+        return out.getvalue()
+
+
+ENGINES = {"gtts": GTTSEngine, "espeak": EspeakEngine}
+
+
+def make_engine(name: str = TTS_ENGINE) -> TTSEngine:
+    if name not in ENGINES:
+        raise ValueError(f"Unknown TTS engine: {name} (choose from {tuple(ENGINES)})")
+    return ENGINES[name]()
+
+
+# ---------- Storage ----------
+
+class AudioCache:
+    """
+    Content-addressed audio files in `cache_dir`, bounded to `max_bytes`.
+
+    Reads refresh a file's mtime; when the total size goes over the budget the
+    files with the oldest mtime are deleted first.
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024)):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total = sum(e.stat().st_size for e in os.scandir(cache_dir) if e.is_file())
+
+    @staticmethod
+    def key(engine: str, lang: str, text: str) -> str:
+        return hashlib.sha256(f"{engine}\0{lang}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{ext}")
+
+    def get(self, key: str, ext: str) -> Optional[str]:
+        path = self._path(key, ext)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
 
-def play_audio(file_path: str):
-    """Cross-platform audio playback."""
+    def put(self, key: str, ext: str, data: bytes) -> str:
+        path = self._path(key, ext)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            with self._lock:
+                old = os.path.getsize(path) if os.path.exists(path) else 0
+                os.replace(tmp, path)
+                self._total += len(data) - old
+                self._evict(keep=path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return path
+
+    def _evict(self, keep: str):
+        if self._total <= self.max_bytes:
+            return
+        entries = sorted(
+            (e for e in os.scandir(self.cache_dir) if e.is_file() and not e.name.endswith(".part")),
+            key=lambda e: e.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._total <= self.max_bytes:
+                break
+            if entry.path == keep:
+                continue
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._total -= size
+            except FileNotFoundError:
+                pass
+
+    def size_bytes(self) -> int:
+        return self._total
+
+
+class _ScratchDir:
+    """Temporary directory for audio when the cache is disabled; removed at exit."""
+
+    def __init__(self):
+        self._dir: Optional[tempfile.TemporaryDirectory] = None
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes, ext: str) -> str:
+        with self._lock:
+            if self._dir is None:
+                self._dir = tempfile.TemporaryDirectory(prefix="krishi_tts_")
+                atexit.register(self._dir.cleanup)
+        fd, path = tempfile.mkstemp(dir=self._dir.name, suffix=f".{ext}")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return path
+
+
+# ---------- Synthesis ----------
+
+def _segments(text: str) -> List[str]:
+    """Sentences of `text`, with short ones merged into the next."""
+    segments, current = [], ""
+    for sentence in split_sentences(text):
+        current += sentence
+        if len(current.strip()) >= MIN_SEGMENT_CHARS:
+            segments.append(current.strip())
+            current = ""
+    if current.strip():
+        segments.append(current.strip())
+    return segments
+
+
+class Synthesizer:
+    """Cached, sentence-parallel synthesis on one engine."""
+
+    def __init__(
+        self,
+        engine: Optional[TTSEngine] = None,
+        cache: Optional[AudioCache] = None,
+        workers: int = TTS_WORKERS,
+    ):
+        self.engine = engine or make_engine()
+        self.cache = cache
+        self.workers = workers
+        self._scratch = _ScratchDir()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+
+    def _clip(self, text: str, lang: str) -> bytes:
+        """Audio for one segment, from the cache if possible."""
+        key = AudioCache.key(self.engine.name, lang, text)
+        if self.cache:
+            path = self.cache.get(key, self.engine.format)
+            if path:
+                with open(path, "rb") as f:
+                    return f.read()
+        data = self.engine.synthesize(text, lang)
+        if self.cache:
+            self.cache.put(key, self.engine.format, data)
+        return data
+
+    def synthesize(self, text: str, lang: str) -> str:
+        """Path of an audio file speaking `text`."""
+        ext = self.engine.format
+        key = AudioCache.key(self.engine.name, lang, text)
+        if self.cache:
+            path = self.cache.get(key, ext)
+            if path:
+                return path
+
+        segments = _segments(text) or [text]
+        if len(segments) == 1:
+            data = self._clip(segments[0], lang)
+        else:
+            data = self.engine.concat(list(self._pool.map(lambda s: self._clip(s, lang), segments)))
+        if self.cache:
+            return self.cache.put(key, ext, data)
+        return self._scratch.write(data, ext)
+
+
+_synthesizer: Optional[Synthesizer] = None
+_synthesizer_lock = threading.Lock()
+
+
+def get_synthesizer() -> Synthesizer:
+    """The process-wide synthesizer for TTS_ENGINE (created on first use)."""
+    global _synthesizer
+    with _synthesizer_lock:
+        if _synthesizer is None:
+            _synthesizer = Synthesizer(cache=AudioCache() if TTS_CACHE_ENABLED else None)
+        return _synthesizer
+
+
+def audio_format() -> str:
+    """File format ("mp3" or "wav") of the audio the current engine produces."""
+    return get_synthesizer().engine.format
+
+
+def join_audio(paths: List[str]) -> bytes:
+    """Concatenate audio files produced by `text_to_speech` into one clip."""
+    clips = []
+    for path in paths:
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                clips.append(f.read())
+    return get_synthesizer().engine.concat(clips) if clips else b""
+
+
+# ---------- Playback ----------
+
+_player: Optional[subprocess.Popen] = None
+_player_lock = threading.Lock()
+
+
+def _player_command(file_path: str) -> List[str]:
+    system = platform.system()
+    if system == "Windows":
+        return ["cmd", "/c", "start", "/min", "wmplayer", file_path]
+    if system == "Darwin":  # macOS
+        return ["afplay", file_path]
+    if file_path.endswith(".wav"):  # Linux
+        return ["aplay", "-q", file_path]
+    return ["mpg123", "-q", file_path]
+
+
+def stop_playback():
+    """Stop the clip that is currently playing, if any."""
+    global _player
+    with _player_lock:
+        if _player and _player.poll() is None:
+            _player.terminate()
+        _player = None
+
+
+def play_audio(file_path: str, block: bool = False):
+    """Cross-platform audio playback; returns immediately unless `block`."""
+    global _player
+    stop_playback()
     try:
-        if platform.system() == "Windows":
-            os.system(f'start /min wmplayer "{file_path}"')
-        elif platform.system() == "Darwin":  # macOS
-            os.system(f"afplay '{file_path}'")
-        else:  # Linux
-            os.system(f"mpg123 '{file_path}'")
+        proc = subprocess.Popen(
+            _player_command(file_path),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
     except Exception as e:
-        print(f"⚠️ Audio playback failed: {e}")
+        logger.warning(f"⚠️ Audio playback failed: {e}")
+        return
+    with _player_lock:
+        _player = proc
+    if block:
+        proc.wait()
+
 
 def text_to_speech(text: str, lang: Literal["hi", "en"] = "hi", autoplay: bool = True) -> str:
     """
@@ -23,35 +350,28 @@ def text_to_speech(text: str, lang: Literal["hi", "en"] = "hi", autoplay: bool =
     Args:
         text (str): Text to convert.
         lang (str): Language code - 'hi' for Hindi, 'en' for English.
-        autoplay (bool): If True, plays the audio immediately.
+        autoplay (bool): If True, starts playing the audio in the background.
 
     Returns:
-        str: Path to the saved audio file.
+        str: Path to the audio file ("" on failure). With the cache enabled
+        the file belongs to the cache; otherwise it is removed at exit.
     """
     try:
-        # Generate TTS
-        tts = gTTS(text=text, lang=lang)
-
-        # Save to a temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-        tts.save(temp_file.name)
-
-        # Optionally autoplay
+        path = get_synthesizer().synthesize(text, lang)
         if autoplay:
-            play_audio(temp_file.name)
-
-        return temp_file.name
+            play_audio(path)
+        return path
 
     except Exception as e:
-        print(f"❌ TTS generation failed: {e}")
+        logger.warning(f"❌ TTS generation failed: {e}")
         return ""
 
-def speak_response(text: str, lang: str = "hi"):
-    """Simple wrapper to speak a response."""
-    text_to_speech(text, lang=lang, autoplay=True)
+def speak_response(text: str, lang: str = "hi") -> str:
+    """Simple wrapper to speak a response; returns the audio file path."""
+    return text_to_speech(text, lang=lang, autoplay=True)
 
 # Example usage
 if __name__ == "__main__":
     hindi_text = "नमस्ते किसान भाई, आपकी फसल के लिए यह जानकारी उपयोगी है।"
     print("🔈 Playing Hindi TTS...")
-    text_to_speech(hindi_text, lang="hi")
+    play_audio(text_to_speech(hindi_text, lang="hi", autoplay=False), block=True)
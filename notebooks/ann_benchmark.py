@@ -0,0 +1,92 @@
+# ANN backend benchmark: recall@k against exact search and search latency.
+#
+#   python notebooks/ann_benchmark.py                      # cached corpus vectors
+#   python notebooks/ann_benchmark.py --synthetic 300000   # simulate a large corpus
+#
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from backend.ann_index import INDEX_BACKENDS, build_index
+from backend.build_faiss_index import EMBEDDING_MODEL_NAME
+from backend.embedding_stage import EMBEDDING_CACHE_DIR, EmbeddingCache
+
+# --- Configuration ---
+parser = argparse.ArgumentParser()
+parser.add_argument("--synthetic", type=int, default=0,
+                    help="benchmark N random clustered vectors instead of the embedding cache")
+parser.add_argument("--queries", type=int, default=500)
+parser.add_argument("--k", type=int, default=4)
+parser.add_argument("--backends", default=",".join(INDEX_BACKENDS))
+parser.add_argument("--json", help="also write results to this file")
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+
+# --- Corpus vectors ---
+if args.synthetic:
+    dim = 384
+    centers = rng.normal(size=(max(1, args.synthetic // 500), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=args.synthetic)
+    corpus = centers[labels] + 0.3 * rng.normal(size=(args.synthetic, dim)).astype(np.float32)
+else:
+    cache = EmbeddingCache(EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME)
+    if not len(cache):
+        raise SystemExit("❌ Embedding cache is empty. Build the index first or use --synthetic N.")
+    corpus = np.asarray(cache._vectors(), dtype=np.float32)
+corpus = np.ascontiguousarray(corpus)
+print(f"✅ Corpus: {corpus.shape[0]} vectors × {corpus.shape[1]} dims")
+
+# Queries are perturbed corpus vectors, so every query has true near neighbours.
+picks = rng.integers(0, len(corpus), size=args.queries)
+scale = float(np.std(corpus)) * 0.1
+queries = np.ascontiguousarray(corpus[picks] + scale * rng.normal(size=(args.queries, corpus.shape[1])),
+                               dtype=np.float32)
+
+# --- Ground truth from exact search ---
+exact = faiss.IndexFlatL2(corpus.shape[1])
+exact.add(corpus)
+_, truth = exact.search(queries, args.k)
+
+# --- Benchmark ---
+results = []
+for backend in args.backends.split(","):
+    t0 = time.perf_counter()
+    index, params = build_index(backend, corpus)
+    index.add(corpus)
+    build_s = time.perf_counter() - t0
+
+    latencies = []
+    found = np.empty_like(truth)
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter()
+        _, ids = index.search(q[None, :], args.k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found[i] = ids[0]
+
+    recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+    results.append({
+        "backend": backend,
+        "params": params,
+        f"recall@{args.k}": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+        "build_s": round(build_s, 2),
+    })
+
+print(f"\n{'backend':<10} {'recall@' + str(args.k):>10} {'p50 ms':>9} {'p99 ms':>9} {'build s':>9}  params")
+for r in results:
+    print(f"{r['backend']:<10} {r[f'recall@{args.k}']:>10.3f} {r['p50_ms']:>9.3f} "
+          f"{r['p99_ms']:>9.3f} {r['build_s']:>9.2f}  {r['params']}")
+
+if args.json:
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump({"n_vectors": int(corpus.shape[0]), "k": args.k, "results": results}, f, indent=2)
+    print(f"\n💾 Results saved to {args.json}")
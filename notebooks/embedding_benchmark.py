@@ -0,0 +1,162 @@
+# Query encoder benchmark: ONNX / int8 backends vs. torch, with a recall-parity check.
+#
+#   python backend/embedding_backends.py --backend onnx-int8      # export once
+#   python notebooks/embedding_benchmark.py --backends torch,onnx,onnx-int8 --k 4,8
+#
+# Each backend runs in its own process, which reports the import time of its
+# runtime, the model load time, per-query latency (one question at a time,
+# as on the request path) and peak RSS. Its query vectors are then searched
+# against the existing FAISS index (built with torch), and every backend is
+# scored against torch: overlap@k is the share of torch's top-k chunks the
+# backend also retrieves, averaged over the query set. Queries are a fixed
+# set of farmer questions plus sentences sampled from data/cleaned_docs.
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import resource
+import time
+import multiprocessing as mp
+
+import numpy as np
+
+from backend.text_utils import split_sentences
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLEANED_DIR = os.path.join(PROJECT_ROOT, "data", "cleaned_docs")
+INDEX_PATH = os.path.join(PROJECT_ROOT, "data", "faiss_index")
+
+QUESTIONS = [
+    "How much money does PM-Kisan give farmers per year?",
+    "Who is excluded from PM-Kisan benefits?",
+    "What interest subvention is available under the Agriculture Infrastructure Fund?",
+    "Which post harvest projects are eligible under AIF?",
+    "What is the rainfall forecast for Nagpur district?",
+    "What should cotton farmers in Nagpur do after heavy rain?",
+    "On which days are agromet advisories issued?",
+    "What are District Agromet Units?",
+    "Can paddy straw be made into pellets?",
+    "How is crop residue used to produce biogas?",
+    "Is zero tillage useful after rice?",
+    "Does mulch help wheat with limited irrigation?",
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+parser.add_argument("--samples", type=int, default=200, help="sentences sampled from the documents as extra queries")
+parser.add_argument("--k", default="4,8", help="overlap@k cut-offs")
+parser.add_argument("--index", default=INDEX_PATH)
+parser.add_argument("--json", help="also write results to this file")
+
+
+def load_queries(n: int):
+    sentences = []
+    for file in sorted(os.listdir(CLEANED_DIR)):
+        if file.endswith(".txt"):
+            with open(os.path.join(CLEANED_DIR, file), encoding="utf-8") as f:
+                sentences.extend(s.strip() for s in split_sentences(f.read()) if 30 <= len(s.strip()) <= 200)
+    random.Random(0).shuffle(sentences)
+    return QUESTIONS + sentences[:n]
+
+
+def run_backend(backend: str, queries, queue):
+    """Runs in a child process: import, load, encode one query at a time, report vectors and timings."""
+    t0 = time.perf_counter()
+    if backend == "torch":
+        import langchain_huggingface  # noqa: F401
+        import sentence_transformers  # noqa: F401
+    else:
+        import onnxruntime  # noqa: F401
+        import tokenizers  # noqa: F401
+    import_s = time.perf_counter() - t0
+
+    from backend.build_faiss_index import EMBEDDING_MODEL_NAME
+    from backend.embedding_backends import load_query_encoder
+
+    t0 = time.perf_counter()
+    encoder = load_query_encoder(EMBEDDING_MODEL_NAME, backend=backend)
+    load_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    encoder.embed_query(queries[0])
+    first_ms = (time.perf_counter() - t0) * 1000
+
+    vectors, latencies = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        vectors.append(encoder.embed_query(query))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    queue.put({
+        "backend": backend,
+        "import_s": round(import_s, 2),
+        "load_s": round(load_s, 2),
+        "first_query_ms": round(first_ms, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "torch_imported": "torch" in sys.modules,
+        "vectors": vectors,
+    })
+
+
+def overlap_at_k(ids: np.ndarray, reference: np.ndarray, k: int) -> float:
+    return float(np.mean([len(set(a[:k]) & set(b[:k])) / k for a, b in zip(ids, reference)]))
+
+
+if __name__ == "__main__":
+    import faiss
+    from backend.ann_index import apply_search_params
+    from backend.build_faiss_index import INDEX_FILE, index_metadata, load_manifest
+
+    args = parser.parse_args()
+    cutoffs = [int(k) for k in args.k.split(",")]
+    queries = load_queries(args.samples)
+    print(f"✅ {len(queries)} queries.")
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for backend in args.backends.split(","):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_backend, args=(backend, queries, queue))
+        proc.start()
+        results[backend] = queue.get()
+        proc.join()
+        print(f"⏱️ {backend}: done")
+
+    # The index as the app searches it (same nprobe / efSearch).
+    index = faiss.read_index(os.path.join(args.index, INDEX_FILE))
+    apply_search_params(index, index_metadata(load_manifest(args.index))["params"])
+    ranked = {}
+    for backend, r in results.items():
+        _, ranked[backend] = index.search(np.asarray(r["vectors"], dtype=np.float32), max(cutoffs))
+
+    reference = "torch" if "torch" in results else next(iter(results))
+    ref_vectors = np.asarray(results[reference]["vectors"], dtype=np.float32)
+    rows = []
+    for backend, r in results.items():
+        vectors = np.asarray(r["vectors"], dtype=np.float32)
+        cosine = np.sum(vectors * ref_vectors, axis=1) / (
+            np.linalg.norm(vectors, axis=1) * np.linalg.norm(ref_vectors, axis=1))
+        rows.append({
+            **{key: value for key, value in r.items() if key != "vectors"},
+            "cosine_vs_" + reference: round(float(cosine.mean()), 4),
+            **{f"overlap@{k}": round(overlap_at_k(ranked[backend], ranked[reference], k), 3) for k in cutoffs},
+        })
+
+    print(f"\n{'backend':<10} {'import s':>9} {'load s':>7} {'first ms':>9} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'RSS MB':>7} {'cosine':>7} " + " ".join(f"{'ovl@' + str(k):>7}" for k in cutoffs))
+    for r in rows:
+        print(f"{r['backend']:<10} {r['import_s']:>9} {r['load_s']:>7} {r['first_query_ms']:>9} {r['p50_ms']:>7} "
+              f"{r['p95_ms']:>7} {r['peak_rss_mb']:>7} {r['cosine_vs_' + reference]:>7} "
+              + " ".join(f"{r[f'overlap@{k}']:>7}" for k in cutoffs))
+    print(f"\nOverlap and cosine are measured against the {reference} encoder.")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
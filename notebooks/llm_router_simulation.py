@@ -0,0 +1,121 @@
+# Offline simulation of the LLM provider router with fake providers.
+#
+#   python notebooks/llm_router_simulation.py
+#
+# Shows how requests behave during a primary-provider brownout with and
+# without hedging, and when the primary's quota is exhausted, and checks that
+# a circuit breaker whose half-open trial is abandoned (hedge lost, stream
+# dropped) still lets the recovered primary back in, and that streaming waits
+# for quota and fails over from a provider that hangs before its first chunk.
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+
+import numpy as np
+
+from backend.fakes import FakeLLM
+from backend.llm_router import AllProvidersFailed, CircuitBreaker, Provider, ProviderRouter
+
+N_REQUESTS = 40
+
+
+async def run(name: str, router: ProviderRouter, concurrency: int = 4):
+    latencies, served, failed = [], {}, 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal failed
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                result = await router.ainvoke(f"question {i}")
+                served[result.provider] = served.get(result.provider, 0) + 1
+            except AllProvidersFailed:
+                failed += 1
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(one(i) for i in range(N_REQUESTS)))
+    print(f"\n▶ {name}")
+    print(f"  p50 {np.percentile(latencies, 50):.2f}s  p99 {np.percentile(latencies, 99):.2f}s  "
+          f"served {served}  failed {failed}")
+    print(f"  {router.stats()}")
+
+
+def brownout_primary(**kw) -> Provider:
+    # Slow and failing: 50% errors after 1.5 s.
+    return Provider("gemini", FakeLLM(["gemini answer"], latency_s=1.5, error_rate=0.5, seed=1),
+                    timeout_s=2.0, breaker=CircuitBreaker(failure_threshold=3, reset_s=5), **kw)
+
+
+def healthy_secondary(**kw) -> Provider:
+    return Provider("groq", FakeLLM(["groq answer"], latency_s=0.2, jitter_s=0.1, seed=2), **kw)
+
+
+def half_open_primary(latency_s: float) -> Provider:
+    breaker = CircuitBreaker(failure_threshold=1, reset_s=0.2)
+    breaker.record_failure()
+    time.sleep(0.25)  # the next request is the half-open trial
+    return Provider("gemini", FakeLLM(["gemini answer"], latency_s=latency_s, seed=4), breaker=breaker)
+
+
+async def breaker_recovers_after_abandoned_trial():
+    # Hedge: the slow trial call loses to the secondary and is cancelled.
+    primary = half_open_primary(latency_s=1.0)
+    router = ProviderRouter([primary, healthy_secondary()], hedge_after_s=0.1)
+    first = await router.ainvoke("question 1")
+    await asyncio.sleep(0.05)  # let the cancelled trial unwind
+    primary.llm.latency_s = 0.05  # the primary has recovered
+    second = await router.ainvoke("question 2")
+    assert (first.provider, second.provider) == ("groq", "gemini"), (first, second)
+    assert primary.breaker.state == "closed", primary.breaker.state
+
+    # Stream: the consumer stops reading after the first chunk.
+    primary = half_open_primary(latency_s=0.05)
+    router = ProviderRouter([primary, healthy_secondary()], hedge_after_s=None)
+    stream = router.stream("question 3")
+    next(stream)
+    stream.close()
+    assert primary.admit(1) is None, "breaker stuck after an abandoned stream"
+    primary.release()
+    print("\n▶ Abandoned half-open trials (hedge lost, stream dropped): primary recovers ✅")
+
+
+def streaming_waits_for_quota_and_times_out():
+    # Quota: the only provider is out of requests for the next second.
+    primary = Provider("gemini", FakeLLM(["gemini answer"], seed=5), rpm=60)
+    while primary.admit(1) is None:
+        primary.release()
+    router = ProviderRouter([primary], hedge_after_s=None, max_wait_s=3.0)
+    t0 = time.perf_counter()
+    text = "".join(router.stream("question 4"))
+    waited = time.perf_counter() - t0
+    assert text == "gemini answer" and 0.5 < waited < 3.0, (text, waited)
+
+    # Hang: the primary sends nothing within its timeout; the secondary answers.
+    primary = Provider("gemini", FakeLLM(["gemini answer"], latency_s=5.0, seed=6), timeout_s=0.3)
+    router = ProviderRouter([primary, healthy_secondary()], hedge_after_s=None)
+    t0 = time.perf_counter()
+    text = "".join(router.stream("question 5"))
+    elapsed = time.perf_counter() - t0
+    assert text == "groq answer" and elapsed < 1.5, (text, elapsed)
+    assert router.failovers == 1 and primary.in_flight == 0, router.stats()
+    print(f"\n▶ Streaming: waited {waited:.2f}s for quota, failed over after {elapsed:.2f}s of silence ✅")
+
+
+async def main():
+    await run("Brownout, circuit breaker only",
+              ProviderRouter([brownout_primary(), healthy_secondary()], hedge_after_s=None))
+    await run("Brownout, hedging after 0.5 s",
+              ProviderRouter([brownout_primary(), healthy_secondary()], hedge_after_s=0.5))
+    healthy_primary = Provider("gemini", FakeLLM(["gemini answer"], latency_s=0.3, seed=3), rpm=10)
+    await run("Primary quota of 10 RPM exhausted",
+              ProviderRouter([healthy_primary, healthy_secondary()], hedge_after_s=None))
+    await breaker_recovers_after_abandoned_trial()
+    streaming_waits_for_quota_and_times_out()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+# Load test for the micro-batching scheduler (backend/micro_batching.py).
+#
+#   python notebooks/microbatch_benchmark.py --concurrency 1,4,16,32
+#   python notebooks/microbatch_benchmark.py --models translate --wait-ms 0,2,5
+#
+# Closed-loop clients (one thread each) send single requests to the local
+# MiniLM embedder (`embed_query`) and the en→hi Marian translator
+# (`translate`), once calling the model directly (a batch of one per request,
+# as before) and once through a MicroBatcher per window size. Texts are
+# sentences from data/cleaned_docs; the translation memory is bypassed.
+# Reports throughput and p50/p95/p99 latency per concurrency level, and the
+# mean batch size the scheduler formed.
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import threading
+import time
+
+import numpy as np
+
+from backend import metrics
+from backend.micro_batching import MICROBATCH_MAX_SIZE, MicroBatcher
+from backend.text_utils import split_sentences
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLEANED_DIR = os.path.join(PROJECT_ROOT, "data", "cleaned_docs")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--models", default="embed,translate", help="embed, translate or both")
+parser.add_argument("--concurrency", default="1,4,16,32")
+parser.add_argument("--wait-ms", default="0,2", help="batching windows to compare, e.g. 0,2,5")
+parser.add_argument("--max-batch", type=int, default=MICROBATCH_MAX_SIZE)
+parser.add_argument("--requests", type=int, default=256, help="requests per measurement (translate: / 4)")
+parser.add_argument("--json", help="also write results to this file")
+
+
+def load_samples(n: int):
+    """Question-sized English sentences from the cleaned documents."""
+    sentences = []
+    for file in sorted(os.listdir(CLEANED_DIR)):
+        if file.endswith(".txt"):
+            with open(os.path.join(CLEANED_DIR, file), encoding="utf-8") as f:
+                sentences.extend(s.strip() for s in split_sentences(f.read()) if 30 <= len(s.strip()) <= 200)
+    random.Random(0).shuffle(sentences)
+    return (sentences * (n // max(len(sentences), 1) + 1))[:n]
+
+
+def load_test(call, texts, workers: int) -> dict:
+    """`workers` closed-loop clients share `texts`; returns throughput and latency percentiles."""
+    latencies = []
+    lock = threading.Lock()
+    next_text = iter(texts)
+
+    def client():
+        while True:
+            with lock:
+                text = next(next_text, None)
+            if text is None:
+                return
+            t0 = time.perf_counter()
+            call(text)
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(workers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    return {
+        "workers": workers,
+        "throughput_rps": round(len(texts) / wall, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1),
+    }
+
+
+def batch_sizes(name: str) -> dict:
+    return metrics.MICROBATCH_SIZE.snapshot().get(name, {"count": 0, "sum": 0.0})
+
+
+def mean_batch_size(name: str, before: dict) -> float:
+    after = batch_sizes(name)
+    count = after["count"] - before["count"]
+    return round((after["sum"] - before["sum"]) / count, 1) if count else 0.0
+
+
+def model_calls(model: str):
+    """(single-request call, batch function) for one model."""
+    if model == "embed":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        from backend.build_faiss_index import EMBEDDING_MODEL_NAME
+
+        embedder = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+        return embedder.embed_query, embedder.embed_documents
+    if model == "translate":
+        from backend import translate as tr
+
+        tr.load_model(tr.MODEL_NAME_EN_HI)
+        return (lambda text: tr.translate_batch([text], "en", "hi", use_memory=False)[0],
+                lambda texts: tr.translate_batch(texts, "en", "hi", use_memory=False))
+    raise ValueError(f"Unknown model: {model}")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    concurrency = [int(c) for c in args.concurrency.split(",")]
+    windows = [float(w) for w in args.wait_ms.split(",")]
+    results = {"max_batch": args.max_batch, "models": {}}
+
+    for model in args.models.split(","):
+        single, batch_fn = model_calls(model)
+        n = args.requests if model == "embed" else max(args.requests // 4, 8)
+        texts = load_samples(n)
+        for text in texts[:4]:  # warm-up
+            single(text)
+
+        rows = [{"mode": "direct", **load_test(single, texts, w)} for w in concurrency]
+        for wait_ms in windows:
+            name = f"bench_{model}_{wait_ms:g}ms"
+            batcher = MicroBatcher(name, batch_fn, max_batch_size=args.max_batch, max_wait_ms=wait_ms)
+            for w in concurrency:
+                before = batch_sizes(name)
+                row = load_test(batcher, texts, w)
+                rows.append({"mode": f"batched {wait_ms:g}ms", **row, "mean_batch": mean_batch_size(name, before)})
+        results["models"][model] = rows
+
+        print(f"\n{model}: {n} requests")
+        print(f"{'mode':<14} {'workers':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'batch':>6}")
+        for row in rows:
+            print(f"{row['mode']:<14} {row['workers']:>7} {row['throughput_rps']:>8.2f} {row['p50_ms']:>9.1f} "
+                  f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row.get('mean_batch', 1):>6}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results saved to {args.json}")
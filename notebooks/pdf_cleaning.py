@@ -1,3 +1,4 @@
+# Superseded by backend/ingest.py (parallel, table-aware, page-level chunks); kept for reference.
 
 
 # 📁 Step 1: Imports
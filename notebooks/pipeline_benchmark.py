@@ -0,0 +1,300 @@
+# End-to-end pipeline benchmark with fake LLM / TTS / ASR providers.
+#
+#   python notebooks/pipeline_benchmark.py --json bench/$(git rev-parse --short HEAD).json
+#   python notebooks/pipeline_benchmark.py --compare bench/<old>.json
+#
+# Builds a FAISS index from data/cleaned_docs into a temporary folder, then
+# answers a fixed English / Hindi / Hinglish query set the way a voice request
+# flows through the app: ASR → answer_query_for_ui → TTS. Gemini/Groq, gTTS and
+# the speech API are replaced by the deterministic fakes in backend/fakes.py
+# (latency set with --llm-latency / --tts-latency / --asr-latency); the
+# embedding and translation models are the real local ones. Reports per-stage
+# p50/p95/p99, throughput at several concurrency levels and peak RSS.
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per fake LLM call")
+parser.add_argument("--tts-latency", type=float, default=0.3, help="seconds per fake TTS segment")
+parser.add_argument("--asr-latency", type=float, default=0.4, help="seconds per fake ASR locale")
+parser.add_argument("--repeat", type=int, default=2, help="passes over the query set per measurement")
+parser.add_argument("--concurrency", default="1,4,8")
+parser.add_argument("--keep-caches", action="store_true",
+                    help="leave answer cache / translation memory / TTS cache on (default: off)")
+parser.add_argument("--json", help="write results to this file")
+parser.add_argument("--compare", help="baseline JSON to compare against")
+parser.add_argument("--tolerance", type=float, default=0.10, help="relative slowdown reported as a regression")
+parser.add_argument("--verbose", action="store_true", help="show pipeline log output")
+args = parser.parse_args()
+
+# Must be set before the backend modules read their configuration.
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ["TTS_ENGINE"] = "fake"  # registered below
+if not args.keep_caches:
+    os.environ["ANSWER_CACHE_ENABLED"] = "0"
+    os.environ["TRANSLATION_MEMORY_ENABLED"] = "0"
+    os.environ["TTS_CACHE_ENABLED"] = "0"
+
+# (query, language)
+QUERIES = [
+    ("How much money does PM-Kisan give farmers per year?", "en"),
+    ("What interest subvention is available under the Agriculture Infrastructure Fund?", "en"),
+    ("What should cotton farmers in Nagpur do after heavy rain?", "en"),
+    ("On which days are agromet advisories issued?", "en"),
+    ("How can paddy straw be used instead of burning it?", "en"),
+    ("Is zero tillage useful for wheat after rice?", "en"),
+    ("पीएम किसान योजना में किसानों को साल में कितने पैसे मिलते हैं?", "hi"),
+    ("कृषि अवसंरचना कोष में ब्याज छूट कितनी है?", "hi"),
+    ("नागपुर में कपास की फसल के लिए क्या सलाह है?", "hi"),
+    ("कृषि मौसम सलाह किस दिन जारी होती है?", "hi"),
+    ("धान की पराली का क्या उपयोग किया जा सकता है?", "hi"),
+    ("गेहूं में शून्य जुताई के क्या फायदे हैं?", "hi"),
+    ("PM Kisan yojana mein kitne paise milte hain?", "hi-Latn"),
+    ("AIF loan ke liye kaun apply kar sakta hai?", "hi-Latn"),
+    ("kapas ki fasal mein keede lage hain, kya karna chahiye?", "hi-Latn"),
+    ("Nagpur mein agle hafte mausam kaisa rahega?", "hi-Latn"),
+    ("parali jalane ki jagah kya kar sakte hain?", "hi-Latn"),
+    ("barish ke baad gehun ki buvai kab karni chahiye?", "hi-Latn"),
+]
+
+STAGES = ["asr", "language_id", "translate_in", "embed", "search", "context", "llm", "translate_out", "tts"]
+
+FAKE_ANSWER = (
+    "According to the documents, eligible farmers receive support under the scheme. "
+    "The amount is paid in instalments directly to their bank accounts. "
+    "Contact your local agriculture office or KVK for details."
+)
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"n": 0}
+    a = np.asarray(values, dtype=np.float64)
+    return {
+        "n": len(a),
+        "mean_ms": round(float(a.mean()), 2),
+        "p50_ms": round(float(np.percentile(a, 50)), 2),
+        "p95_ms": round(float(np.percentile(a, 95)), 2),
+        "p99_ms": round(float(np.percentile(a, 99)), 2),
+    }
+
+
+def voice_clip(seconds: float = 2.0, rate: int = 48000) -> bytes:
+    """A stereo 48 kHz WAV with speech-like bursts between silences (exercises preprocessing)."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    voiced = np.sin(2 * np.pi * 180 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)) * 0.4
+    voiced += 0.02 * rng.normal(size=len(t))
+    silence = np.zeros(int(0.5 * rate))
+    mono = np.concatenate([silence, voiced, silence])
+    pcm = (np.clip(np.stack([mono, mono], axis=1), -1, 1) * 32767).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Print p50/p95 changes per stage; return the regressions."""
+    regressions = []
+    rows = [(f"stage {s}", baseline["stages"].get(s, {}), current["stages"].get(s, {})) for s in current["stages"]]
+    rows.append(("end to end", baseline["end_to_end"], current["end_to_end"]))
+    print(f"\n{'':<22} {'p50 old → new':>22} {'p95 old → new':>22}")
+    for name, old, new in rows:
+        cells = []
+        for key in ("p50_ms", "p95_ms"):
+            if key not in old or key not in new:
+                cells.append(f"{'—':>22}")
+                continue
+            change = (new[key] - old[key]) / old[key] if old[key] else 0.0
+            flag = " ⚠️" if change > tolerance and new[key] - old[key] > 1.0 else ""
+            if flag:
+                regressions.append(f"{name} {key} {old[key]} → {new[key]} ms ({change:+.0%})")
+            cells.append(f"{old[key]:>8.1f} → {new[key]:>7.1f} {change:+5.0%}{flag}")
+        print(f"{name:<22} " + " ".join(cells))
+    return regressions
+
+
+if __name__ == "__main__":
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "rss_mb": {},
+    }
+
+    t0 = time.perf_counter()
+    with quiet:
+        from app.voice_input import transcribe_audio
+        from backend import tts_response
+        from backend import rag_pipeline as rp
+        from backend.bm25 import HybridRetriever, RETRIEVAL_MODE, load_bm25
+        from backend.build_faiss_index import DOCS_FOLDER, load_vectorstore, update_faiss_index
+        from backend.fakes import FakeLLM, FakeRecognizer, FakeTTSEngine
+        from backend.llm_router import Provider, ProviderRouter
+        from backend.resources import get, register
+        from backend.routing import RouteThresholds
+    results["import_s"] = round(time.perf_counter() - t0, 3)
+    results["rss_mb"]["after_import"] = round(rss_mb(), 1)
+
+    # --- Fakes ---
+    register("llm_router", lambda: ProviderRouter([
+        Provider("gemini", FakeLLM(lambda prompt: FAKE_ANSWER, latency_s=args.llm_latency, seed=1),
+                 context_tokens=rp.GEMINI_CONTEXT_TOKENS),
+        Provider("groq", FakeLLM(lambda prompt: FAKE_ANSWER, latency_s=args.llm_latency, seed=2),
+                 context_tokens=rp.GROQ_CONTEXT_TOKENS),
+    ], hedge_after_s=None))
+    register("route_thresholds", RouteThresholds)  # defaults, so runs are comparable
+    tts_response.ENGINES["fake"] = lambda: FakeTTSEngine(latency_s=args.tts_latency)
+
+    # --- Indexing ---
+    index_dir = tempfile.mkdtemp(prefix="krishigpt-bench-")
+    try:
+        with quiet:
+            t0 = time.perf_counter()
+            embedding_model = get("embedding_model")
+            results["embedding_model_load_s"] = round(time.perf_counter() - t0, 3)
+            t0 = time.perf_counter()
+            stats = update_faiss_index(embedding_model, DOCS_FOLDER, index_dir, rebuild=True, cache_dir=None)
+            build_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            update_faiss_index(embedding_model, DOCS_FOLDER, index_dir, cache_dir=None)
+            noop_s = time.perf_counter() - t0
+        results["index"] = {
+            "chunks": stats["added"],
+            "build_s": round(build_s, 3),
+            "chunks_per_s": round(stats["added"] / build_s, 1) if build_s else None,
+            "noop_update_s": round(noop_s, 3),
+        }
+        results["rss_mb"]["after_index"] = round(rss_mb(), 1)
+        print(f"✅ Index: {stats['added']} chunks in {build_s:.1f}s (no-op update {noop_s:.2f}s)")
+
+        register("vectorstore", lambda: load_vectorstore(get("embedding_model"), index_dir))
+        register("retriever", lambda: HybridRetriever(
+            vectorstore=get("vectorstore"), bm25=load_bm25(get("vectorstore"), index_dir),
+            k=rp.RETRIEVER_K, mode=RETRIEVAL_MODE,
+        ))
+
+        clip = voice_clip()
+
+        def voice_request(query: str) -> dict:
+            start = time.perf_counter()
+            timings = {}
+            t = time.perf_counter()
+            recognizer = FakeRecognizer({"hi-IN": (query, 0.95)}, latency_s=args.asr_latency)
+            text = transcribe_audio(clip, recognizer=recognizer).text
+            timings["asr"] = (time.perf_counter() - t) * 1000
+            result = rp.answer_query_for_ui(text, speak=False)
+            timings.update(result["timings"])
+            t = time.perf_counter()
+            tts_response.text_to_speech(result["answer"], lang=result["answer_lang"], autoplay=False)
+            timings["tts"] = (time.perf_counter() - t) * 1000
+            timings["total"] = (time.perf_counter() - start) * 1000
+            return timings
+
+        # --- Cold start: first request loads the translation models ---
+        with quiet:
+            t0 = time.perf_counter()
+            for query, _ in QUERIES:
+                voice_request(query)
+            results["warmup_s"] = round(time.perf_counter() - t0, 3)
+        results["rss_mb"]["after_warmup"] = round(rss_mb(), 1)
+
+        # --- Sequential: per-stage latency ---
+        runs = []
+        with quiet:
+            for _ in range(args.repeat):
+                for query, lang in QUERIES:
+                    runs.append((lang, voice_request(query)))
+        stages = [s for s in STAGES if any(s in t for _, t in runs)]
+        stages += sorted({s for _, t in runs for s in t} - set(stages) - {"total"})
+        results["stages"] = {s: percentiles([t[s] for _, t in runs if s in t]) for s in stages}
+        results["end_to_end"] = percentiles([t["total"] for _, t in runs])
+        results["end_to_end_by_lang"] = {
+            lang: percentiles([t["total"] for l, t in runs if l == lang]) for lang in ("en", "hi", "hi-Latn")
+        }
+
+        # --- Throughput under concurrency ---
+        results["concurrency"] = []
+        for level in [int(c) for c in args.concurrency.split(",")]:
+            batch = [q for q, _ in QUERIES] * args.repeat
+            with quiet, ThreadPoolExecutor(max_workers=level) as pool:
+                t0 = time.perf_counter()
+                timings = list(pool.map(voice_request, batch))
+                wall = time.perf_counter() - t0
+            results["concurrency"].append({
+                "workers": level,
+                "requests": len(batch),
+                "throughput_rps": round(len(batch) / wall, 3),
+                **percentiles([t["total"] for t in timings]),
+            })
+        results["rss_mb"]["after_load"] = round(rss_mb(), 1)
+        results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+    # --- Report ---
+    print(f"\n{len(QUERIES)} queries × {args.repeat}, LLM {args.llm_latency}s / TTS {args.tts_latency}s / "
+          f"ASR {args.asr_latency}s (fake)")
+    print(f"{'stage':<14} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, p in list(results["stages"].items()) + [("total", results["end_to_end"])]:
+        print(f"{stage:<14} {p['p50_ms']:>9.1f} {p['p95_ms']:>9.1f} {p['p99_ms']:>9.1f}")
+    print(f"\n{'workers':<8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in results["concurrency"]:
+        print(f"{row['workers']:<8} {row['throughput_rps']:>8.2f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f}")
+    print(f"\n🧠 Peak RSS {results['peak_rss_mb']:.0f} MB  {results['rss_mb']}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"💾 Results saved to {args.json}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            print("\n⚠️ Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
@@ -0,0 +1,122 @@
+# Retrieval benchmark: dense vs. BM25 vs. hybrid (RRF) on curated agri questions.
+#
+#   python notebooks/retrieval_benchmark.py            # hit rate per mode
+#   python notebooks/retrieval_benchmark.py --llm      # also count open-fallback LLM calls
+#
+# A question is a hit when one of the top-k chunks comes from the expected
+# document and contains one of the answer keywords. Without --llm, misses are
+# reported as the expected open-fallback calls (the RAG answer will be
+# unhelpful when the context lacks the answer); with --llm the RAG prompt is
+# actually sent and unhelpful answers are counted (uses LLM quota).
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from backend.bm25 import RETRIEVAL_MODES, HybridRetriever, load_bm25
+from backend.build_faiss_index import FAISS_INDEX_PATH
+
+# (question, expected source file prefix, answer keywords)
+QUESTIONS = [
+    ("How much money does PM-Kisan give farmers per year?", "PM-Kisan", ["6000"]),
+    ("Who is excluded from PM-Kisan benefits?", "PM-Kisan", ["exclusion"]),
+    ("How are PM-Kisan beneficiaries identified by the states?", "PM-Kisan", ["identif"]),
+    ("Can a tribal family in Manipur use a village authority certificate for PM-Kisan?",
+     "OperationalGuidelinesManipur", ["village authority"]),
+    ("What interest subvention is available under AIF?", "Operational Guidelines of Financing", ["interest subvention"]),
+    ("Which agency gives the credit guarantee for AIF loans?", "Operational Guidelines of Financing", ["cgtmse"]),
+    ("Which post harvest projects are eligible under the Agriculture Infrastructure Fund?",
+     "Operational Guidelines of Financing", ["post harvest"]),
+    ("What is the total size of the AIF financing facility?", "Operational Guidelines of Financing", ["1,00,000"]),
+    ("What is the maximum temperature forecast for Nagpur?", "NAGPUR", ["tmax"]),
+    ("What is the rainfall forecast for Nagpur district?", "NAGPUR", ["rainfall"]),
+    ("What should cotton farmers in Nagpur do this week?", "NAGPUR", ["cotton"]),
+    ("What are the duties of an Agromet Observer under GKMS?", "Roles and Responsibility", ["observ"]),
+    ("What are District Agromet Units?", "Roles and Responsibility", ["district agromet unit"]),
+    ("On which days are agromet advisories issued?", "gkms_sop", ["tuesday"]),
+    ("When did IMD start the Farmers Weather Bulletin?", "gkms_sop", ["1945"]),
+    ("What is the role of KVKs in Gramin Krishi Mausam Sewa?", "gkms_sop", ["kvk"]),
+    ("Can paddy straw be made into pellets?", "Ex-Situ", ["pellet"]),
+    ("How is crop residue used to produce bio-CNG or biogas?", "Ex-Situ", ["bio-cng", "biogas"]),
+    ("Can rice straw be used for ethanol production?", "Ex-Situ", ["ethanol"]),
+    ("Does keeping crop residue as mulch help wheat with limited irrigation?", "crop-management", ["mulch"]),
+    ("Is zero tillage useful after rice?", "crop-management", ["zero till"]),
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--k", type=int, default=4)
+parser.add_argument("--modes", default=",".join(RETRIEVAL_MODES))
+parser.add_argument("--llm", action="store_true", help="send RAG prompts and count unhelpful answers")
+parser.add_argument("--json", help="also write results to this file")
+
+
+def is_hit(docs, source_prefix: str, keywords) -> bool:
+    return any(
+        doc.metadata.get("source", "").startswith(source_prefix)
+        and any(k in doc.page_content.lower() for k in keywords)
+        for doc in docs
+    )
+
+
+def evaluate(vectorstore, bm25, embed_query, k: int, modes, llm_answer=None):
+    """Hit rate, latency and open-fallback count per retrieval mode."""
+    vectors = [embed_query(q) for q, _, _ in QUESTIONS]
+    rows = []
+    for mode in modes:
+        retriever = HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=k, mode=mode)
+        hits, fallbacks, latencies, missed = 0, 0, [], []
+        for (question, source, keywords), vector in zip(QUESTIONS, vectors):
+            t0 = time.perf_counter()
+            docs = [doc for doc, _ in retriever.search(question, vector)]
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hit = is_hit(docs, source, keywords)
+            hits += hit
+            if not hit:
+                missed.append(question)
+            if llm_answer is not None:
+                fallbacks += llm_answer(question, docs)
+            else:
+                fallbacks += not hit
+        rows.append({
+            "mode": mode,
+            f"hit@{k}": round(hits / len(QUESTIONS), 3),
+            "open_fallbacks": fallbacks,
+            "fallbacks_measured": llm_answer is not None,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "missed": missed,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    from backend import rag_pipeline as rp
+
+    vectorstore = rp.vectorstore
+    bm25 = load_bm25(vectorstore, FAISS_INDEX_PATH)
+    llm_answer = None
+    if args.llm:
+        def llm_answer(question, docs):
+            return rp._is_unhelpful_answer(rp._call_llm_with_rag(question, docs))
+
+    rows = evaluate(vectorstore, bm25, rp.embedding_model.embed_query, args.k,
+                    args.modes.split(","), llm_answer)
+
+    print(f"\n{len(QUESTIONS)} questions, k={args.k}")
+    print(f"{'mode':<8} {'hit@k':>7} {'open fallbacks':>15} {'p50 ms':>8}")
+    for r in rows:
+        suffix = "" if r["fallbacks_measured"] else " (est.)"
+        print(f"{r['mode']:<8} {r[f'hit@{args.k}']:>7} {str(r['open_fallbacks']) + suffix:>15} {r['p50_ms']:>8}")
+    for r in rows:
+        for q in r["missed"]:
+            print(f"  ✗ [{r['mode']}] {q}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
@@ -1,9 +1,15 @@
 import os
+import sys
 import pandas as pd
 import faiss
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
-import pickle
+from langchain.schema import Document
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.ann_index import DEFAULT_INDEX_BACKEND, build_index
+from backend.build_faiss_index import INDEX_FILE, chunk_id
+from backend.chunk_store import write_chunk_store
 
 # --- Always save to project root's vectorstore directory ---
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -16,11 +22,14 @@ model = SentenceTransformer('all-MiniLM-L6-v2')
 # 📂 Step 3: Load CSV chunks
 CLEANED_DOCS_DIR = r"C:\Users\saiha\OneDrive\Documents\Krishi_GPT\data\cleaned_docs"
 all_chunks = []
+all_sources = []
 
 for fname in os.listdir(CLEANED_DOCS_DIR):
     if fname.endswith(".csv"):
         df = pd.read_csv(os.path.join(CLEANED_DOCS_DIR, fname))
-        all_chunks.extend(df['content'].dropna().tolist())
+        contents = df['content'].dropna().tolist()
+        all_chunks.extend(contents)
+        all_sources.extend([fname] * len(contents))
 
 print(f"✅ Loaded {len(all_chunks)} text chunks from cleaned_docs.")
 
@@ -28,10 +37,9 @@ print(f"✅ Loaded {len(all_chunks)} text chunks from cleaned_docs.")
 embeddings = model.encode(all_chunks, show_progress_bar=True)
 
 # 🧩 Step 5: Build FAISS index
-dimension = embeddings[0].shape[0]
-index = faiss.IndexFlatL2(dimension)
+index, index_params = build_index(DEFAULT_INDEX_BACKEND, embeddings)
 index.add(embeddings)
-print(f"✅ FAISS index built with {index.ntotal} vectors.")
+print(f"✅ FAISS {DEFAULT_INDEX_BACKEND} index built with {index.ntotal} vectors ({index_params}).")
 
 # 🔎 Step 6: Test Similarity Search
 query = "What fertilizer to use for cotton crop?"
@@ -44,9 +52,9 @@ print("\n🔍 Top Results for Query:")
 for rank, idx in enumerate(I[0]):
     print(f"{rank+1}. {all_chunks[idx][:200]}...\n")
 
-# 💾 Save FAISS index & metadata for reuse in project root's vectorstore/
-faiss.write_index(index, os.path.join(VECTORSTORE_DIR, "index.faiss"))
-with open(os.path.join(VECTORSTORE_DIR, "index.pkl"), "wb") as f:
-    pickle.dump(all_chunks, f)
+# 💾 Save FAISS index & chunks (memory-mapped chunk store, no pickle) to project root's vectorstore/
+faiss.write_index(index, os.path.join(VECTORSTORE_DIR, INDEX_FILE))
+docs = [Document(page_content=text, metadata={"source": source}) for text, source in zip(all_chunks, all_sources)]
+write_chunk_store(VECTORSTORE_DIR, [f"{i}:{chunk_id(d.metadata['source'], d.page_content)}" for i, d in enumerate(docs)], docs)
 
-print("✅ FAISS index and metadata saved to vectorstore/ as index.faiss and index.pkl")
\ No newline at end of file
+print("✅ FAISS index and chunks saved to vectorstore/ as index.faiss and chunks/")
\ No newline at end of file
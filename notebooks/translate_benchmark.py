@@ -0,0 +1,124 @@
+# Translation backend benchmark: latency, memory and quality vs. the torch backend.
+#
+#   python notebooks/translate_benchmark.py --backends torch,int8,onnx,onnx-int8
+#
+# Samples sentences from data/cleaned_docs (like translate_eval.py). en→hi
+# outputs are scored against the torch backend's output (how much quality the
+# faster runtime gives up); hi→en round trips are scored against the original
+# English text. Each backend runs in its own process so peak RSS is comparable.
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import resource
+import time
+import multiprocessing as mp
+
+import numpy as np
+
+from backend.text_utils import split_sentences
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLEANED_DIR = os.path.join(PROJECT_ROOT, "data", "cleaned_docs")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--backends", default="torch,int8,onnx,onnx-int8")
+parser.add_argument("--samples", type=int, default=40, help="number of sentences to translate")
+parser.add_argument("--json", help="also write results to this file")
+
+
+def load_samples(n: int):
+    """Random English sentences of reasonable length from the cleaned documents."""
+    sentences = []
+    for file in sorted(os.listdir(CLEANED_DIR)):
+        if file.endswith(".txt"):
+            with open(os.path.join(CLEANED_DIR, file), encoding="utf-8") as f:
+                sentences.extend(s.strip() for s in split_sentences(f.read()) if 40 <= len(s.strip()) <= 300)
+    random.Random(0).shuffle(sentences)
+    return sentences[:n]
+
+
+def run_backend(backend: str, samples, queue):
+    """Runs in a child process: load models, translate, report timings and peak RSS."""
+    from backend import translate as tr
+
+    t0 = time.perf_counter()
+    tr.load_model(tr.MODEL_NAME_EN_HI, backend)
+    tr.load_model(tr.MODEL_NAME_HI_EN, backend)
+    load_s = time.perf_counter() - t0
+
+    latencies, hindi = [], []
+    for text in samples:  # one request at a time, as in the app
+        t0 = time.perf_counter()
+        hindi.append(tr.translate_batch([text], "en", "hi", backend=backend, use_memory=False)[0])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    english = tr.translate_batch(hindi, "hi", "en", backend=backend, use_memory=False)
+    batch_s = time.perf_counter() - t0
+
+    queue.put({
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "en_hi_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "en_hi_p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "hi_en_batch_s": round(batch_s, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "hindi": hindi,
+        "english": english,
+    })
+
+
+def score(hypotheses, references):
+    try:
+        import sacrebleu
+    except ImportError:
+        return {"bleu": None, "chrf": None}
+    return {
+        "bleu": round(sacrebleu.corpus_bleu(hypotheses, [references]).score, 1),
+        "chrf": round(sacrebleu.corpus_chrf(hypotheses, [references]).score, 1),
+    }
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    samples = load_samples(args.samples)
+    print(f"✅ Loaded {len(samples)} sample sentences.")
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for backend in args.backends.split(","):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_backend, args=(backend, samples, queue))
+        proc.start()
+        results[backend] = queue.get()
+        proc.join()
+        print(f"⏱️ {backend}: done")
+
+    reference_hi = results.get("torch", next(iter(results.values())))["hindi"]
+    rows = []
+    for backend, r in results.items():
+        rows.append({
+            **{k: v for k, v in r.items() if k not in ("hindi", "english")},
+            "en_hi_vs_torch": score(r["hindi"], reference_hi),
+            "round_trip_en": score(r["english"], samples),
+        })
+
+    print(f"\n{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'hi→en s':>8} {'RSS MB':>8} "
+          f"{'BLEU/chrF vs torch':>20} {'round-trip BLEU/chrF':>22}")
+    for r in rows:
+        vs, rt = r["en_hi_vs_torch"], r["round_trip_en"]
+        print(f"{r['backend']:<10} {r['load_s']:>7} {r['en_hi_p50_ms']:>8} {r['en_hi_p95_ms']:>8} "
+              f"{r['hi_en_batch_s']:>8} {r['peak_rss_mb']:>8} {str(vs['bleu']) + ' / ' + str(vs['chrf']):>20} "
+              f"{str(rt['bleu']) + ' / ' + str(rt['chrf']):>22}")
+    if rows and rows[0]["en_hi_vs_torch"]["bleu"] is None:
+        print("\nℹ️ Install sacrebleu for BLEU/chrF scores.")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n💾 Results saved to {args.json}")
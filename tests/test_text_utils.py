@@ -0,0 +1,52 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.text_utils import SentenceBuffer, split_sentences
+
+
+def test_numbered_list_markers_stay_with_their_item():
+    assert split_sentences("Mr. X. 1. First item\n2. Second item") == [
+        "Mr. X. 1. First item\n",
+        "2. Second item",
+    ]
+
+
+def test_llm_style_numbered_answer():
+    answer = (
+        "To apply for PM-Kisan:\n"
+        "1. Visit the PM-Kisan portal. Click on New Farmer Registration.\n"
+        "2. Enter your Aadhaar number.\n"
+        "10. Submit the form."
+    )
+    assert split_sentences(answer) == [
+        "To apply for PM-Kisan:\n",
+        "1. Visit the PM-Kisan portal. ",
+        "Click on New Farmer Registration.\n",
+        "2. Enter your Aadhaar number.\n",
+        "10. Submit the form.",
+    ]
+    assert "".join(split_sentences(answer)) == answer
+
+
+def test_years_and_amounts_still_end_sentences():
+    assert split_sentences("The scheme started in 2019. It pays Rs. 6000 a year.") == [
+        "The scheme started in 2019. ",
+        "It pays Rs. 6000 a year.",
+    ]
+
+
+def test_hindi_danda():
+    assert split_sentences("पीएम किसान योजना है। यह किसानों के लिए है।") == [
+        "पीएम किसान योजना है। ",
+        "यह किसानों के लिए है।",
+    ]
+
+
+def test_streamed_list_is_released_per_item():
+    buffer = SentenceBuffer()
+    released = []
+    for chunk in ["1. Test the ", "soil. 2. ", "Add compost", ".\n3. Sow."]:
+        released += buffer.feed(chunk)
+    released.append(buffer.flush())
+    assert released == ["1. Test the soil. ", "2. Add compost.\n", "3. Sow."]